@@ -17,8 +17,12 @@ import sentry_sdk
 
 from src.style import init_style
 from src.layout import init_layout
-from src.db import init_db, get_team_groups, init_duckdb_connection, get_teams, get_date_range
+from src.db import init_db, get_team_groups, get_serving_db_path
+from src.generation import DataManager
 from src.callback import init_callbacks
+from src.shared_cache import SharedCache, create_shared_cache_backend
+from src.compression import init_compression
+from src.serialization import install_dash_json_encoder
 from src.auth import Auth0Auth
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -44,6 +48,17 @@ PARQUET_FILE = os.environ.get('PARQUET_FILE',
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 DB_PATH = os.path.join(DATA_DIR, 'team_groups.db')
 
+# 'file' serves from a persistent read-only DuckDB file shared by all workers,
+# 'memory' loads the parquet into a private in-memory database
+DUCKDB_SERVING_MODE = os.environ.get('DUCKDB_SERVING_MODE', 'file')
+DUCKDB_FILE = get_serving_db_path(PARQUET_FILE) if DUCKDB_SERVING_MODE == 'file' else None
+
+# Computed dashboards shared by all workers; the local backend keeps them in a
+# SQLite file next to the serving file (outside the LiteFS mount)
+SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH',
+                                   os.path.join(os.path.dirname(os.path.abspath(get_serving_db_path(PARQUET_FILE))),
+                                                'dashboard_cache.db'))
+
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
     print(f"Created data directory at {DATA_DIR}")
@@ -51,8 +66,9 @@ if not os.path.exists(DATA_DIR):
 # Initialize databases and get data
 try:
     init_db()
-    conn = init_duckdb_connection(PARQUET_FILE)
-    teams = get_teams(conn)
+    data_manager = DataManager(PARQUET_FILE, DUCKDB_FILE)
+    data_manager.load()
+    shared_cache = SharedCache(create_shared_cache_backend(path=SHARED_CACHE_PATH))
     team_groups = {}
 
     try:
@@ -63,8 +79,6 @@ try:
         if environment.lower() == 'production':
             sentry_sdk.capture_exception(e)
         team_groups = {}
-
-    min_date, max_date = get_date_range(conn)
 except Exception as e:
     print(f"Critical error during initialization: {str(e)}")
     if environment.lower() == 'production':
@@ -73,6 +87,9 @@ except Exception as e:
 
 custom_css = init_style()
 
+# Serialize callback responses and the layout with orjson
+install_dash_json_encoder()
+
 app = dash.Dash(
     __name__,
     external_stylesheets=[
@@ -94,14 +111,19 @@ server.config.update({
 # Initialize Auth0
 auth = Auth0Auth(app)
 
+# Compress callback and layout responses (RESPONSE_COMPRESSION)
+init_compression(server)
+
 if not os.path.exists(os.path.join(os.path.dirname(__file__), 'assets')):
     os.makedirs(os.path.join(os.path.dirname(__file__), 'assets'))
 
 with open(os.path.join(os.path.dirname(__file__), 'assets', 'custom.css'), 'w') as f:
     f.write(custom_css)
 
-init_layout(app, teams, team_groups, conn, min_date, max_date)
-init_callbacks(app, teams, team_groups, conn)
+init_layout(app, data_manager, team_groups)
+init_callbacks(app, data_manager, team_groups, shared_cache)
 
 if __name__ == '__main__':
+    # Under gunicorn the watcher is started per worker in post_fork
+    data_manager.start_watching()
     app.run_server(debug=True, host='0.0.0.0', port=8051)
\ No newline at end of file
@@ -0,0 +1,127 @@
+/*
+ * Clientside callbacks of the pure-UI interactions (see src/callback.py).
+ *
+ * These callbacks only show, hide or restyle components from values the
+ * browser already has, so they run here instead of costing a server round
+ * trip and a worker thread each. Every function returns exactly what its
+ * former Python callback returned for the same inputs.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    ui: {
+        // Show the opponent controls of the selected opponent filter type
+        toggleOpponentControls: function (filterType) {
+            // Default dropdown style that allows proper multi-selection display
+            var multiSelectStyle = {
+                'min-height': '38px',
+                'height': 'auto',
+                'margin-bottom': '10px',
+                'position': 'relative',
+                'zIndex': 1000,
+                'display': 'block',
+                'width': '100%'
+            };
+            var shown = {'display': 'block'};
+            var hidden = {'display': 'none'};
+
+            if (filterType === 'specific') {
+                return [shown, hidden, hidden, 'Select Opponent(s):', multiSelectStyle];
+            }
+            if (filterType === 'worthy') {
+                return [shown, shown, hidden, 'Worthy Adversaries:', multiSelectStyle];
+            }
+            if (filterType === 'team_groups') {
+                return [shown, hidden, shown, 'Select Opponent(s):', hidden];
+            }
+            // 'all' or any other value
+            return [hidden, hidden, hidden, 'Select Opponent(s):', multiSelectStyle];
+        },
+
+        // Toggle between individual team and team group selection
+        toggleTeamSelectionType: function (selectionType) {
+            if (selectionType === 'individual') {
+                return [{'display': 'block'}, {'display': 'none'}];
+            }
+            return [{'display': 'none'}, {'display': 'block'}];
+        },
+
+        // Hide the loading spinner container once the initial load fired
+        hideLoadingAfterInitialLoad: function (initialLoad) {
+            return {'display': 'none'};
+        },
+
+        // Open or close the mobile menu
+        toggleMobileMenu: function (nClicks, currentStyle) {
+            if ((currentStyle || {}).display === 'none') {
+                return {'display': 'block'};
+            }
+            return {'display': 'none'};
+        },
+
+        // Position the tooltip of the AI summary icon while it is hovered
+        showTooltip: function (hoverData) {
+            if (hoverData) {
+                return [true, {'bottom': 0, 'height': 20, 'left': 0, 'right': 20, 'top': 20, 'width': 20, 'x': 10, 'y': 10}];
+            }
+            return [false, {}];
+        },
+
+        // Replace the robot icon with a spinner as soon as it is clicked
+        startSpinningIcon: function (nClicks) {
+            if (!nClicks) {
+                return window.dash_clientside.no_update;
+            }
+            return {
+                namespace: 'dash_html_components',
+                type: 'I',
+                props: {
+                    children: null,
+                    className: 'fas fa-spinner fa-spin',
+                    style: {
+                        'color': '#20A7C9',
+                        'font-size': '1.25rem',
+                        'padding': '6px',
+                        'background-color': 'rgba(32, 167, 201, 0.1)',
+                        'border-radius': '50%',
+                        'box-shadow': '0 0 5px rgba(32, 167, 201, 0.2)'
+                    }
+                }
+            };
+        },
+
+        // Keep the selected team group in the URL query string
+        updateUrlTeamGroup: function (selectedTeamGroup, selectionType, currentSearch) {
+            // Only update for team group selection type
+            if (selectionType !== 'group' || !selectedTeamGroup) {
+                return currentSearch || '';
+            }
+
+            // Parse the current query string like urllib's parse_qs: values grouped
+            // by parameter in order of first appearance, blank values dropped
+            var parsed = new URLSearchParams(
+                currentSearch && currentSearch.charAt(0) === '?' ? currentSearch.slice(1) : ''
+            );
+            var queryParams = new Map();
+            Array.from(new Set(parsed.keys())).forEach(function (key) {
+                var values = parsed.getAll(key).filter(function (value) { return value !== ''; });
+                if (values.length) {
+                    queryParams.set(key, values);
+                }
+            });
+
+            // Update or add team_group parameter
+            queryParams.set('team_group', [selectedTeamGroup]);
+
+            // Encode like urllib's urlencode (quote_plus), so URLs match the ones the server built
+            var quotePlus = function (value) {
+                return encodeURIComponent(value)
+                    .replace(/[!'()*]/g, function (c) { return '%' + c.charCodeAt(0).toString(16).toUpperCase(); })
+                    .replace(/%20/g, '+');
+            };
+            var pairs = [];
+            queryParams.forEach(function (values, key) {
+                values.forEach(function (value) { pairs.push(quotePlus(key) + '=' + quotePlus(value)); });
+            });
+            return '?' + pairs.join('&');
+        }
+    }
+});
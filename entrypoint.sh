@@ -11,6 +11,7 @@ export AUTH_FLASK_ROUTES=${AUTH_FLASK_ROUTES:-"true"}
 # Log important environment settings
 echo "Environment:"
 echo "- PARQUET_FILE: $PARQUET_FILE"
+echo "- DUCKDB_FILE: $DUCKDB_FILE"
 echo "- AUTH_FLASK_ROUTES: $AUTH_FLASK_ROUTES"
 echo "- AUTH0_CALLBACK_URL: $AUTH0_CALLBACK_URL"
 echo "- PYTHONPATH: $PYTHONPATH"
@@ -6,9 +6,16 @@ bind = "0.0.0.0:8050"
 backlog = 2048
 
 # Use fewer workers to reduce SQLite contention
-workers = 3  # Fixed number instead of CPU-based formula
-worker_class = 'sync'  # Change from eventlet to sync to avoid context issues
+workers = int(os.environ.get('GUNICORN_WORKERS', '3'))  # Fixed number instead of CPU-based formula
+# 'gthread' serves several callbacks per worker on real threads, each querying
+# DuckDB through its own pooled cursor; 'sync' serves one request per worker.
+# Keep src/monkey_patch.py in mind: eventlet patching is only applied for 'eventlet'.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
 worker_connections = 1000
+
+# Let every thread of a worker check out its own DuckDB cursor; read when the app is preloaded
+os.environ.setdefault('DUCKDB_CURSOR_POOL_SIZE', str(threads))
 timeout = 30
 keepalive = 2
 
@@ -39,11 +46,24 @@ limit_request_field_size = 32768
 # Worker initialization
 def post_fork(server, worker):
     print(f"Worker {worker.pid} started, parent: {os.getppid()}")
+    # Each worker opens its own read-only handle on the shared DuckDB serving file
+    from src.db import reopen_serving_connections
+    from src.generation import start_data_watchers
+    reopen_serving_connections()
+    # Watch the parquet file so new data is hot reloaded without a restart
+    start_data_watchers()
+
+def when_ready(server):
+    # DuckDB handles are not fork-safe; drop the master's handle before workers are spawned
+    from src.db import release_serving_connections
+    release_serving_connections()
+    print("Released master DuckDB handles before forking workers")
 
 def on_starting(server):
     print("Gunicorn server is starting with config:")
     print(f"- Worker class: {worker_class}")
     print(f"- Workers: {workers}")
+    print(f"- Threads: {threads}")
     print(f"- Preload app: {preload_app}")
     print(f"- Bind: {bind}")
 
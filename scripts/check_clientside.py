@@ -0,0 +1,199 @@
+"""
+Compare the clientside callbacks with the Python callbacks they replaced.
+Usage: python scripts/check_clientside.py
+
+Runs every ui function of assets/clientside.js under node on a set of inputs
+and checks each result against the former server callback (src/callback.py
+before the clientside callbacks), serialized to JSON the way Dash sends
+callback outputs. The inputs are the values the component properties take:
+filter and selection type values, click and hover counts, styles and the
+initial-load marker. updateUrlTeamGroup also gets query strings with
+repeated, blank, reserved and non-ASCII parameters, checked against the
+parse_qs/urlencode version. Requires node on the PATH.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from urllib.parse import parse_qs, urlencode
+
+from dash import html, no_update
+from plotly.io.json import to_json_plotly
+
+CLIENTSIDE_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'clientside.js')
+
+# Stands for no_update on both sides, so keeping the current value compares too
+NO_UPDATE = '<no_update>'
+
+# Loads the asset into a stand-in window (with the browser's URLSearchParams) and
+# runs the named function on every case read from stdin
+NODE_RUNNER = """
+const fs = require('fs');
+const vm = require('vm');
+const noUpdate = process.argv[2];
+const context = {window: {dash_clientside: {no_update: noUpdate}, URLSearchParams: URLSearchParams}};
+context.window.window = context.window;
+vm.runInNewContext(fs.readFileSync(process.argv[1], 'utf8'), context.window);
+const ui = context.window.dash_clientside.ui;
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+process.stdout.write(JSON.stringify(cases.map(([name, args]) => ui[name](...args))));
+"""
+
+SEARCHES = [
+    None,
+    '',
+    '?',
+    'team_group=Core',
+    '?team_group=Core',
+    '?team_group=Old&team_group=Older',
+    '?team=Key+West+FC&team_group=Core',
+    '?a=1&b=2&a=3',
+    '?a=&b=2',
+    '?a&b=2',
+    '?a=1;b=2',
+    '?x=%26%3D%3F%23',
+    '?x=%2B+plus',
+    '?name=Caf%C3%A9&team_group=Core',
+    '?q=a%20b',
+    "?q=it's+(fine)*!",
+    '?q=~tilde-dash_under.dot',
+    '?utm_source=mail&team_group=&page=2',
+]
+
+TEAM_GROUPS = ['Core', 'Rivals & Friends', 'Équipe été', "O'Brien (U12) *A*", 'a+b=c/d?e#f', '']
+
+CLICKS = [None, 0, 1, 2, 17]
+
+STYLES = [None, {}, {'display': 'none'}, {'display': 'block'}, {'display': None},
+          {'display': 'flex', 'position': 'absolute'}, {'position': 'absolute', 'display': 'none'}]
+
+
+# The former server callbacks
+
+def toggle_opponent_controls(filter_type):
+    # Default dropdown style that allows proper multi-selection display
+    multi_select_style = {
+        'min-height': '38px',
+        'height': 'auto',
+        'margin-bottom': '10px',
+        'position': 'relative',
+        'zIndex': 1000,
+        'display': 'block',
+        'width': '100%'
+    }
+
+    if filter_type == 'specific':
+        return {'display': 'block'}, {'display': 'none'}, {'display': 'none'}, "Select Opponent(s):", multi_select_style
+    elif filter_type == 'worthy':
+        return {'display': 'block'}, {'display': 'block'}, {'display': 'none'}, "Worthy Adversaries:", multi_select_style
+    elif filter_type == 'team_groups':
+        return {'display': 'block'}, {'display': 'none'}, {'display': 'block'}, "Select Opponent(s):", {'display': 'none'}
+    else:  # 'all' or any other value
+        return {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, "Select Opponent(s):", multi_select_style
+
+
+def toggle_team_selection_type(selection_type):
+    if selection_type == 'individual':
+        return {'display': 'block'}, {'display': 'none'}
+    else:  # 'group'
+        return {'display': 'none'}, {'display': 'block'}
+
+
+def hide_loading_after_initial_load(initial_load):
+    # Hide loading spinner container after initial load
+    return {"display": "none"}
+
+
+def toggle_mobile_menu(n_clicks, current_style):
+    if current_style is None:
+        current_style = {}
+    if current_style.get("display") == "none":
+        return {"display": "block"}
+    return {"display": "none"}
+
+
+def show_tooltip(hover_data):
+    if hover_data:
+        return True, {"bottom": 0, "height": 20, "left": 0, "right": 20, "top": 20, "width": 20, "x": 10, "y": 10}
+    return False, {}
+
+
+def start_spinning_icon(n_clicks):
+    if not n_clicks:
+        return no_update
+
+    # Replace with a spinner icon
+    return html.I(className="fas fa-spinner fa-spin", style={
+        "color": "#20A7C9",
+        "font-size": "1.25rem",
+        "padding": "6px",
+        "background-color": "rgba(32, 167, 201, 0.1)",
+        "border-radius": "50%",
+        "box-shadow": "0 0 5px rgba(32, 167, 201, 0.2)"
+    })
+
+
+def update_url_team_group(selected_team_group, selection_type, current_search):
+    if selection_type != 'group' or not selected_team_group:
+        return current_search or ''
+    query_params = parse_qs(current_search[1:]) if current_search and current_search.startswith('?') else {}
+    query_params['team_group'] = [selected_team_group]
+    return '?' + urlencode(query_params, doseq=True)
+
+
+# Clientside function name, former callback and argument lists
+CASES = [
+    ('toggleOpponentControls', toggle_opponent_controls,
+     [[value] for value in ['all', 'specific', 'worthy', 'team_groups', None, '', 'other']]),
+    ('toggleTeamSelectionType', toggle_team_selection_type,
+     [[value] for value in ['individual', 'group', None, '']]),
+    ('hideLoadingAfterInitialLoad', hide_loading_after_initial_load,
+     [[value] for value in [None, '', 'loaded', 0, 1]]),
+    ('toggleMobileMenu', toggle_mobile_menu,
+     [[n_clicks, style] for n_clicks in CLICKS for style in STYLES]),
+    ('showTooltip', show_tooltip, [[n_hover] for n_hover in CLICKS]),
+    ('startSpinningIcon', start_spinning_icon, [[n_clicks] for n_clicks in CLICKS]),
+    ('updateUrlTeamGroup', update_url_team_group,
+     [[team_group, selection_type, search]
+      for search in SEARCHES
+      for team_group in TEAM_GROUPS + [None]
+      for selection_type in ('group', 'individual')]),
+]
+
+
+def to_output(value):
+    """Serialize a callback result like a Dash response (tuples become lists, components dicts)."""
+    if value is no_update:
+        return NO_UPDATE
+    return json.loads(to_json_plotly(value))
+
+
+def main():
+    if shutil.which('node') is None:
+        print("node is required to run assets/clientside.js")
+        sys.exit(1)
+
+    cases = [(name, callback, args) for name, callback, arg_lists in CASES for args in arg_lists]
+    result = subprocess.run(['node', '-e', NODE_RUNNER, CLIENTSIDE_JS, NO_UPDATE],
+                            input=json.dumps([[name, args] for name, _, args in cases]),
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(1)
+    actual = json.loads(result.stdout)
+
+    mismatches = 0
+    for (name, callback, args), clientside in zip(cases, actual):
+        expected = to_output(callback(*args))
+        if clientside != expected:
+            mismatches += 1
+            print(f"Mismatch for {name}{tuple(args)!r}: clientside {clientside!r}, python {expected!r}")
+
+    print(f"Checked {len(cases)} cases of {len(CASES)} functions: {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the NumPy match engine with the DuckDB statements it stands in for.
+Usage: python scripts/check_match_engine.py <parquet_file> [<start_date> <end_date>]
+
+Example: python scripts/check_match_engine.py data/data.parquet 2024-01-15 2025-03-10
+
+For every team, every combined team and every team group in the team groups
+database, the matches, opponents and aggregates of the engine are checked
+against the DuckDB statements (the reference implementation), over the whole
+data range and over the given date range. Matches played on the same day may
+come in any order from DuckDB, so rows are compared after sorting.
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import (
+    get_date_range,
+    get_team_groups,
+    init_duckdb_connection,
+    load_team_group_members,
+)
+from src.match_engine import MatchEngine
+from src.statements import execute_statement, get_dashboard_aggregates
+from src.teams import TeamAliases, TeamDictionary
+
+
+def sort_rows(df):
+    """Sort a result frame by all of its columns, for order-insensitive comparison."""
+    return df.sort_values(list(df.columns), kind='stable').reset_index(drop=True)
+
+
+def compare(label, expected, actual):
+    """Print and count a mismatch between two result frames."""
+    try:
+        pd.testing.assert_frame_equal(sort_rows(expected), sort_rows(actual))
+        return 0
+    except AssertionError as e:
+        print(f"MISMATCH {label}: {str(e).splitlines()[0]}")
+        return 1
+
+
+def check_selection(conn, engine, label, team_ids, is_group, start_date, end_date, statement_params):
+    """Compare one selection's matches, opponents and aggregates; returns the number of mismatches."""
+    matches_name, opponents_name, params = statement_params
+    mismatches = compare(f"{label} matches", execute_statement(conn, matches_name, **params),
+                         engine.get_matches(team_ids, is_group, start_date, end_date))
+    mismatches += compare(f"{label} opponents", execute_statement(conn, opponents_name, **params),
+                          engine.get_opponents(team_ids, is_group, start_date, end_date))
+
+    opponent_ids = sorted(set(engine.get_opponents(team_ids, is_group, start_date, end_date)['opponent_id'].tolist()))[::2]
+    for opponent_filter in (None, opponent_ids):
+        expected = get_dashboard_aggregates(conn, team_ids, is_group, start_date, end_date, opponent_filter)
+        actual = engine.get_aggregates(team_ids, is_group, start_date, end_date, opponent_filter)
+        for part in ('weekday', 'opponent'):
+            mismatches += compare(f"{label} {part} aggregates", expected[part], actual[part])
+        if expected['totals'] != actual['totals']:
+            print(f"MISMATCH {label} totals: {expected['totals']} != {actual['totals']}")
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) not in (1, 3):
+        print(__doc__)
+        sys.exit(1)
+
+    conn = init_duckdb_connection(args[0])
+    team_dictionary = TeamDictionary.from_connection(conn)
+    team_aliases = TeamAliases.from_connection(conn)
+    team_groups = get_team_groups()
+    load_team_group_members(conn, team_groups, team_dictionary)
+    engine = MatchEngine.from_connection(conn, len(team_dictionary))
+
+    min_date, max_date = get_date_range(conn)
+    date_ranges = [(str(min_date)[:10], str(max_date)[:10])]
+    if len(args) == 3:
+        date_ranges.append((args[1], args[2]))
+
+    checks = 0
+    mismatches = 0
+    for start_date, end_date in date_ranges:
+        dates = {'start_date': start_date, 'end_date': end_date}
+        for team_id, team in enumerate(team_dictionary.names):
+            mismatches += check_selection(conn, engine, team, [team_id], False, start_date, end_date,
+                                          ('team_matches', 'team_opponents', {'team_id': team_id, **dates}))
+            checks += 1
+        for canonical_name in team_aliases.names:
+            mismatches += check_selection(conn, engine, canonical_name, team_aliases.get_ids(canonical_name), True,
+                                          start_date, end_date,
+                                          ('canonical_matches', 'canonical_opponents',
+                                           {'canonical_name': canonical_name, **dates}))
+            checks += 1
+        for group_name, teams in team_groups.items():
+            mismatches += check_selection(conn, engine, f"group {group_name}", team_dictionary.get_ids(teams), True,
+                                          start_date, end_date,
+                                          ('group_matches', 'group_opponents', {'group_name': group_name, **dates}))
+            checks += 1
+
+    print(f"Checked {checks} selections over {len(date_ranges)} date ranges: {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Walk every page of the match results table by keyset and compare with one unpaged read.
+Usage: python scripts/check_match_table.py [<parquet_file>]
+
+Example: python scripts/check_match_table.py data/data.parquet
+
+For every team and every combined team, and for the default sort and each
+column sorted both ways, the pages are read one after another with the cursor
+of the page before (round-tripped through JSON like the match-results-page
+store), forwards from the first page and backwards from the last. Both walks
+must give exactly the rows of the whole selection read as a single page.
+
+Besides the given parquet file, the check always runs on a generated one with
+TIMESTAMP dates and several matches per day at different times of day, so a
+cursor that drops the time of day shows up as missing or repeated rows.
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+
+import duckdb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import get_date_range, init_duckdb_connection
+from src.match_table import PAGE_SIZE, get_match_page
+from src.statements import MATCH_TABLE_COLUMNS
+from src.teams import TeamAliases, TeamDictionary
+
+SORTS = [None] + [[{'column_id': column, 'direction': direction}]
+                  for column in MATCH_TABLE_COLUMNS for direction in ('asc', 'desc')]
+
+
+def write_same_day_parquet(path):
+    """Write matches of four teams, three per day at 10:00, 14:00 and 15:00, with TIMESTAMP dates."""
+    conn = duckdb.connect()
+    conn.execute(f"""
+    COPY (
+        SELECT TIMESTAMP '2024-01-01 10:00:00' + INTERVAL (i // 3) DAY
+                + INTERVAL (CASE i % 3 WHEN 0 THEN 0 WHEN 1 THEN 4 ELSE 5 END) HOUR AS date,
+            list_extract(['Team A', 'Team B', 'Team C', 'Team D'], i % 4 + 1) AS home_team,
+            list_extract(['Team A', 'Team B', 'Team C', 'Team D'], (i + 1 + (i // 4) % 3) % 4 + 1) AS away_team,
+            CAST(i % 5 AS BIGINT) AS home_score,
+            CAST(i % 3 AS BIGINT) AS away_score
+        FROM range(45) t(i)
+    ) TO '{path}' (FORMAT PARQUET)
+    """)
+    conn.close()
+
+
+def read_pages(conn, selection, sort_by, page_size):
+    """Read the pages of a selection forwards and backwards by keyset, and all of its rows as one page."""
+    query_key = json.dumps(sort_by)
+    all_rows, _, _, _ = get_match_page(conn, selection, query_key, 0, sort_by, None, None, None,
+                                       page_size=1_000_000)
+
+    forward = []
+    cursor = None
+    page_count = max(1, math.ceil(len(all_rows) / page_size))
+    for page in range(page_count):
+        rows, _, _, cursor = get_match_page(conn, selection, query_key, page, sort_by, None, None, cursor,
+                                            page_size=page_size)
+        forward.extend(rows)
+        cursor = json.loads(json.dumps(cursor))
+
+    backward = []
+    for page in range(page_count - 2, -1, -1):
+        rows, _, _, cursor = get_match_page(conn, selection, query_key, page, sort_by, None, None, cursor,
+                                            page_size=page_size)
+        backward[:0] = rows
+        cursor = json.loads(json.dumps(cursor))
+    backward.extend(forward[(page_count - 1) * page_size:])
+    return all_rows, forward, backward
+
+
+def check_parquet(parquet_file, page_size):
+    """Walk the pages of every team and combined team of a parquet file; returns (checks, mismatches)."""
+    conn = init_duckdb_connection(parquet_file)
+    team_dictionary = TeamDictionary.from_connection(conn)
+    team_aliases = TeamAliases.from_connection(conn)
+    start_date, end_date = get_date_range(conn)
+    # The end date is inclusive up to the end of that day
+    end_date = f"{end_date} 23:59:59"
+
+    selections = [(team, [team_id], False) for team_id, team in enumerate(team_dictionary.names)]
+    selections += [(name, team_aliases.get_ids(name), True) for name in team_aliases.names]
+
+    checks = 0
+    mismatches = 0
+    for label, team_ids, is_group in selections:
+        selection = {'team_ids': list(team_ids), 'is_group': is_group, 'opponent_ids': None,
+                     'start_date': start_date, 'end_date': end_date}
+        for sort_by in SORTS:
+            all_rows, forward, backward = read_pages(conn, selection, sort_by, page_size)
+            checks += 1
+            for direction, rows in (('forward', forward), ('backward', backward)):
+                if rows != all_rows:
+                    mismatches += 1
+                    print(f"Mismatch for {label} sorted by {sort_by} walking {direction}: "
+                          f"{len(rows)} rows instead of {len(all_rows)}")
+    return checks, mismatches
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) > 1:
+        print(__doc__)
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        same_day_file = os.path.join(tmp_dir, 'same_day.parquet')
+        write_same_day_parquet(same_day_file)
+        # Pages of two rows so that most cursors fall between matches of the same day
+        checks, mismatches = check_parquet(same_day_file, page_size=2)
+
+    if args:
+        more_checks, more_mismatches = check_parquet(args[0], page_size=PAGE_SIZE)
+        checks += more_checks
+        mismatches += more_mismatches
+
+    print(f"Checked {checks} selection sorts: {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Run the Redis shared cache backend against a small RESP stand-in server.
+Usage: python scripts/check_shared_cache.py
+
+The stand-in speaks enough of the Redis protocol for RedisCacheBackend
+(AUTH, SELECT, GET, SET with PX and NX, DEL) and keeps one store per
+database. The check covers get and set, expiry, set-if-absent, delete,
+password and database selection, a connection dropped by the server, and
+the counters of SharedCache under concurrent requests and backend failures.
+No Redis server is needed.
+"""
+
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.shared_cache import RedisCacheBackend, RedisError, SharedCache
+
+PASSWORD = 'secret'
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """One client connection of the stand-in server."""
+
+    def setup(self):
+        super().setup()
+        self.authenticated = False
+        self.db = 0
+        with self.server.lock:
+            self.server.connections.append(self.request)
+            self.server.connection_count += 1
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            try:
+                args = self.read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            try:
+                self.wfile.write(self.execute(args[0].decode().upper(), args[1:]))
+            except OSError:
+                return
+
+    def execute(self, name, args):
+        if name == 'AUTH':
+            if args[0].decode() != PASSWORD:
+                return b"-WRONGPASS invalid password\r\n"
+            self.authenticated = True
+            return b"+OK\r\n"
+        if not self.authenticated:
+            return b"-NOAUTH Authentication required.\r\n"
+        if name == 'SELECT':
+            self.db = int(args[0])
+            return b"+OK\r\n"
+
+        with self.server.lock:
+            store = self.server.stores.setdefault(self.db, {})
+            now = time.monotonic()
+            for key in [key for key, (_, expires_at) in store.items() if expires_at <= now]:
+                del store[key]
+            if name == 'GET':
+                entry = store.get(args[0])
+                return b"$-1\r\n" if entry is None else b"$%d\r\n%s\r\n" % (len(entry[0]), entry[0])
+            if name == 'SET':
+                key, value, options = args[0], args[1], [arg.decode().upper() for arg in args[2:]]
+                if 'NX' in options and key in store:
+                    return b"$-1\r\n"
+                store[key] = (value, now + int(options[options.index('PX') + 1]) / 1000)
+                return b"+OK\r\n"
+            if name == 'DEL':
+                return b":%d\r\n" % sum(store.pop(key, None) is not None for key in args)
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Stand-in Redis server on a free local port."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RespHandler)
+        self.lock = threading.Lock()
+        self.stores = {}
+        self.connections = []
+        self.connection_count = 0
+
+    def drop_connections(self):
+        """Close every client connection from the server side."""
+        with self.lock:
+            for connection in self.connections:
+                # shutdown() rather than close(): the handler's file objects keep the socket open
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.connections.clear()
+
+
+def check(results, label, ok):
+    results.append(ok)
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+
+def check_backend(server, results):
+    port = server.server_address[1]
+    backend = RedisCacheBackend(f"redis://:{PASSWORD}@127.0.0.1:{port}/2")
+
+    check(results, "get of a missing key is None", backend.get('missing') is None)
+    backend.set('key', b'value\r\nwith newline', 60)
+    check(results, "set then get returns the value", backend.get('key') == b'value\r\nwith newline')
+
+    backend.set('short', b'soon gone', 0.2)
+    check(results, "set with a TTL is readable before it expires", backend.get('short') == b'soon gone')
+    time.sleep(0.3)
+    check(results, "set with a TTL expires", backend.get('short') is None)
+
+    check(results, "add of an absent key sets it", backend.add('lock', b'1', 60) is True)
+    check(results, "add of a present key does not", backend.add('lock', b'2', 60) is False)
+    check(results, "add keeps the first value", backend.get('lock') == b'1')
+    backend.delete('lock')
+    check(results, "delete removes the key", backend.get('lock') is None)
+    check(results, "add after delete sets it again", backend.add('lock', b'3', 60) is True)
+
+    check(results, "SELECT keeps keys in the chosen database",
+          set(server.stores) == {2} and b'key' in server.stores[2])
+    other_db = RedisCacheBackend(f"redis://:{PASSWORD}@127.0.0.1:{port}/3")
+    check(results, "another database does not see the keys", other_db.get('key') is None)
+
+    try:
+        RedisCacheBackend(f"redis://:wrong@127.0.0.1:{port}").get('key')
+        check(results, "a wrong password is an error", False)
+    except RedisError:
+        check(results, "a wrong password is an error", True)
+    try:
+        RedisCacheBackend(f"redis://127.0.0.1:{port}").get('key')
+        check(results, "no password is an error", False)
+    except RedisError:
+        check(results, "no password is an error", True)
+
+    connections = server.connection_count
+    server.drop_connections()
+    check(results, "get after a dropped connection reconnects", backend.get('key') == b'value\r\nwith newline')
+    check(results, "the reconnect authenticates and selects again",
+          server.connection_count == connections + 1 and b'key' in server.stores[2])
+    server.drop_connections()
+    backend.set('after drop', b'x', 60)
+    check(results, "set after a dropped connection reconnects", backend.get('after drop') == b'x')
+
+
+def check_shared_cache(server, results):
+    port = server.server_address[1]
+    cache = SharedCache(RedisCacheBackend(f"redis://:{PASSWORD}@127.0.0.1:{port}/4"))
+
+    calls = []
+    first = cache.get_or_compute('payload', lambda: calls.append(1) or {'value': 1})
+    second = cache.get_or_compute('payload', lambda: calls.append(1) or {'value': 2})
+    check(results, "get_or_compute computes once and then reads the cache",
+          first == second == {'value': 1} and len(calls) == 1)
+    check(results, "the lock key is deleted after computing", b'payload:lock' not in server.stores[4])
+
+    def look_up_keys():
+        for j in range(25):
+            cache.get_or_compute(f"key {j}", dict)
+
+    # Eight threads on the same keys: every lookup is counted exactly once
+    threads = [threading.Thread(target=look_up_keys) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    check(results, f"concurrent lookups are all counted ({stats})",
+          stats['hits'] + stats['misses'] == 2 + 8 * 25 and stats['errors'] == 0)
+
+    server.shutdown()
+    server.server_close()
+    server.drop_connections()
+    payload = cache.get_or_compute('payload', lambda: {'value': 'computed'})
+    stats = cache.stats()
+    check(results, "an unreachable server falls back to computing", payload == {'value': 'computed'})
+    check(results, "the failure is counted and the backend bypassed",
+          stats['errors'] == 1 and cache.get('payload') is None and cache.stats()['errors'] == 1)
+
+
+def main():
+    server = RespServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = []
+    check_backend(server, results)
+    check_shared_cache(server, results)
+
+    failures = results.count(False)
+    print(f"Ran {len(results)} checks: {failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Print the DuckDB query plan of the dashboard match query for a team and date range.
+Usage: python scripts/explain_query.py <parquet_file> <team> <start_date> <end_date> [--no-analyze]
+
+Example: python scripts/explain_query.py data/data.parquet "Key West FC" 2025-01-01 2025-01-31
+
+The plan is produced with EXPLAIN ANALYZE, so the TABLE_SCAN operators show how
+many rows were actually read; a short date range should read only a fraction
+of the table.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import explain_query, init_duckdb_connection
+from src.statements import bind_parameters, get_statement_sql
+from src.teams import TeamDictionary
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) != 4:
+        print(__doc__)
+        sys.exit(1)
+
+    parquet_file, team, start_date, end_date = args
+    analyze = '--no-analyze' not in sys.argv
+
+    conn = init_duckdb_connection(parquet_file)
+    team_id = TeamDictionary.from_connection(conn).get_id(team)
+    if team_id is None:
+        print(f"Team not found: {team}")
+        sys.exit(1)
+
+    parameters = bind_parameters({'team_id': team_id, 'start_date': start_date, 'end_date': end_date})
+    print(explain_query(conn, get_statement_sql('team_matches'), analyze, parameters))
+    print(explain_query(conn, "SELECT COUNT(*) FROM soccer_data WHERE date >= $start_date AND date <= $end_date",
+                        analyze, {'start_date': start_date, 'end_date': end_date}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+In-process result cache for the dashboard statements.
+
+Results are keyed by the statement name, its normalized parameters and a
+cache scope: the data generation version and the team groups version the
+request ran against. A result can therefore never be served for other data
+or other team group members. The cache is also cleared whenever the team
+groups change, and when a new data generation is swapped in, so stale entries
+do not hold memory until they are evicted. When the new generation was
+ingested incrementally, the results of the teams it did not touch are moved
+to its scope instead (see rescope).
+
+The cache is bounded by the memory of the cached DataFrames
+(QUERY_CACHE_BYTES) and evicts the least recently used entries first.
+Cached frames are shared between requests and must be treated as read-only.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Memory budget of the cached results in bytes; 0 disables the cache
+QUERY_CACHE_BYTES = int(os.environ.get('QUERY_CACHE_BYTES', str(64 * 1024 * 1024)))
+
+
+def get_frame_size(df):
+    """Memory used by a DataFrame in bytes, including object columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def normalize_parameter(name, value):
+    """Turn a statement parameter into a hashable value; id lists are sets, so they are sorted."""
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        items = [item.item() if isinstance(item, np.generic) else item for item in value]
+        return tuple(sorted(items)) if name.endswith('_ids') else tuple(items)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class QueryCache:
+    """
+    Byte-bounded LRU cache of statement results.
+
+    Args:
+        max_bytes: Memory budget of the cached DataFrames
+    """
+
+    def __init__(self, max_bytes=QUERY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def make_key(self, name, params, scope):
+        """Build the cache key of a statement execution."""
+        return (name, scope, tuple(sorted((key, normalize_parameter(key, value)) for key, value in params.items())))
+
+    def get(self, key):
+        """Get a cached result, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df):
+        """Cache a result, evicting the least recently used entries to stay within max_bytes."""
+        size = get_frame_size(df)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (df, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, reason):
+        """Drop every cached result."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        if count:
+            logger.info(f"Query cache invalidated ({reason}), dropped {count} results")
+
+    def rescope(self, old_version, new_version, keep):
+        """
+        Carry the results of a data generation over to the next one.
+
+        Entries scoped to data generation old_version for which keep(name, params)
+        is true are moved to new_version; every other entry is dropped.
+
+        Args:
+            old_version: Version of the generation that was swapped out
+            new_version: Version of the generation that was swapped in
+            keep: Callable taking the statement name and its normalized parameters (dict)
+        """
+        with self._lock:
+            entries = OrderedDict()
+            kept_bytes = 0
+            for (name, scope, params), (df, size) in self._entries.items():
+                if scope[0] == old_version and keep(name, dict(params)):
+                    entries[(name, (new_version,) + tuple(scope[1:]), params)] = (df, size)
+                    kept_bytes += size
+            dropped = len(self._entries) - len(entries)
+            self._entries = entries
+            self._bytes = kept_bytes
+        logger.info(f"Query cache carried {len(entries)} results over to data generation {new_version}, "
+                    f"dropped {dropped}")
+
+    def stats(self):
+        """Get the hit, miss and eviction counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+# Shared by every callback in this process
+query_cache = QueryCache()
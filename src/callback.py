@@ -1,23 +1,27 @@
 from dash import callback_context
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 from datetime import datetime, timedelta, date
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 import sqlite3
 import dash  # Make sure dash is imported for dash.no_update
-from src.db import get_db_connection, get_team_groups, create_team_group, update_team_group, delete_team_group
-from src.queries import (
-    get_key_west_team_filter,
-    get_debug_key_west_query,
-    get_combined_matches_query,
-    get_team_matches_query,
-    get_team_group_filter,
-    get_team_group_matches_query,
-    get_opponent_query_for_key_west,
-    get_opponent_query_for_team,
-    get_opponent_query_for_team_group
+from src.db import (
+    get_db_connection,
+    get_team_groups,
+    get_team_groups_version,
+    create_team_group,
+    update_team_group,
+    delete_team_group
 )
+from src.statements import execute_statement, execute_concurrently, get_dashboard_aggregates, StatementTimeout
+from src.cache import query_cache
+from src.datasets import dashboard_datasets
+from src.result_store import ResultStore, make_table_reference
+from src.match_table import get_match_page
+from src.shared_cache import make_payload_key
+from src.schema import DAY_NAMES
 from src.util import (
     normalize_team_names_in_dataframe,
     filter_matches_by_opponents,
@@ -26,7 +30,8 @@ from src.util import (
 from dash import callback, html, dcc, no_update
 import json
 import time
-from urllib.parse import parse_qs, urlencode
+import threading
+from urllib.parse import parse_qs
 import os
 import sys
 import logging
@@ -37,47 +42,112 @@ from src.logger import setup_logger
 # Set up logger
 logger = setup_logger(__name__)
 
-def init_callbacks(app, teams, team_groups_param, conn):
-    # Make team_groups properly accessible as a global variable within all callbacks
-    global team_groups
-    # Store the initial team_groups from the parameter to the global variable
-    team_groups = team_groups_param
+# Shown instead of the dashboard when one of its statements ran past STATEMENT_TIMEOUT_MS
+EXPENSIVE_QUERY_MESSAGE = "This selection is too expensive to compute. Narrow the date range or pick a smaller team group."
+
+def init_callbacks(app, data_manager, team_groups_param, shared_cache=None):
+    # Callbacks read data_manager.current() once per request so a hot reload of the
+    # parquet file never mixes two data generations within one response.
+    # shared_cache is an optional src.shared_cache.SharedCache of computed dashboards, shared by all workers.
+    # The team groups of this worker as one (version, groups) tuple, replaced as a whole on
+    # reload and never modified, so a request that reads it once sees groups and version
+    # that belong together; the version is SQLite's, other workers' edits bump it
+    global team_groups_snapshot
+    team_groups_snapshot = (get_team_groups_version(), team_groups_param)
+    # Match table rows behind the full-match-results-data key (see src/result_store.py)
+    result_store = ResultStore(shared_cache)
+
+    # Serializes reloads of the team groups between the threads of a worker
+    team_groups_lock = threading.Lock()
+
+    def reload_team_groups():
+        """
+        Reload the team groups from SQLite.
+
+        Returns:
+            The new (version, groups) snapshot
+        """
+        global team_groups_snapshot
+        with team_groups_lock:
+            # Read the version first: an edit in between only makes the next request reload again
+            version = get_team_groups_version()
+            team_groups_snapshot = (version, get_team_groups())
+            snapshot = team_groups_snapshot
+        query_cache.invalidate('team groups changed')
+        return snapshot
+
+    def refresh_team_groups():
+        """
+        Pick up team group edits made by any process.
+
+        Returns:
+            The current (version, groups) snapshot; read it once per request
+        """
+        snapshot = team_groups_snapshot
+        if get_team_groups_version() != snapshot[0]:
+            snapshot = reload_team_groups()
+        return snapshot
+
+    def sync_team_groups(generation, conn, snapshot):
+        """Mirror the team groups of a (version, groups) snapshot into a cursor of the generation for the group queries."""
+        version, groups = snapshot
+        generation.team_group_mirror.sync(conn, groups, version)
+
+    def get_cache_scope(generation, snapshot):
+        """Scope of cached statement results: the data generation and team groups version of the request."""
+        return (generation.version, snapshot[0])
+
+    def get_statement_team_ids(generation, params, team_groups):
+        """Get the ids of the teams whose matches a statement reads, or None if unknown."""
+        if 'team_ids' in params:
+            return params['team_ids']
+        if 'team_id' in params:
+            return [] if params['team_id'] is None else [params['team_id']]
+        if 'group_name' in params:
+            return generation.team_dictionary.get_ids(team_groups.get(params['group_name'], [])).tolist()
+        if 'canonical_name' in params:
+            return generation.team_aliases.get_ids(params['canonical_name']).tolist()
+        return None
+
+    def on_data_reloaded(old_generation, new_generation):
+        """Keep the cached results of the teams a reload did not touch; drop the rest."""
+        affected_team_ids = new_generation.affected_team_ids
+        if old_generation is None or affected_team_ids is None:
+            # Cached results of the previous data generation are never read again
+            query_cache.invalidate('data reloaded')
+            return
+
+        team_groups = team_groups_snapshot[1]
+
+        def keep(name, params):
+            team_ids = get_statement_team_ids(old_generation, params, team_groups)
+            return team_ids is not None and affected_team_ids.isdisjoint(team_ids)
+
+        query_cache.rescope(old_generation.version, new_generation.version, keep)
+
+    data_manager.add_listener(on_data_reloaded)
+
+    # Inputs of every dashboard section; Dash fires the section callbacks together
+    dashboard_inputs = [
+        Input('team-dropdown', 'value'),
+        Input('team-group-dropdown', 'value'),
+        Input('team-selection-type', 'value'),
+        Input('date-range', 'start_date'),
+        Input('date-range', 'end_date'),
+        Input('initial-load', 'children'),
+        Input('opponent-filter-type', 'value'),
+        Input('opponent-selection', 'value'),
+        Input('opponent-team-groups', 'value'),
+        Input('competitiveness-threshold', 'value')
+    ]
+
+    def get_dashboard_state(team, team_group, selection_type, start_date, end_date, opponent_filter_type,
+                            opponent_selection, opponent_team_groups, competitiveness_threshold):
+        """Resolve the dashboard inputs of a request: pinned data generation, default dates and group, display name."""
+        # Pin the data generation for the whole request
+        generation = data_manager.current()
+        team_groups_version, team_groups = snapshot = refresh_team_groups()
 
-    @app.callback(
-        [
-            Output('games-played', 'children'),
-            Output('win-rate', 'children'),
-            Output('loss-rate-display', 'children'),
-            Output('goals-scored', 'children'),
-            Output('goals-conceded-display', 'children'),
-            Output('goal-difference', 'children'),
-            Output('goal-diff-time-chart', 'figure'),  # Moved here to be first in Performance Over Time section
-            Output('performance-trend', 'figure'),
-            Output('day-of-week-chart', 'figure'),  # New day of week performance chart
-            Output('match-results-table', 'data'),
-            Output('goal-stats-chart', 'figure'),
-            Output('goal-stats-pie', 'figure'),
-            Output('opponent-analysis-text', 'children'),
-            Output('opponent-comparison-chart', 'figure'),
-            Output('opponent-goal-diff-chart', 'figure'),
-            Output('opponent-analysis-section', 'style'),
-            Output('full-match-results-data', 'data')
-        ],
-        [
-            Input('team-dropdown', 'value'),
-            Input('team-group-dropdown', 'value'),
-            Input('team-selection-type', 'value'),
-            Input('date-range', 'start_date'),
-            Input('date-range', 'end_date'),
-            Input('initial-load', 'children'),
-            Input('opponent-filter-type', 'value'),
-            Input('opponent-selection', 'value'),
-            Input('opponent-team-groups', 'value'),
-            Input('competitiveness-threshold', 'value')
-        ]
-    )
-    def update_dashboard(team, team_group, selection_type, start_date, end_date, initial_load,
-                         opponent_filter_type, opponent_selection, opponent_team_groups, competitiveness_threshold):
         # Set default values for inputs
         start_date = start_date or (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
         end_date = end_date or datetime.now().strftime('%Y-%m-%d')
@@ -89,20 +159,125 @@ def init_callbacks(app, teams, team_groups_param, conn):
             team_group = team_group or (next(iter(team_groups.keys())) if team_groups else None)
             display_name = f"Group: {team_group}" if team_group else "No group selected"
 
-        # Create date filter condition for SQL queries
-        filter_conditions = f"date >= '{start_date}' AND date <= '{end_date}'"
+        return {
+            'generation': generation,
+            'cache_scope': get_cache_scope(generation, snapshot),
+            'team_groups_snapshot': snapshot,
+            'team_groups': team_groups,
+            'team_groups_version': team_groups_version,
+            'team': team,
+            'team_group': team_group,
+            'selection_type': selection_type,
+            'start_date': start_date,
+            'end_date': end_date,
+            'display_name': display_name,
+            'opponent_filter_type': opponent_filter_type,
+            'opponent_selection': opponent_selection,
+            'opponent_team_groups': opponent_team_groups,
+            'competitiveness_threshold': competitiveness_threshold,
+            # Everything the dashboard depends on besides the data generation and team groups version
+            'filters': (team, team_group, selection_type, start_date, end_date, opponent_filter_type,
+                        opponent_selection, opponent_team_groups, competitiveness_threshold)
+        }
+
+    def register_dashboard_section(section, outputs, render, timeout_outputs=None):
+        """
+        Register the callback of one dashboard section.
+
+        Every section renders from the same dataset (see get_dashboard_dataset), so
+        the sections of a filter state that reach the same worker share one
+        computation (src/datasets.py), and each of them is sent to the browser as
+        soon as it is rendered instead of waiting for the slowest chart.
+
+        Args:
+            section: Section name, part of its shared cache key
+            outputs: Dash outputs of the section
+            render: Callable taking the dashboard state and returning the output values
+            timeout_outputs: Output values when a statement times out (no_update for all by default)
+        """
+        @app.callback(outputs, dashboard_inputs)
+        def update_dashboard_section(team, team_group, selection_type, start_date, end_date, initial_load,
+                                     opponent_filter_type, opponent_selection, opponent_team_groups,
+                                     competitiveness_threshold):
+            state = get_dashboard_state(team, team_group, selection_type, start_date, end_date, opponent_filter_type,
+                                        opponent_selection, opponent_team_groups, competitiveness_threshold)
+            try:
+                if shared_cache is None:
+                    return render(state)
+
+                # The same section is rendered once and reused by every worker until the data or the team groups change
+                key = make_payload_key(f'dashboard-{section}', state['generation'].checksum, state['team_groups_version'],
+                                       *state['filters'])
+                return shared_cache.get_or_compute(key, lambda: render(state))
+            except StatementTimeout as e:
+                # Keep the previous results on screen; the match table section explains why
+                logger.warning(f"Dashboard {section} for {state['display_name']} ({state['start_date']} to "
+                               f"{state['end_date']}) was too expensive: {str(e)}")
+                return timeout_outputs or [no_update] * len(outputs)
+
+        return update_dashboard_section
+
+    def get_dashboard_dataset(state):
+        """Get the dataset the dashboard sections render from, computed once per filter state (see src/datasets.py)."""
+        generation = state['generation']
+
+        def compute():
+            with generation.cursor() as conn:
+                sync_team_groups(generation, conn, state['team_groups_snapshot'])
+                # Run debug queries to check data
+                run_debug_queries(conn)
+                return compute_dashboard_dataset(generation, conn, state)
+
+        key = make_payload_key('dataset', generation.version, state['team_groups_version'], *state['filters'])
+        return dashboard_datasets.get_or_compute(key, compute)
+
+    def compute_dashboard_dataset(generation, conn, state):
+        """
+        Compute the filtered matches and aggregates of a dashboard state.
+
+        Returns:
+            Dictionary with the filtered matches (names decoded), their aggregates
+            (see get_dashboard_aggregates), whether the opponent analysis is shown
+            and the selection parameters of the match table (see src/match_table.py)
+        """
+        team_dictionary = generation.team_dictionary
+        cache_scope = state['cache_scope']
+        start_date = state['start_date']
+        end_date = state['end_date']
+        opponent_filter_type = state['opponent_filter_type']
+        opponent_selection = state['opponent_selection']
+        opponent_team_groups = state['opponent_team_groups']
+        team_groups = state['team_groups']
+        team_ids, is_group = get_selection_team_ids(team_dictionary, generation.team_aliases, team_groups,
+                                                    state['selection_type'], state['team'], state['team_group'])
+
         logger.debug(f"Date range selected: {start_date} to {end_date}")
-        logger.debug(f"Selection type: {selection_type}, Team: {team}, Team Group: {team_group}")
+        logger.debug(f"Selection type: {state['selection_type']}, Team: {state['team']}, Team Group: {state['team_group']}")
         logger.debug(f"Opponent filter: {opponent_filter_type}, Opponents: {opponent_selection}, Opponent Groups: {opponent_team_groups}")
 
-        # Run debug queries to check data
-        run_debug_queries(conn, filter_conditions)
-
         # Get match data based on selection type
-        if selection_type == 'individual':
-            matches_df = get_team_match_data(conn, team, filter_conditions)
-        else:  # 'group'
-            matches_df = get_team_group_match_data(conn, team_group, filter_conditions)
+        def fetch_matches(conn):
+            if generation.match_engine is not None:
+                return generation.match_engine.get_matches(team_ids, is_group, start_date, end_date)
+            if state['selection_type'] == 'individual':
+                return get_team_match_data(conn, team_dictionary, generation.team_aliases, state['team'], start_date,
+                                           end_date, cache_scope)
+            return get_team_group_match_data(conn, team_dictionary, team_groups, state['team_group'], start_date,
+                                             end_date, cache_scope)
+
+        # Cards, result counts and breakdown charts come from one aggregate statement
+        # over the same selection. When the opponent filter resolves to ids without
+        # looking at the matches, it runs next to the match query.
+        tasks = {'matches': fetch_matches}
+        opponent_ids_declared, opponent_ids = get_declared_opponent_ids(
+            opponent_filter_type, opponent_selection, opponent_team_groups, team_groups, team_dictionary)
+        if opponent_ids_declared:
+            tasks['aggregates'] = lambda conn: get_selection_aggregates(generation, conn, team_ids, is_group, start_date,
+                                                                        end_date, opponent_ids, cache_scope)
+        results = execute_concurrently(generation.cursors, conn, tasks,
+                                       prepare=lambda cursor: sync_team_groups(generation, cursor,
+                                                                               state['team_groups_snapshot']))
+        matches_df = results['matches']
 
         # Apply opponent filtering
         filtered_matches_df, display_opponent_analysis = filter_matches_by_filter_type(
@@ -110,52 +285,241 @@ def init_callbacks(app, teams, team_groups_param, conn):
             opponent_filter_type,
             opponent_selection,
             opponent_team_groups,
-            competitiveness_threshold
+            state['competitiveness_threshold'],
+            team_groups,
+            team_dictionary
         )
 
-        # Calculate dashboard metrics
-        dashboard_metrics = calculate_dashboard_metrics(filtered_matches_df)
+        # Filtering works on team ids; decode the names needed for rendering
+        filtered_matches_df = team_dictionary.decode_match_columns(filtered_matches_df)
 
-        # Generate visualizations - use display_name for proper titles
-        visualizations = generate_visualizations(filtered_matches_df, display_name, dashboard_metrics)
+        # Worthy adversaries picked from the matches are only known now. Opponent
+        # filters only ever drop rows by opponent, so the opponents left in the
+        # filtered frame describe the filter.
+        aggregates = results.get('aggregates')
+        if aggregates is None:
+            if len(filtered_matches_df) != len(matches_df):
+                opponent_ids = filtered_matches_df['opponent_id'].dropna().unique().tolist()
+            aggregates = get_selection_aggregates(generation, conn, team_ids, is_group, start_date, end_date,
+                                                  opponent_ids, cache_scope)
 
-        # Generate opponent analysis
-        opponent_analysis = generate_opponent_analysis(
-            filtered_matches_df,
-            opponent_filter_type,
-            opponent_selection,
-            opponent_team_groups,
-            competitiveness_threshold
-        )
+        return {
+            'matches': filtered_matches_df,
+            'aggregates': aggregates,
+            'display_opponent_analysis': display_opponent_analysis,
+            # The filtered matches as statement parameters, for the match table pages
+            'selection': {
+                'team_ids': team_ids,
+                'is_group': is_group,
+                'opponent_ids': opponent_ids,
+                'start_date': start_date,
+                'end_date': end_date
+            }
+        }
 
-        # Combine results and return
+    def get_card_metrics(state):
+        """Get the KPI card metrics of a dashboard state."""
+        # Without an opponent filter the KPI cards come straight from the prefix-sum index,
+        # so they do not wait for the matches
+        if state['opponent_filter_type'] == 'all':
+            totals = get_selection_totals(state['generation'], state['team_groups'], state['selection_type'],
+                                          state['team'], state['team_group'], state['start_date'], state['end_date'])
+        else:
+            totals = get_dashboard_dataset(state)['aggregates']['totals']
+        return calculate_dashboard_metrics(totals)
+
+    def render_dashboard_cards(state):
+        dashboard_metrics = get_card_metrics(state)
         return (
             dashboard_metrics['games_played'],
             dashboard_metrics['win_rate_value'],
             dashboard_metrics['loss_rate_value'],
             str(dashboard_metrics['goals_scored']),
             str(dashboard_metrics['goals_conceded']),
-            str(dashboard_metrics['goal_diff']),
-            visualizations['goal_diff_time_chart'],  # Moved here to be first in Performance Over Time section
-            visualizations['performance_fig'],
-            visualizations['day_of_week_chart'],  # New day of week performance chart
-            dashboard_metrics['table_data'],
-            visualizations['goal_fig'],
-            visualizations['pie_fig'],
+            str(dashboard_metrics['goal_diff'])
+        )
+
+    def render_dashboard_time_series(state):
+        filtered_matches_df = get_dashboard_dataset(state)['matches']
+        # The dataset is shared between sections, so the charts get their own chronologically sorted copy
+        if not filtered_matches_df.empty:
+            sorted_df = filtered_matches_df.sort_values(by='date', ascending=True)
+        else:
+            sorted_df = pd.DataFrame(columns=filtered_matches_df.columns)  # Empty DataFrame with same columns
+        return (
+            create_goal_differential_time_chart(sorted_df, state['display_name']),
+            create_performance_trend_chart(sorted_df, state['display_name'])
+        )
+
+    def render_dashboard_breakdowns(state):
+        dataset = get_dashboard_dataset(state)
+        filtered_matches_df = dataset['matches']
+        aggregates = dataset['aggregates']
+        dashboard_metrics = get_card_metrics(state)
+
+        # Create day of week performance chart with time dimension
+        day_stats_df, time_day_stats_df = calculate_day_of_week_stats(aggregates['weekday'])
+        return (
+            create_day_of_week_chart(day_stats_df, time_day_stats_df, state['display_name']),
+            create_goal_stats_chart(filtered_matches_df,
+                                    dashboard_metrics['goals_scored'],
+                                    dashboard_metrics['goals_conceded'],
+                                    dashboard_metrics['goal_diff']),
+            create_result_distribution_pie_chart(filtered_matches_df, aggregates['totals'])
+        )
+
+    def render_dashboard_opponents(state):
+        dataset = get_dashboard_dataset(state)
+        opponent_analysis = generate_opponent_analysis(
+            dataset['matches'],
+            state['opponent_filter_type'],
+            state['opponent_selection'],
+            state['opponent_team_groups'],
+            state['competitiveness_threshold'],
+            generate_opponent_stats_dataframe(dataset['aggregates']['opponent'], state['generation'].team_dictionary)
+        )
+        return (
             opponent_analysis['analysis_text'],
             opponent_analysis['comparison_chart'],
             opponent_analysis['goal_diff_chart'],
-            display_opponent_analysis,
-            dashboard_metrics['table_data'] # Store full data in hidden div
+            dataset['display_opponent_analysis']
         )
 
-    def run_debug_queries(conn, filter_conditions):
+    def get_match_table_key(state):
+        """Key of the match table rows of a dashboard state in the result store."""
+        return make_payload_key('match-table', state['generation'].checksum, state['team_groups_version'],
+                                *state['filters'])
+
+    def render_dashboard_table(state):
+        # The pages are read by update_match_results_page; computing the dataset here
+        # reports a selection that is too expensive, and warms it for the pages
+        get_dashboard_dataset(state)
+        key = get_match_table_key(state)
+        return (
+            make_table_reference(key, state['filters']),  # Only the key goes to the browser
+            None,
+            False
+        )
+
+    def get_match_table_selection(state):
+        """Get the statement parameters of the matches behind the match table of a dashboard state."""
+        generation = state['generation']
+        opponent_ids_declared, opponent_ids = get_declared_opponent_ids(
+            state['opponent_filter_type'], state['opponent_selection'], state['opponent_team_groups'],
+            state['team_groups'], generation.team_dictionary)
+        if not opponent_ids_declared:
+            # Worthy adversaries are picked from the matches
+            return get_dashboard_dataset(state)['selection']
+
+        team_ids, is_group = get_selection_team_ids(generation.team_dictionary, generation.team_aliases,
+                                                    state['team_groups'], state['selection_type'], state['team'],
+                                                    state['team_group'])
+        return {
+            'team_ids': team_ids,
+            'is_group': is_group,
+            'opponent_ids': opponent_ids,
+            'start_date': state['start_date'],
+            'end_date': state['end_date']
+        }
+
+    def load_match_table_rows(table_reference):
+        """
+        Load the match table rows a full-match-results-data reference points at.
+
+        The reference comes from the browser, so only its filter state is
+        used: the key is rebuilt from it on the current data generation, and
+        rows not in the result store under that key (never requested, or
+        expired) are computed and stored there. A client can never place rows
+        under a key of its choosing.
+
+        Args:
+            table_reference: Value of the full-match-results-data store (see make_table_reference)
+
+        Returns:
+            List of row dictionaries (empty before the first dashboard update)
+        """
+        if not table_reference or 'filters' not in table_reference:
+            return []
+        state = get_dashboard_state(*table_reference['filters'])
+        key = get_match_table_key(state)
+        rows = result_store.get(key)
+        if rows is None:
+            rows = get_match_table_data(get_dashboard_dataset(state)['matches'])
+            result_store.put(key, rows)
+        return rows
+
+    register_dashboard_section('cards', [
+        Output('games-played', 'children'),
+        Output('win-rate', 'children'),
+        Output('loss-rate-display', 'children'),
+        Output('goals-scored', 'children'),
+        Output('goals-conceded-display', 'children'),
+        Output('goal-difference', 'children')
+    ], render_dashboard_cards)
+    register_dashboard_section('time-series', [
+        Output('goal-diff-time-chart', 'figure'),
+        Output('performance-trend', 'figure')
+    ], render_dashboard_time_series)
+    register_dashboard_section('breakdowns', [
+        Output('day-of-week-chart', 'figure'),
+        Output('goal-stats-chart', 'figure'),
+        Output('goal-stats-pie', 'figure')
+    ], render_dashboard_breakdowns)
+    register_dashboard_section('opponents', [
+        Output('opponent-analysis-text', 'children'),
+        Output('opponent-comparison-chart', 'figure'),
+        Output('opponent-goal-diff-chart', 'figure'),
+        Output('opponent-analysis-section', 'style')
+    ], render_dashboard_opponents)
+    # Every section waits for the same dataset; the table section reports when it was too expensive
+    register_dashboard_section('table', [
+        Output('full-match-results-data', 'data'),
+        Output('query-status-alert', 'children'),
+        Output('query-status-alert', 'is_open')
+    ], render_dashboard_table, timeout_outputs=[no_update, EXPENSIVE_QUERY_MESSAGE, True])
+
+    @app.callback(
+        [Output('match-results-table', 'data'),
+         Output('match-results-table', 'page_count'),
+         Output('match-results-table', 'page_current'),
+         Output('match-results-page', 'data')],
+        [Input('full-match-results-data', 'data'),
+         Input('match-results-table', 'page_current'),
+         Input('match-results-table', 'sort_by'),
+         Input('match-results-table', 'filter_query'),
+         Input('result-filter-dropdown', 'value')],
+        [State('match-results-page', 'data')]
+    )
+    def update_match_results_page(table_reference, page_current, sort_by, filter_query, result_filter, page_cursor):
+        """Read the page of the match results table on screen, sorted and filtered in DuckDB (see src/match_table.py)."""
+        if not table_reference or 'filters' not in table_reference:
+            return [], 1, 0, None
+
+        state = get_dashboard_state(*table_reference['filters'])
+        generation = state['generation']
+        # Another sort, filter, dashboard selection or data generation starts again from the first page
+        query_key = make_payload_key('match-page', get_match_table_key(state), sort_by,
+                                     filter_query, result_filter)
+        try:
+            selection = get_match_table_selection(state)
+            with generation.cursor() as conn:
+                return get_match_page(conn, selection, query_key, page_current, sort_by, filter_query,
+                                      result_filter, page_cursor, state['cache_scope'])
+        except StatementTimeout as e:
+            logger.warning(f"Match table page for {state['display_name']} was too expensive: {str(e)}")
+            return no_update, no_update, no_update, no_update
+
+    def run_debug_queries(conn):
         """Run debug queries to check data quality and availability."""
+        # The queries only feed debug logging
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
         # Debug query for 2025 games
         debug_2025_query = """
         SELECT date, home_team, away_team, home_score, away_score
         FROM soccer_data
-        WHERE EXTRACT(YEAR FROM date) = 2025
+        WHERE date >= '2025-01-01' AND date < '2026-01-01'
         ORDER BY date
         """
         debug_2025_df = conn.execute(debug_2025_query).fetchdf()
@@ -163,24 +527,34 @@ def init_callbacks(app, teams, team_groups_param, conn):
         for _, row in debug_2025_df.iterrows():
             logger.debug(f"2025 Game - {row['date']} - {row['home_team']} vs {row['away_team']}")
 
-        # Debug query for team name variations
+        # Team name variations grouped under each combined team
         debug_team_names_query = """
-        SELECT DISTINCT home_team FROM soccer_data WHERE LOWER(home_team) LIKE '%k%w%' OR LOWER(home_team) LIKE '%key%'
-        UNION
-        SELECT DISTINCT away_team FROM soccer_data WHERE LOWER(away_team) LIKE '%k%w%' OR LOWER(away_team) LIKE '%key%'
+        SELECT team_aliases.canonical_name, team_dictionary.team_name
+        FROM team_aliases JOIN team_dictionary USING (team_id)
+        ORDER BY team_aliases.canonical_name, team_dictionary.team_name
         """
         debug_team_names_df = conn.execute(debug_team_names_query).fetchdf()
-        logger.debug(f"Possible Key West team name variations:")
+        logger.debug(f"Combined team name variations:")
         for _, row in debug_team_names_df.iterrows():
-            team_name = row[0]
-            logger.debug(f"Possible team name: {team_name}")
+            logger.debug(f"{row['canonical_name']}: {row['team_name']}")
 
-    def get_team_match_data(conn, team, filter_conditions):
-        """Get match data for the selected team."""
-        matches_query = get_team_matches_query(team, filter_conditions)
-        return conn.execute(matches_query).fetchdf()
+    def get_team_match_data(conn, team_dictionary, team_aliases, team, start_date, end_date, cache_scope=None):
+        """Get match data for the selected team (or combined team)."""
+        if team in team_aliases:
+            return execute_statement(conn, 'canonical_matches', cache_scope, canonical_name=team,
+                                     start_date=start_date, end_date=end_date)
 
-    def get_team_group_match_data(conn, group_name, filter_conditions):
+        team_id = team_dictionary.get_id(team)
+        if team_id is None:
+            logger.debug(f"Debug: Team '{team}' not found in the data")
+            return execute_statement(conn, 'team_matches', cache_scope, team_id=None,
+                                     start_date=start_date, end_date=end_date)
+
+        return execute_statement(conn, 'team_matches', cache_scope, team_id=team_id,
+                                 start_date=start_date, end_date=end_date)
+
+    def get_team_group_match_data(conn, team_dictionary, team_groups, group_name, start_date, end_date,
+                                  cache_scope=None):
         """Get match data for the selected team group."""
         if not group_name or group_name not in team_groups:
             logger.debug(f"Debug: Team group '{group_name}' not found or empty")
@@ -194,36 +568,34 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         logger.debug(f"Debug: Getting matches for team group '{group_name}' with {len(teams)} teams: {teams}")
 
-        # Generate and execute the query
-        matches_query = get_team_group_matches_query(teams, filter_conditions)
-
-        # Debug - log the query
-        logger.debug(f"Debug: Team group query first 200 chars: {matches_query[:200]}...")
+        return execute_statement(conn, 'group_matches', cache_scope, group_name=group_name,
+                                 start_date=start_date, end_date=end_date)
 
-        return conn.execute(matches_query).fetchdf()
-
-    def filter_matches_by_filter_type(matches_df, filter_type, opponent_selection, opponent_team_groups, competitiveness_threshold):
+    def filter_matches_by_filter_type(matches_df, filter_type, opponent_selection, opponent_team_groups, competitiveness_threshold, team_groups, team_dictionary):
         """
         Filter matches based on the selected filter type.
 
         Args:
-            matches_df: DataFrame containing match data
+            matches_df: DataFrame containing match data (teams as ids)
             filter_type: Type of filter to apply ('specific', 'worthy', 'team_groups' or 'all')
             opponent_selection: List of selected opponent teams
             opponent_team_groups: List of selected opponent team groups
             competitiveness_threshold: Threshold for worthy opponents
+            team_dictionary: TeamDictionary used to resolve opponent names to ids
 
         Returns:
             Tuple of (filtered_matches_df, display_opponent_analysis)
         """
-        filtered_matches_df = matches_df.copy()
+        # Frames are never modified in place (statement results may be shared through
+        # the query cache), and every filter below returns a new frame
+        filtered_matches_df = matches_df
         display_opponent_analysis = {'display': 'block'}
 
         if filter_type == 'specific' and opponent_selection and len(opponent_selection) > 0:
             # Filter to include only matches against specific opponents
             if not filtered_matches_df.empty:
-                filtered_matches_df = normalize_team_names_in_dataframe(filtered_matches_df)
-                filtered_matches_df = filter_matches_by_opponents(filtered_matches_df, opponent_selection)
+                opponent_ids = team_dictionary.get_ids(opponent_selection, include_variants=True)
+                filtered_matches_df = filter_matches_by_opponents(filtered_matches_df, opponent_ids)
                 logger.debug(f"Debug: Selected specific opponents: {opponent_selection}, found {len(filtered_matches_df)} matches")
             else:
                 logger.debug("Debug: No matches found in the initial dataset")
@@ -242,8 +614,8 @@ def init_callbacks(app, teams, team_groups_param, conn):
                 all_opponent_teams = list(set(all_opponent_teams))
 
                 if all_opponent_teams:
-                    filtered_matches_df = normalize_team_names_in_dataframe(filtered_matches_df)
-                    filtered_matches_df = filter_matches_by_opponents(filtered_matches_df, all_opponent_teams)
+                    opponent_ids = team_dictionary.get_ids(all_opponent_teams, include_variants=True)
+                    filtered_matches_df = filter_matches_by_opponents(filtered_matches_df, opponent_ids)
                     logger.debug(f"Debug: Filtering by {len(all_opponent_teams)} teams from {len(opponent_team_groups)} team groups")
                     logger.debug(f"Debug: Found {len(filtered_matches_df)} matches against teams in selected groups")
                 else:
@@ -255,20 +627,17 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         elif filter_type == 'worthy':
             if not filtered_matches_df.empty:
-                # Normalize team names for consistent matching
-                filtered_matches_df = normalize_team_names_in_dataframe(filtered_matches_df)
-
                 # If specific opponents are selected, these are our worthy opponents
                 if opponent_selection and len(opponent_selection) > 0 and '' not in opponent_selection:
                     logger.debug(f"Debug: Using manually selected worthy opponents: {opponent_selection}")
-                    worthy_opponents = opponent_selection
+                    worthy_opponents = list(team_dictionary.get_ids(opponent_selection, include_variants=True))
                 else:
                     # Auto-identify worthy opponents from the filtered dataset
                     worthy_opponents = identify_worthy_opponents(filtered_matches_df, competitiveness_threshold)
 
                     # Add Key West teams if they're in our filtered dataset
-                    key_west_teams = [team for team in filtered_matches_df['opponent_team'].unique()
-                                     if 'key west' in str(team).lower() and team not in worthy_opponents]
+                    key_west_teams = [team_id for team_id in filtered_matches_df['opponent_id'].unique()
+                                     if 'key west' in team_dictionary.get_name(team_id).lower() and team_id not in worthy_opponents]
 
                     if key_west_teams:
                         logger.debug(f"Debug: Adding Key West teams as worthy opponents: {key_west_teams}")
@@ -288,8 +657,8 @@ def init_callbacks(app, teams, team_groups_param, conn):
                     # Print each opponent and the number of matches against them
                     if not filtered_matches_df.empty:
                         for opponent in worthy_opponents:
-                            match_count = len(filtered_matches_df[filtered_matches_df['opponent_team'] == opponent])
-                            logger.debug(f"Debug: Found {match_count} matches against worthy opponent '{opponent}'")
+                            match_count = len(filtered_matches_df[filtered_matches_df['opponent_id'] == opponent])
+                            logger.debug(f"Debug: Found {match_count} matches against worthy opponent '{team_dictionary.get_name(opponent)}'")
                 else:
                     # No worthy opponents found
                     filtered_matches_df = pd.DataFrame(columns=filtered_matches_df.columns)
@@ -297,10 +666,6 @@ def init_callbacks(app, teams, team_groups_param, conn):
             else:
                 logger.debug("Debug: No matches found in the initial dataset")
 
-        # Remove the normalized_opponent column if it exists before further processing
-        if 'normalized_opponent' in filtered_matches_df.columns:
-            filtered_matches_df = filtered_matches_df.drop(columns=['normalized_opponent'])
-
         # Only hide opponent analysis if truly no data after filtering
         if len(filtered_matches_df) == 0:
             display_opponent_analysis = {'display': 'none'}
@@ -310,23 +675,82 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         return filtered_matches_df, display_opponent_analysis
 
-    def calculate_dashboard_metrics(filtered_matches_df):
+    def get_selection_totals(generation, team_groups, selection_type, team, team_group, start_date, end_date):
+        """Get the KPI totals of the selected team or team group from the generation's metrics index."""
+        metrics_index = generation.metrics_index
+        if selection_type == 'individual':
+            if team in generation.team_aliases:
+                return metrics_index.get_group_totals(generation.team_aliases.get_ids(team), start_date, end_date)
+            team_id = generation.team_dictionary.get_id(team)
+            if team_id is None:
+                return metrics_index.get_group_totals([], start_date, end_date)
+            return metrics_index.get_team_totals(team_id, start_date, end_date)
+
+        # 'group'
+        team_ids = generation.team_dictionary.get_ids(team_groups.get(team_group, [])) if team_group else []
+        return metrics_index.get_group_totals(team_ids, start_date, end_date)
+
+    def get_selection_team_ids(team_dictionary, team_aliases, team_groups, selection_type, team, team_group):
+        """Get the team ids of the selected team or team group, and whether it is a group."""
+        if selection_type == 'individual':
+            # A combined team counts its matches like a group of its teams
+            if team in team_aliases:
+                return team_aliases.get_ids(team), True
+            team_id = team_dictionary.get_id(team)
+            return ([] if team_id is None else [team_id]), False
+
+        # 'group'
+        team_ids = team_dictionary.get_ids(team_groups.get(team_group, [])) if team_group else []
+        return team_ids, True
+
+    def get_selection_aggregates(generation, conn, team_ids, is_group, start_date, end_date, opponent_ids, cache_scope):
+        """Get the dashboard aggregates of a selection from the generation's match engine, or from DuckDB without one."""
+        if generation.match_engine is not None:
+            return generation.match_engine.get_aggregates(team_ids, is_group, start_date, end_date, opponent_ids)
+        return get_dashboard_aggregates(conn, team_ids, is_group, start_date, end_date, opponent_ids, cache_scope)
+
+    def get_opponent_data(generation, conn, name, team_ids, is_group, start_date, end_date, cache_scope, **params):
+        """Get the opponent rows of a selection from the generation's match engine, or with the DuckDB statement name."""
+        if generation.match_engine is not None:
+            return generation.match_engine.get_opponents(team_ids, is_group, start_date, end_date)
+        return execute_statement(conn, name, cache_scope, start_date=start_date, end_date=end_date, **params)
+
+    def get_declared_opponent_ids(filter_type, opponent_selection, opponent_team_groups, team_groups, team_dictionary):
         """
-        Calculate dashboard metrics from the filtered matches data.
+        Resolve the opponent filter to team ids before any match is fetched.
+
+        Returns:
+            Tuple of (declared, opponent_ids); opponent_ids is None without an
+            opponent filter, and declared is False when the opponents depend on
+            the fetched matches (automatically identified worthy adversaries)
+        """
+        if filter_type == 'specific' and opponent_selection:
+            return True, team_dictionary.get_ids(opponent_selection, include_variants=True)
+        if filter_type == 'team_groups' and opponent_team_groups:
+            group_teams = {name for group_name in opponent_team_groups for name in team_groups.get(group_name, [])}
+            return True, team_dictionary.get_ids(group_teams, include_variants=True)
+        if filter_type == 'worthy':
+            if opponent_selection and '' not in opponent_selection:
+                return True, team_dictionary.get_ids(opponent_selection, include_variants=True)
+            return False, None
+        return True, None
+
+    def calculate_dashboard_metrics(totals):
+        """
+        Calculate the KPI card metrics of a selection.
 
         Args:
-            filtered_matches_df: DataFrame containing filtered match data
+            totals: Result and goal totals, from the metrics index (see
+                src/metrics_index.py) or the dashboard aggregates
 
         Returns:
             Dictionary of calculated metrics
         """
-        # Filter out NA results for metrics calculations
-        valid_matches_df = filtered_matches_df[filtered_matches_df['result'] != 'NA']
-        games_played = len(valid_matches_df)
+        games_played = totals['games']
 
         if games_played > 0:
-            wins = len(valid_matches_df[valid_matches_df['result'] == 'Win'])
-            losses = len(valid_matches_df[valid_matches_df['result'] == 'Loss'])
+            wins = totals['wins']
+            losses = totals['losses']
             win_rate = (wins / games_played) * 100
             loss_rate = (losses / games_played) * 100
 
@@ -334,9 +758,8 @@ def init_callbacks(app, teams, team_groups_param, conn):
             win_rate_value = f"{win_rate:.1f}%"
             loss_rate_value = f"{loss_rate:.1f}%"
 
-            # Only sum scores for matches with valid scores
-            goals_scored = valid_matches_df['team_score'].sum()
-            goals_conceded = valid_matches_df['opponent_score'].sum()
+            goals_scored = totals['goals_for']
+            goals_conceded = totals['goals_against']
             goal_diff = goals_scored - goals_conceded
         else:
             # If no valid games after filtering, set default values
@@ -346,73 +769,37 @@ def init_callbacks(app, teams, team_groups_param, conn):
             goals_conceded = 0
             goal_diff = 0
 
-        # Prepare data for the match results table from the filtered dataset
-        table_data = []
-        for _, row in filtered_matches_df.iterrows():
-            score_text = "<NA> - <NA>" if row['result'] == 'NA' else f"{row['home_score']} - {row['away_score']}"
-            table_data.append({
-                'date': row['date'].strftime('%Y-%m-%d'),
-                'home_team': row['home_team'],
-                'away_team': row['away_team'],
-                'score': score_text,
-                'result': row['result'],
-                'opponent': row['opponent_team']
-            })
-
         return {
             'games_played': games_played,
             'win_rate_value': win_rate_value,
             'loss_rate_value': loss_rate_value,
             'goals_scored': goals_scored,
             'goals_conceded': goals_conceded,
-            'goal_diff': goal_diff,
-            'table_data': table_data
+            'goal_diff': goal_diff
         }
 
-    def generate_visualizations(filtered_matches_df, team, dashboard_metrics):
+    def get_match_table_data(filtered_matches_df):
         """
-        Generate visualizations for the dashboard.
+        Prepare the rows of the match results table.
 
         Args:
             filtered_matches_df: DataFrame containing filtered match data
-            team: Selected team name
-            dashboard_metrics: Dictionary of calculated metrics
 
         Returns:
-            Dictionary of visualization figures
+            List of row dictionaries
         """
-        # Sort data by date (newest first)
-        if not filtered_matches_df.empty:
-            sorted_df = filtered_matches_df.sort_values(by='date', ascending=True)  # Sort in chronological order for charts
-        else:
-            sorted_df = pd.DataFrame(columns=filtered_matches_df.columns)  # Empty DataFrame with same columns
-
-        # Create goal differential time chart (moved from opponent analysis)
-        goal_diff_time_chart = create_goal_differential_time_chart(sorted_df, team)
-
-        # Create performance trend chart
-        performance_fig = create_performance_trend_chart(sorted_df, team)
-
-        # Create day of week performance chart with time dimension
-        day_stats_df, time_day_stats_df = calculate_day_of_week_stats(filtered_matches_df)
-        day_of_week_chart = create_day_of_week_chart(day_stats_df, time_day_stats_df, team)
-
-        # Create goal statistics chart
-        goal_fig = create_goal_stats_chart(filtered_matches_df,
-                                          dashboard_metrics['goals_scored'],
-                                          dashboard_metrics['goals_conceded'],
-                                          dashboard_metrics['goal_diff'])
-
-        # Create goal statistics pie chart
-        pie_fig = create_result_distribution_pie_chart(filtered_matches_df)
-
-        return {
-            'goal_diff_time_chart': goal_diff_time_chart,
-            'performance_fig': performance_fig,
-            'day_of_week_chart': day_of_week_chart,
-            'goal_fig': goal_fig,
-            'pie_fig': pie_fig
-        }
+        table_data = []
+        for _, row in filtered_matches_df.iterrows():
+            score_text = "<NA> - <NA>" if row['result'] == 'NA' else f"{row['home_score']} - {row['away_score']}"
+            table_data.append({
+                'date': row['date'].strftime('%Y-%m-%d'),
+                'home_team': row['home_team'],
+                'away_team': row['away_team'],
+                'score': score_text,
+                'result': row['result'],
+                'opponent': row['opponent_team']
+            })
+        return table_data
 
     def create_performance_trend_chart(sorted_df, team):
         """Create a performance trend chart showing cumulative wins, draws, and losses."""
@@ -585,23 +972,15 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         return goal_fig
 
-    def create_result_distribution_pie_chart(filtered_matches_df):
-        """Create a pie chart showing the distribution of match results."""
+    def create_result_distribution_pie_chart(filtered_matches_df, totals):
+        """Create a pie chart showing the distribution of match results (NA results excluded)."""
         pie_fig = go.Figure()
 
         if not filtered_matches_df.empty:
-            # Filter out NA results for the pie chart
-            valid_matches_df = filtered_matches_df[filtered_matches_df['result'] != 'NA']
-            results_count = valid_matches_df['result'].value_counts()
-
             # Create a better visualization with results distribution using Superset colors
             pie_fig.add_trace(go.Pie(
                 labels=['Wins', 'Draws', 'Losses'],
-                values=[
-                    results_count.get('Win', 0),
-                    results_count.get('Draw', 0),
-                    results_count.get('Loss', 0)
-                ],
+                values=[totals['wins'], totals['draws'], totals['losses']],
                 hole=0.4,
                 marker=dict(colors=['#44B78B', '#FCC700', '#E04355']),  # Superset colors
                 textinfo='label+percent',
@@ -640,51 +1019,37 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         return pie_fig
 
-    def calculate_day_of_week_stats(filtered_matches_df):
+    def calculate_day_of_week_stats(weekday_stats_df):
         """
         Calculate performance statistics by day of week with time dimension.
 
         Args:
-            filtered_matches_df: DataFrame containing filtered match data
+            weekday_stats_df: Aggregates of the filtered matches by month and weekday
+                (see get_dashboard_aggregates), one row per (month, weekday) cell
 
         Returns:
             Tuple of (DataFrame with day of week statistics, DataFrame with time-based day of week statistics)
         """
         # Create empty DataFrames if no matches
-        if filtered_matches_df.empty:
+        if weekday_stats_df.empty:
             empty_df = pd.DataFrame(columns=['day', 'total_matches', 'win_rate', 'ci_lower', 'ci_upper', 'day_order'])
             empty_time_df = pd.DataFrame(columns=['day', 'time_period', 'total_matches', 'win_rate', 'ci_lower', 'ci_upper', 'day_order'])
             return empty_df, empty_time_df
 
-        # Extract day of week from date
-        filtered_matches_df = filtered_matches_df.copy()
-        filtered_matches_df['day_of_week'] = pd.to_datetime(filtered_matches_df['date']).dt.dayofweek
-        filtered_matches_df['date_obj'] = pd.to_datetime(filtered_matches_df['date'])
-
-        # Add time period (quarter-year)
-        filtered_matches_df['year'] = filtered_matches_df['date_obj'].dt.year
-        filtered_matches_df['quarter'] = filtered_matches_df['date_obj'].dt.quarter
-        filtered_matches_df['time_period'] = filtered_matches_df['year'].astype(str) + '-Q' + filtered_matches_df['quarter'].astype(str)
-
-        # Map numeric day to name (0=Monday in pandas)
-        day_map = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday',
-                   4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
-        filtered_matches_df['day_name'] = filtered_matches_df['day_of_week'].map(day_map)
-
-        # Filter out NA results for win rate calculations
-        valid_matches_df = filtered_matches_df[filtered_matches_df['result'] != 'NA']
+        # Only cells with scored matches count towards win rates. The day name and
+        # quarter (time period) of each cell are precomputed categoricals (see src.schema.add_period_columns)
+        valid_stats_df = weekday_stats_df[weekday_stats_df['valid_matches'] > 0]
 
         # Define day order for sorting
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        day_order_map = {day: i for i, day in enumerate(day_order)}
+        day_order_map = {day: i for i, day in enumerate(DAY_NAMES)}
 
         # 1. Calculate overall day of week statistics (for backward compatibility)
-        day_groups = valid_matches_df.groupby('day_name')
+        day_groups = valid_stats_df.groupby('day_name', observed=True)[['valid_matches', 'wins']].sum()
         day_stats = []
 
-        for day, group in day_groups:
-            total_matches = len(group)
-            wins = len(group[group['result'] == 'Win'])
+        for day, group in day_groups.iterrows():
+            total_matches = int(group['valid_matches'])
+            wins = int(group['wins'])
             win_rate = wins / total_matches if total_matches > 0 else 0
 
             # Calculate confidence interval using Wilson score interval
@@ -711,7 +1076,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
         day_stats_df = pd.DataFrame(day_stats)
 
         # Add all days of the week if some are missing
-        all_days = set(day_map.values())
+        all_days = set(DAY_NAMES)
         days_in_data = set(day_stats_df['day']) if not day_stats_df.empty else set()
         missing_days = all_days - days_in_data
 
@@ -729,12 +1094,12 @@ def init_callbacks(app, teams, team_groups_param, conn):
         day_stats_df = day_stats_df.sort_values('day_order')
 
         # 2. Calculate day of week statistics by time period
-        time_day_groups = valid_matches_df.groupby(['time_period', 'day_name'])
+        time_day_groups = valid_stats_df.groupby(['time_period', 'day_name'], observed=True)[['valid_matches', 'wins']].sum()
         time_day_stats = []
 
-        for (time_period, day), group in time_day_groups:
-            total_matches = len(group)
-            wins = len(group[group['result'] == 'Win'])
+        for (time_period, day), group in time_day_groups.iterrows():
+            total_matches = int(group['valid_matches'])
+            wins = int(group['wins'])
             win_rate = wins / total_matches if total_matches > 0 else 0
 
             # Calculate confidence interval using Wilson score interval
@@ -1027,7 +1392,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         return day_of_week_chart
 
-    def generate_opponent_analysis(filtered_matches_df, opponent_filter_type, opponent_selection, opponent_team_groups, competitiveness_threshold):
+    def generate_opponent_analysis(filtered_matches_df, opponent_filter_type, opponent_selection, opponent_team_groups, competitiveness_threshold, opponent_stats_df):
         """
         Generate opponent analysis visualizations and text.
 
@@ -1037,6 +1402,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
             opponent_selection: List of selected opponents
             opponent_team_groups: List of selected opponent team groups
             competitiveness_threshold: Threshold for worthy opponents
+            opponent_stats_df: Per-opponent statistics from generate_opponent_stats_dataframe
 
         Returns:
             Dictionary of opponent analysis components
@@ -1064,13 +1430,11 @@ def init_callbacks(app, teams, team_groups_param, conn):
         # Generate opponent charts if we have data
         if len(filtered_matches_df) > 0:
             # Create opponent comparison charts using the filtered data
-            opponent_stats_df = generate_opponent_stats_dataframe(filtered_matches_df)
-
             if not opponent_stats_df.empty:
                 opponent_comparison_chart = create_opponent_comparison_chart(opponent_stats_df)
                 opponent_goal_diff_chart = create_opponent_goal_diff_chart(opponent_stats_df)
 
-                # Goal differential time chart creation removed (moved to generate_visualizations function)
+                # Goal differential time chart creation removed (rendered by the time series section)
         else:
             # Empty figures with appropriate messages
             for chart in [opponent_comparison_chart, opponent_goal_diff_chart]:
@@ -1084,29 +1448,37 @@ def init_callbacks(app, teams, team_groups_param, conn):
             'analysis_text': opponent_analysis_text,
             'comparison_chart': opponent_comparison_chart,
             'goal_diff_chart': opponent_goal_diff_chart
-            # 'goal_diff_time_chart' removed (moved to generate_visualizations function)
+            # 'goal_diff_time_chart' removed (rendered by the time series section)
         }
 
-    def generate_opponent_stats_dataframe(filtered_matches_df):
-        """Generate a DataFrame with opponent statistics."""
-        # Group data by opponent
-        opponent_groups = filtered_matches_df.groupby('opponent_team')
+    def generate_opponent_stats_dataframe(opponent_rollup_df, team_dictionary):
+        """
+        Generate a DataFrame with opponent statistics.
+
+        Args:
+            opponent_rollup_df: Aggregates of the filtered matches by opponent_id (see get_dashboard_aggregates)
+            team_dictionary: TeamDictionary used to decode the opponent names
+        """
+        # One rollup row per opponent, in opponent name order
+        opponent_rollup_df = opponent_rollup_df.dropna(subset=['opponent_id'])
+        opponent_rollup_df = team_dictionary.decode_match_columns(opponent_rollup_df).sort_values('opponent_team')
 
         # Collect opponent stats
         opponent_stats_list = []
 
-        for opponent, group in opponent_groups:
-            total_matches = len(group)
-            total_wins = len(group[group['result'] == 'Win'])
-            total_losses = len(group[group['result'] == 'Loss'])
-            total_draws = len(group[group['result'] == 'Draw'])
+        for _, group in opponent_rollup_df.iterrows():
+            opponent = group['opponent_team']
+            total_matches = int(group['matches'])
+            total_wins = int(group['wins'])
+            total_losses = int(group['losses'])
+            total_draws = int(group['draws'])
 
             win_rate_opp = total_wins / total_matches if total_matches > 0 else 0
             loss_rate_opp = total_losses / total_matches if total_matches > 0 else 0
             draw_rate_opp = total_draws / total_matches if total_matches > 0 else 0
 
-            total_goals_for = group['team_score'].sum()
-            total_goals_against = group['opponent_score'].sum()
+            total_goals_for = int(group['goals_for'])
+            total_goals_against = int(group['goals_against'])
             goal_difference = total_goals_for - total_goals_against
 
             opponent_stats_list.append({
@@ -1262,8 +1634,10 @@ def init_callbacks(app, teams, team_groups_param, conn):
             # Sort matches by date (chronological order)
             sorted_df = filtered_matches_df.sort_values(by='date', ascending=True)
 
-            # Calculate goal differential for each match
-            sorted_df['goal_diff'] = sorted_df['team_score'] - sorted_df['opponent_score']
+            # Calculate goal differential for each match. Scores are nullable Int16 (see src/schema.py),
+            # and plotly only takes plain NumPy, so the differential is float64 with NaN for missing scores
+            sorted_df['goal_diff'] = (sorted_df['team_score'] - sorted_df['opponent_score']).to_numpy(
+                dtype='float64', na_value=np.nan)
 
             # Create a cumulative goal differential line
             # First replace NA values with 0 for cumulative calculation purposes
@@ -1486,7 +1860,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
         [Input('date-preset-dropdown', 'value')]
     )
     def set_initial_load(date_preset):
-        # Just return something to trigger the update_dashboard callback
+        # Just return something to trigger the dashboard section callbacks
         return 'loaded'
 
     # Callback to update the date picker based on the preset selection
@@ -1525,8 +1899,9 @@ def init_callbacks(app, teams, team_groups_param, conn):
 
         return start_date, end_date
 
-    # Callback to show/hide opponent filter controls
-    @app.callback(
+    # Callback to show/hide opponent filter controls (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='toggleOpponentControls'),
         [
             Output('opponent-selection-div', 'style'),
             Output('worthy-adversaries-controls', 'style'),
@@ -1536,26 +1911,6 @@ def init_callbacks(app, teams, team_groups_param, conn):
         ],
         [Input('opponent-filter-type', 'value')]
     )
-    def toggle_opponent_controls(filter_type):
-        # Default dropdown style that allows proper multi-selection display
-        multi_select_style = {
-            'min-height': '38px',
-            'height': 'auto',
-            'margin-bottom': '10px',
-            'position': 'relative',
-            'zIndex': 1000,
-            'display': 'block',
-            'width': '100%'
-        }
-
-        if filter_type == 'specific':
-            return {'display': 'block'}, {'display': 'none'}, {'display': 'none'}, "Select Opponent(s):", multi_select_style
-        elif filter_type == 'worthy':
-            return {'display': 'block'}, {'display': 'block'}, {'display': 'none'}, "Worthy Adversaries:", multi_select_style
-        elif filter_type == 'team_groups':
-            return {'display': 'block'}, {'display': 'none'}, {'display': 'block'}, "Select Opponent(s):", {'display': 'none'}
-        else:  # 'all' or any other value
-            return {'display': 'none'}, {'display': 'none'}, {'display': 'none'}, "Select Opponent(s):", multi_select_style
 
     @app.callback(
         [Output('opponent-selection', 'options'),
@@ -1572,6 +1927,26 @@ def init_callbacks(app, teams, team_groups_param, conn):
         [State('opponent-selection', 'value')]  # Add this to preserve current selection
     )
     def update_opponent_options(filter_type, team, team_group, selection_type, start_date, end_date, competitiveness_threshold, current_selection):
+        # Pin the data generation for the whole request
+        generation = data_manager.current()
+        snapshot = refresh_team_groups()
+        with generation.cursor() as conn:
+            sync_team_groups(generation, conn, snapshot)
+            try:
+                return get_opponent_options(generation, conn, snapshot, filter_type, team, team_group, selection_type,
+                                            start_date, end_date, competitiveness_threshold, current_selection)
+            except StatementTimeout as e:
+                logger.warning(f"Opponent options were too expensive: {str(e)}")
+                return [], []
+
+    def get_opponent_options(generation, conn, snapshot, filter_type, team, team_group, selection_type, start_date,
+                             end_date, competitiveness_threshold, current_selection):
+        """Compute the opponent options and selection of update_opponent_options."""
+        teams = generation.teams
+        team_dictionary = generation.team_dictionary
+        team_groups = snapshot[1]
+        cache_scope = get_cache_scope(generation, snapshot)
+
         # Default opponents (all teams except selected team/group)
         if selection_type == 'individual':
             all_opponents = [{'label': t, 'value': t} for t in teams if t != team]
@@ -1581,7 +1956,9 @@ def init_callbacks(app, teams, team_groups_param, conn):
             group_teams = team_groups.get(team_group, [])
             if not group_teams:
                 return [], []  # Empty group
-            all_opponents = [{'label': t, 'value': t} for t in teams if t not in group_teams]
+            # teams is ordered by team id, so membership is an integer set lookup
+            group_team_ids = set(team_dictionary.get_ids(group_teams).tolist())
+            all_opponents = [{'label': t, 'value': t} for team_id, t in enumerate(teams) if team_id not in group_team_ids]
 
         # For 'specific' option, return all opponents and preserve current selection
         if filter_type == 'specific':
@@ -1601,10 +1978,16 @@ def init_callbacks(app, teams, team_groups_param, conn):
                 end_date = datetime.now().strftime('%Y-%m-%d')
 
             # Get data for the selected team or team group
-            filter_conditions = f"date >= '{start_date}' AND date <= '{end_date}'"
-
-            if selection_type == 'individual':
-                opponent_query = get_opponent_query_for_team(team, filter_conditions)
+            if selection_type == 'individual' and team in generation.team_aliases:
+                opponent_df = get_opponent_data(generation, conn, 'canonical_opponents',
+                                                generation.team_aliases.get_ids(team), True, start_date, end_date,
+                                                cache_scope, canonical_name=team)
+            elif selection_type == 'individual':
+                team_id = team_dictionary.get_id(team)
+                if team_id is None:
+                    return [], []  # Team not in the data
+                opponent_df = get_opponent_data(generation, conn, 'team_opponents', [team_id], False,
+                                                start_date, end_date, cache_scope, team_id=team_id)
             else:  # 'group'
                 if not team_group or team_group not in team_groups:
                     return [], []  # No valid group selected
@@ -1613,14 +1996,12 @@ def init_callbacks(app, teams, team_groups_param, conn):
                 if not group_teams:
                     return [], []  # Empty group
 
-                opponent_query = get_opponent_query_for_team_group(group_teams, filter_conditions)
-
-            # Execute query and get opponent data
-            opponent_df = conn.execute(opponent_query).fetchdf()
+                opponent_df = get_opponent_data(generation, conn, 'group_opponents',
+                                                team_dictionary.get_ids(group_teams), True, start_date, end_date,
+                                                cache_scope, group_name=team_group)
 
-            # Rename 'opponent' column to 'opponent_team' for consistency
-            if 'opponent' in opponent_df.columns and 'opponent_team' not in opponent_df.columns:
-                opponent_df = opponent_df.rename(columns={'opponent': 'opponent_team'})
+            # Decode opponent ids for the option labels
+            opponent_df = team_dictionary.decode_match_columns(opponent_df)
 
             # Calculate competitiveness for each opponent
             worthy_opponents = []
@@ -1709,26 +2090,20 @@ def init_callbacks(app, teams, team_groups_param, conn):
         # Default: return empty when 'all' is selected
         return [], []
 
-    # Add callback to hide loading spinner after initial load
-    @app.callback(
+    # Add callback to hide loading spinner after initial load (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='hideLoadingAfterInitialLoad'),
         Output("loading-spinner-container", "style"),
         [Input('initial-load', 'children')]
     )
-    def hide_loading_after_initial_load(initial_load):
-        # Hide loading spinner container after initial load
-        return {"display": "none"}
 
-    # Callback to toggle between individual team and team group selection
-    @app.callback(
+    # Callback to toggle between individual team and team group selection (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='toggleTeamSelectionType'),
         [Output('team-dropdown', 'style'),
         Output('team-group-selection-div', 'style')],
         [Input('team-selection-type', 'value')]
     )
-    def toggle_team_selection_type(selection_type):
-        if selection_type == 'individual':
-            return {'display': 'block'}, {'display': 'none'}
-        else:  # 'group'
-            return {'display': 'none'}, {'display': 'block'}
 
     @app.callback(
         [Output('edit-teams-for-group', 'value'),
@@ -1753,8 +2128,6 @@ def init_callbacks(app, teams, team_groups_param, conn):
             group_options = [{'label': name, 'value': name} for name in group_names]
             logger.debug(f"Refreshed edit-group-dropdown with {len(group_names)} options: {group_names}")
 
-            # Update the global team_groups dictionary (important for consistency)
-            logger.debug(f"Updated global team_groups, now contains: {list(team_groups.keys())}")
         except sqlite3.Error as e:
             logger.error(f"Error getting team groups: {str(e)}")
             group_options = []
@@ -1814,8 +2187,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
     def manage_team_groups(create_clicks, update_clicks, delete_clicks,
                         new_name, new_teams, edit_name, edit_teams, edit_new_name, current_selection):
         """Handle team group management operations."""
-        # Declare team_groups as global to access the module-level variable
-        global team_groups
+        team_groups = refresh_team_groups()[1]
 
         ctx = callback_context
         triggered_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
@@ -1824,7 +2196,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
         logger.debug(f"Current state - Create clicks: {create_clicks}, Update clicks: {update_clicks}, Delete clicks: {delete_clicks}")
         logger.debug(f"Edit name: {edit_name}, New name: {edit_new_name}, Edit teams count: {len(edit_teams) if edit_teams else 0}")
         logger.debug(f"Current group selection: {current_selection}")
-        logger.debug(f"BEFORE OPERATION: Global team_groups contains {len(team_groups)} groups: {list(team_groups.keys())}")
+        logger.debug(f"BEFORE OPERATION: team_groups contains {len(team_groups)} groups: {list(team_groups.keys())}")
 
         # Default return values
         status = ""
@@ -1832,16 +2204,13 @@ def init_callbacks(app, teams, team_groups_param, conn):
         new_teams_value = []
         selected_group = current_selection  # Keep current selection by default
 
-        # We're using the global team_groups variable declared at the init_callbacks level
-        # so we don't need to redeclare it here
-
         if triggered_id == 'create-group-button' and new_name and new_teams:
             # Create a new team group
             if create_team_group(new_name, new_teams):
                 status = f"Team group '{new_name}' created successfully!"
                 # Refresh team groups after successful creation
-                team_groups = get_team_groups()
-                logger.debug(f"AFTER CREATE: Global team_groups refreshed, now contains {len(team_groups)} groups: {list(team_groups.keys())}")
+                team_groups = reload_team_groups()[1]
+                logger.debug(f"AFTER CREATE: team_groups refreshed, now contains {len(team_groups)} groups: {list(team_groups.keys())}")
                 selected_group = new_name  # Auto-select newly created group
             else:
                 status = f"Failed to create team group '{new_name}'. It may already exist."
@@ -1862,8 +2231,8 @@ def init_callbacks(app, teams, team_groups_param, conn):
                     status = f"Team group '{edit_name}' updated successfully!"
 
                 # Refresh team groups after successful update
-                team_groups = get_team_groups()
-                logger.debug(f"AFTER UPDATE: Global team_groups refreshed, now contains {len(team_groups)} groups: {list(team_groups.keys())}")
+                team_groups = reload_team_groups()[1]
+                logger.debug(f"AFTER UPDATE: team_groups refreshed, now contains {len(team_groups)} groups: {list(team_groups.keys())}")
             else:
                 status = f"Failed to update team group '{edit_name}'."
 
@@ -1878,13 +2247,9 @@ def init_callbacks(app, teams, team_groups_param, conn):
                 if delete_team_group(edit_name):
                     status = f"Team group '{edit_name}' deleted successfully!"
 
-                    # Force removal from the team_groups dictionary before refreshing
-                    if edit_name in team_groups:
-                        del team_groups[edit_name]
-
                     # Refresh team groups after deletion
-                    team_groups = get_team_groups()
-                    logger.debug(f"AFTER DELETE: Global team_groups refreshed, now contains {len(team_groups)} groups: {list(team_groups.keys())}")
+                    team_groups = reload_team_groups()[1]
+                    logger.debug(f"AFTER DELETE: team_groups refreshed, now contains {len(team_groups)} groups: {list(team_groups.keys())}")
 
                     # Clear the current selection if it was the deleted group
                     if current_selection == edit_name:
@@ -1901,7 +2266,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
         # Update dropdown options for team group dropdown
         logger.debug(f"Updating team group dropdown with team groups: {list(team_groups.keys())}")
 
-        # Instead of relying only on the global variable, also query the database directly
+        # Instead of relying only on this worker's team groups, also query the database directly
         # to ensure complete consistency across all dropdowns
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -1912,7 +2277,7 @@ def init_callbacks(app, teams, team_groups_param, conn):
             team_group_options = [{'label': group_name, 'value': group_name} for group_name in db_group_names]
         except sqlite3.Error as e:
             logger.error(f"Error querying team groups for dropdown: {str(e)}")
-            # Fall back to using the global variable if database query fails
+            # Fall back to this worker's team groups if database query fails
             team_group_options = [{'label': group_name, 'value': group_name} for group_name in team_groups.keys()]
         finally:
             conn.close()
@@ -1929,32 +2294,15 @@ def init_callbacks(app, teams, team_groups_param, conn):
         logger.debug(f"Final selected group: {selected_group}")
         return status, new_name_value, new_teams_value, team_group_options, selected_group
 
-    # Callback to update URL when team group selection changes
-    @app.callback(
+    # Callback to update URL when team group selection changes (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='updateUrlTeamGroup'),
         Output('url', 'search'),
         [Input('team-group-dropdown', 'value'),
          Input('team-selection-type', 'value')],
         [State('url', 'search')],
         prevent_initial_call=True
     )
-    def update_url_team_group(selected_team_group, selection_type, current_search):
-        """Update URL with team group selection"""
-        logger.debug(f"Debug: Updating URL with team group={selected_team_group}, selection_type={selection_type}")
-
-        # Only update for team group selection type
-        if selection_type != 'group' or not selected_team_group:
-            return current_search or ''
-
-        # Parse current query string if it exists
-        query_params = parse_qs(current_search[1:]) if current_search and current_search.startswith('?') else {}
-
-        # Update or add team_group parameter
-        query_params['team_group'] = [selected_team_group]
-
-        # Return updated query string
-        updated_search = '?' + urlencode(query_params, doseq=True)
-        logger.debug(f"Debug: Updated URL search to {updated_search}")
-        return updated_search
 
     # Callback to set team dropdown selection based on URL
     @app.callback(
@@ -2020,7 +2368,8 @@ def init_callbacks(app, teams, team_groups_param, conn):
             return [{'label': name, 'value': name} for name in group_names]
         except sqlite3.Error as e:
             logger.error(f"Error querying team groups for opponent dropdown: {str(e)}")
-            # Fall back to the global variable, but still filter out current selection
+            # Fall back to this worker's team groups, but still filter out current selection
+            team_groups = team_groups_snapshot[1]
             if selection_type == 'group' and current_team_group:
                 group_names = [name for name in team_groups.keys() if name != current_team_group]
             else:
@@ -2059,52 +2408,31 @@ def init_callbacks(app, teams, team_groups_param, conn):
         # Otherwise, just return the current selection unchanged
         return current_selection
 
-    # Mobile menu toggle callback
-    @app.callback(
+    # Mobile menu toggle callback (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='toggleMobileMenu'),
         Output("mobile-menu", "style"),
         Input("mobile-menu-button", "n_clicks"),
         State("mobile-menu", "style"),
         prevent_initial_call=True
     )
-    def toggle_mobile_menu(n_clicks, current_style):
-        if current_style is None:
-            current_style = {}
-        if current_style.get("display") == "none":
-            return {"display": "block"}
-        return {"display": "none"}
-
-    # Tooltip positioning callback for AI icon
-    @app.callback(
+
+    # Tooltip positioning callback for AI icon (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='showTooltip'),
         [Output("ai-tooltip", "show"),
          Output("ai-tooltip", "bbox")],
         [Input("ai-summary-icon", "n_hover")],
         prevent_initial_call=True
     )
-    def show_tooltip(hover_data):
-        if hover_data:
-            return True, {"bottom": 0, "height": 20, "left": 0, "right": 20, "top": 20, "width": 20, "x": 10, "y": 10}
-        return False, {}
 
-    # Immediately trigger spinning animation when icon is clicked
-    @app.callback(
+    # Immediately trigger spinning animation when icon is clicked (clientside, see assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='ui', function_name='startSpinningIcon'),
         Output('ai-summary-icon', 'children', allow_duplicate=True),
         Input('ai-summary-icon', 'n_clicks'),
         prevent_initial_call=True
     )
-    def start_spinning_icon(n_clicks):
-        """Replace the robot icon with a spinner when clicked"""
-        if not n_clicks:
-            return no_update
-
-        # Replace with a spinner icon
-        return html.I(className="fas fa-spinner fa-spin", style={
-            "color": "#20A7C9",
-            "font-size": "1.25rem",
-            "padding": "6px",
-            "background-color": "rgba(32, 167, 201, 0.1)",
-            "border-radius": "50%",
-            "box-shadow": "0 0 5px rgba(32, 167, 201, 0.2)"
-        })
 
     # AI summary generation callback
     @app.callback(
@@ -2124,12 +2452,13 @@ def init_callbacks(app, teams, team_groups_param, conn):
          State('goals-scored', 'children'),
          State('goals-conceded-display', 'children'),
          State('goal-difference', 'children'),
-         State('match-results-table', 'data')],
+         State('full-match-results-data', 'data'),
+         State('result-filter-dropdown', 'value')],
         prevent_initial_call=True
     )
     def update_ai_summary(n_clicks, team, selection_type, team_group, start_date, end_date, opponent_filter,
                           games_played, win_rate, loss_rate, goals_scored,
-                          goals_conceded, goal_diff, match_data):
+                          goals_conceded, goal_diff, table_reference, result_filter):
         """Generate and display AI summary of dashboard data when icon is clicked."""
         if not n_clicks:
             return no_update, no_update, no_update
@@ -2143,9 +2472,6 @@ def init_callbacks(app, teams, team_groups_param, conn):
         if not selected_team:
             return html.Div("Please select a team to analyze."), {'display': 'block'}, normal_icon
 
-        # Convert match data to DataFrame
-        match_df = pd.DataFrame(match_data) if match_data else pd.DataFrame()
-
         # Create metrics dictionary from the values in the cards
         metrics = {
             "games_played": games_played,
@@ -2157,6 +2483,10 @@ def init_callbacks(app, teams, team_groups_param, conn):
         }
 
         try:
+            # Summarize the rows of the selected results, loaded server-side instead of uploaded by the browser
+            match_data = filter_match_rows(load_match_table_rows(table_reference), result_filter)
+            match_df = pd.DataFrame(match_data) if match_data else pd.DataFrame()
+
             # Format the date range
             date_range = [
                 start_date or "All time",
@@ -2198,21 +2528,9 @@ def init_callbacks(app, teams, team_groups_param, conn):
                 html.P(str(e))
             ], style={"color": "red"}), {'display': 'block'}, normal_icon
 
-    # New callback to filter the match results table based on the result filter dropdown
-    @app.callback(
-        Output('match-results-table', 'data', allow_duplicate=True),
-        [Input('result-filter-dropdown', 'value')],
-        [State('full-match-results-data', 'data')],
-        prevent_initial_call=True
-    )
-    def filter_match_results_table(result_filter, full_data):
-        """Filter the match results table based on selected win/loss/draw filters."""
+    def filter_match_rows(rows, result_filter):
+        """Keep the match table rows whose result is selected; no selection keeps every row."""
         # If no result filter or full data is empty, return the full data
-        if not result_filter or not full_data or len(result_filter) == 0:
-            return full_data
-
-        # Apply result filter
-        filtered_data = [row for row in full_data if row['result'] in result_filter]
-        logger.debug(f"Applied result filter: {result_filter}, {len(filtered_data)} matches remain out of {len(full_data)}")
-
-        return filtered_data
+        if not result_filter or not rows:
+            return rows
+        return [row for row in rows if row['result'] in result_filter]
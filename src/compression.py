@@ -0,0 +1,121 @@
+"""
+Compression of the Dash JSON responses.
+
+Callback responses carry several full Plotly figures (subplots, heatmaps with
+per-cell hover text) and the layout carries every dropdown option; as JSON
+they compress by an order of magnitude, and on mobile connections their
+transfer time dominates. init_compression registers an after_request hook on
+the Flask server that compresses the responses of COMPRESSED_PATHS:
+
+- the encoding is negotiated from Accept-Encoding, in the order of
+  RESPONSE_COMPRESSION (brotli needs the optional brotli package, gzip is
+  always available)
+- bodies smaller than RESPONSE_COMPRESSION_MIN_BYTES are sent as they are,
+  since compressing them saves less than it costs
+- every compressed response is logged with its size before and after, and
+  counted (see get_compression_stats)
+
+The JSON itself is produced with orjson by src/serialization.py.
+"""
+import gzip
+import os
+import threading
+
+from flask import request
+
+from src.logger import setup_logger
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it responses are gzip-compressed only
+    brotli = None
+
+logger = setup_logger(__name__)
+
+# Encodings offered to clients, in order of preference; 'none' disables compression
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'br,gzip')
+# Responses smaller than this (bytes) are not compressed
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+
+# Fast settings: callback responses are compressed on every request, never ahead of time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Dash endpoints whose responses are compressed (after the requests_pathname_prefix)
+COMPRESSED_PATHS = ('/_dash-update-component', '/_dash-layout', '/_dash-dependencies')
+
+_stats = {'responses': 0, 'bytes_before': 0, 'bytes_after': 0}
+_stats_lock = threading.Lock()
+
+
+def get_encodings(setting=RESPONSE_COMPRESSION):
+    """Get the configured encodings this process can produce, in order of preference."""
+    encodings = []
+    for encoding in setting.split(','):
+        encoding = encoding.strip().lower()
+        if encoding == 'none':
+            return []
+        if encoding == 'br' and brotli is None:
+            logger.warning("RESPONSE_COMPRESSION includes br but the brotli package is not installed")
+            continue
+        if encoding in ('br', 'gzip'):
+            encodings.append(encoding)
+        elif encoding:
+            raise ValueError(f"Unknown RESPONSE_COMPRESSION encoding: {encoding}")
+    return encodings
+
+
+def compress_body(data, encoding):
+    """Compress a response body with 'br' or 'gzip'."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def init_compression(server, encodings=None, min_bytes=RESPONSE_COMPRESSION_MIN_BYTES):
+    """
+    Compress the Dash JSON responses of a Flask server.
+
+    Args:
+        server: Flask server of the Dash app
+        encodings: Encodings in order of preference (see get_encodings); the configured ones by default
+        min_bytes: Smallest body that is compressed
+    """
+    encodings = get_encodings() if encodings is None else encodings
+    if not encodings:
+        logger.info("Response compression disabled")
+        return
+
+    @server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers or not request.path.endswith(COMPRESSED_PATHS)):
+            return response
+
+        # Caches must keep the encodings apart, whatever this response turns out to be
+        response.vary.add('Accept-Encoding')
+        encoding = next((encoding for encoding in encodings if request.accept_encodings[encoding]), None)
+        data = response.get_data()
+        if encoding is None or len(data) < min_bytes:
+            return response
+
+        compressed = compress_body(data, encoding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        with _stats_lock:
+            _stats['responses'] += 1
+            _stats['bytes_before'] += len(data)
+            _stats['bytes_after'] += len(compressed)
+        logger.debug(f"Compressed {request.path} with {encoding}: {len(data)} -> {len(compressed)} bytes")
+        return response
+
+    logger.info(f"Compressing Dash responses with {', '.join(encodings)} from {min_bytes} bytes")
+
+
+def get_compression_stats():
+    """Get the number of compressed responses of this process and their bytes before and after compression."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['ratio'] = round(stats['bytes_after'] / stats['bytes_before'], 3) if stats['bytes_before'] else None
+    return stats
@@ -0,0 +1,99 @@
+"""
+Single-flight cache of the datasets the dashboard sections render from.
+
+The dashboard is split into section callbacks (cards, time series,
+breakdowns, opponents, match table) that Dash fires together for the same
+filter state, so each section reaches the browser as soon as it is rendered.
+They all render from one dataset: the filtered matches of the selection and
+their aggregates. The first section of a filter state computes it; the
+others wait for that computation instead of repeating it.
+
+The sharing is per worker. Each section callback is a separate request, and
+gunicorn may hand the sections of one page load to different workers; on a
+cold filter state each of those workers computes the whole dataset, so a page
+load costs up to five dataset computations instead of one. The datasets hold
+DataFrames and stay in process; what crosses workers is each rendered section,
+through the shared cache (src/shared_cache.py).
+
+Keys include the data generation and team groups versions, so a dataset is
+never served for other data or other group members. Datasets are private to
+the process and shared between its threads, so they must be treated as
+read-only, like the results of the query cache (src/cache.py).
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Datasets kept per process (least recently used first out); 0 computes one per section
+DASHBOARD_DATASETS = int(os.environ.get('DASHBOARD_DATASETS', '16'))
+
+
+class DatasetCache:
+    """
+    LRU cache of computed datasets where concurrent requests for one key share a single computation.
+
+    Args:
+        max_entries: Number of datasets kept
+    """
+
+    def __init__(self, max_entries=DASHBOARD_DATASETS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """
+        Get the dataset stored under key, computing it on a miss.
+
+        While a dataset is being computed, other callers of the same key wait
+        for it. A failed computation is not cached: its waiters get the same
+        exception and the next caller computes again.
+
+        Args:
+            key: Hashable key of the filter state
+            compute: Callable producing the dataset
+
+        Returns:
+            The dataset (shared, read-only)
+        """
+        if self.max_entries <= 0:
+            return compute()
+
+        owner = False
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                future = Future()
+                self._entries[key] = future
+                self.misses += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                owner = True
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(compute())
+        except BaseException as e:
+            with self._lock:
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+            future.set_exception(e)
+            raise
+        return future.result()
+
+    def stats(self):
+        """Get the hit and miss counters and the number of cached datasets."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'max_entries': self.max_entries}
+
+
+# Shared by every dashboard section callback in this process
+dashboard_datasets = DatasetCache()
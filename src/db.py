@@ -1,15 +1,627 @@
 import os
 import sqlite3
+import hashlib
+import fcntl
+import shutil
+import queue
+import re
+import threading
+import weakref
+from contextlib import contextmanager
 import duckdb
 
-def init_duckdb_connection(parquet_file):
-    """Initialize DuckDB connection and load soccer data."""
+from src.queries import get_soccer_data_query, get_team_matches_query, get_match_rollup_query
+from src.teams import get_team_alias_rules, get_team_alias_rules_checksum
+from src.ingest import apply_match_delta, INCREMENTAL_INGEST_MAX_DELTA
+
+# Bump whenever the tables built into the serving database change shape, so a
+# stale .duckdb file left over from an older release is rebuilt on boot.
+SERVING_SCHEMA_VERSION = 9
+
+# Every ServingConnection created in this process, so gunicorn hooks can
+# release them in the master and reopen them in each forked worker.
+_serving_connections = weakref.WeakSet()
+
+# Cursors per data generation connection: at most this many threads of a
+# worker query DuckDB at once, the others wait for a free cursor
+DUCKDB_CURSOR_POOL_SIZE = int(os.environ.get('DUCKDB_CURSOR_POOL_SIZE', '4'))
+
+# DuckDB resource limits of every database handle; empty keeps DuckDB's
+# defaults (80% of RAM, one thread per core). Each worker process, and each
+# data generation while a reload overlaps with the previous one, has its own handle.
+DUCKDB_MEMORY_LIMIT = os.environ.get('DUCKDB_MEMORY_LIMIT', '')
+DUCKDB_THREADS = os.environ.get('DUCKDB_THREADS', '')
+
+# Every CursorPool created in this process, so their cursors are released with the connections
+_cursor_pools = weakref.WeakSet()
+
+
+def get_duckdb_config():
+    """Get the DuckDB configuration (resource limits) for new database handles."""
+    config = {}
+    if DUCKDB_MEMORY_LIMIT:
+        config['memory_limit'] = DUCKDB_MEMORY_LIMIT
+    if DUCKDB_THREADS:
+        config['threads'] = int(DUCKDB_THREADS)
+    return config
+
+
+def get_serving_db_path(parquet_file):
+    """Get the path of the on-disk DuckDB serving file for a parquet file."""
+    default_path = os.path.splitext(parquet_file)[0] + '.duckdb'
+    return os.environ.get('DUCKDB_FILE', default_path)
+
+
+# Files stored next to a generation serving file: its build lock and the match engine arrays (src/match_engine.py)
+MATCH_ENGINE_SUFFIX = '.engine.npy'
+SERVING_FILE_SUFFIXES = ('.lock', MATCH_ENGINE_SUFFIX)
+
+
+def get_generation_db_path(db_file, checksum):
+    """
+    Get the serving file path for one data generation.
+
+    DuckDB caches open databases per path within a process, so a reloaded
+    generation must live at a different path than the one it replaces.
+    """
+    root, ext = os.path.splitext(db_file)
+    return f"{root}.{checksum[:12]}{ext or '.duckdb'}"
+
+
+def get_serving_file_checksum(db_file, name):
+    """
+    Get the checksum prefix of a generation serving file (or one of its companion files) of db_file.
+
+    Args:
+        db_file: Base path of the serving file
+        name: Name of a file in the directory of db_file
+
+    Returns:
+        Tuple (checksum prefix, True if name is the serving database itself), or None for unrelated files
+    """
+    root, ext = os.path.splitext(db_file)
+    ext = ext or '.duckdb'
+    prefix = os.path.basename(root) + '.'
+    serving_name = name
+    for suffix in SERVING_FILE_SUFFIXES:
+        if name.endswith(suffix):
+            serving_name = name[:-len(suffix)]
+    if not serving_name.startswith(prefix) or not serving_name.endswith(ext):
+        return None
+    return serving_name[len(prefix):-len(ext)], serving_name == name
+
+
+def remove_stale_serving_files(db_file, keep):
+    """Remove generation serving files whose checksum is not in keep."""
+    directory = os.path.dirname(os.path.abspath(db_file))
+    keep_prefixes = {checksum[:12] for checksum in keep}
+
+    for name in os.listdir(directory):
+        serving_file = get_serving_file_checksum(db_file, name)
+        if serving_file is None or serving_file[0] in keep_prefixes:
+            continue
+        try:
+            # Workers still reading an unlinked file keep their open handle
+            os.remove(os.path.join(directory, name))
+            print(f"Removed stale serving database {name}")
+        except OSError as e:
+            print(f"Could not remove stale serving database {name}: {str(e)}")
+
+
+def find_latest_serving_file(db_file):
+    """Get the most recently built generation serving file of db_file, or None if there is none."""
+    directory = os.path.dirname(os.path.abspath(db_file))
+    if not os.path.isdir(directory):
+        return None
+    paths = []
+    for name in os.listdir(directory):
+        serving_file = get_serving_file_checksum(db_file, name)
+        if serving_file is not None and serving_file[1]:
+            paths.append(os.path.join(directory, name))
+    return max(paths, key=os.path.getmtime, default=None)
+
+
+def get_parquet_checksum(parquet_file):
+    """Compute a SHA-256 checksum of the parquet file contents."""
+    digest = hashlib.sha256()
+    with open(parquet_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_soccer_data(conn, parquet_file):
+    """Create the serving tables in a DuckDB connection from the parquet file."""
+    conn.execute(f"CREATE OR REPLACE TEMP VIEW raw_soccer_data AS SELECT * FROM '{parquet_file}'")
+    load_team_dictionary(conn)
+    conn.execute(f"CREATE OR REPLACE TABLE soccer_data AS {get_soccer_data_query('raw_soccer_data')}")
+    conn.execute("DROP VIEW raw_soccer_data")
+    load_team_aliases(conn, get_team_alias_rules())
+    load_team_matches(conn)
+    load_match_rollup(conn)
+    create_serving_indexes(conn)
+
+
+def load_match_rollup(conn):
+    """
+    Materialize team_match_rollup, a cube of team_matches keyed by team,
+    opponent, side, calendar month and weekday.
+
+    Each cell holds the match count, results and goal sums of its matches, so
+    breakdowns over whole months are sums over cells instead of scans over
+    matches (see src/statements.py:get_aggregates_statement).
+    """
+    conn.execute(f"CREATE OR REPLACE TABLE team_match_rollup AS {get_match_rollup_query()}")
+
+
+def create_serving_indexes(conn):
+    """
+    Create ART indexes on the team id columns.
+
+    Date ranges are served by the sort order of the tables (soccer_data in
+    date order, see src/queries.py:get_soccer_data_query, and team_matches by
+    team and date, see load_team_matches); the indexes turn lookups
+    of a single team (or a short list of teams) into index scans instead of
+    reading the whole team column.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS soccer_data_home_team_idx ON soccer_data (home_team_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS soccer_data_away_team_idx ON soccer_data (away_team_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS team_matches_team_idx ON team_matches (team_id)")
+
+
+def to_sql_literal(value):
+    """Write a parameter value (None, bool, number, string or list of them) as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(to_sql_literal(item) for item in value) + "]"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def explain_query(conn, query, analyze=True, parameters=None):
+    """
+    Get the DuckDB query plan for a query.
+
+    With analyze=True the query is executed (EXPLAIN ANALYZE) and the plan
+    shows per-operator timings and the rows each table scan actually read,
+    which is how to check that a date filter prunes row groups.
+
+    DuckDB does not bind prepared parameters in EXPLAIN, so the $parameters
+    are written into the query as literals.
+
+    Args:
+        conn: DuckDB connection (or ServingConnection)
+        query: SQL query to explain
+        analyze: Run the query and include actual row counts and timings
+        parameters: Optional values for the query's $parameters
+
+    Returns:
+        Query plan as text
+    """
+    prefix = "EXPLAIN ANALYZE" if analyze else "EXPLAIN"
+    if parameters:
+        query = re.sub(r"\$(\w+)", lambda match: to_sql_literal(parameters[match.group(1)]), query)
+    rows = conn.execute(f"{prefix} {query}").fetchall()
+    return "\n".join(row[1] for row in rows)
+
+
+def load_team_dictionary(conn):
+    """
+    Build team_dictionary, mapping every team name to an int32 id.
+
+    Ids follow alphabetical order of the names, so the id of a team is also
+    its position in the list returned by get_teams.
+    """
+    conn.execute("""
+    CREATE OR REPLACE TABLE team_dictionary AS
+    SELECT CAST(ROW_NUMBER() OVER (ORDER BY team_name) - 1 AS INTEGER) AS team_id, team_name
+    FROM (
+        SELECT home_team AS team_name FROM raw_soccer_data WHERE home_team IS NOT NULL
+        UNION
+        SELECT away_team AS team_name FROM raw_soccer_data WHERE away_team IS NOT NULL
+    )
+    ORDER BY team_id
+    """)
+
+
+def load_team_aliases(conn, rules):
+    """
+    Build team_aliases, mapping every team matched by an alias rule to its canonical team.
+
+    The patterns are matched once per distinct team name in team_dictionary,
+    so combined-team queries become plain team id filters.
+
+    Args:
+        conn: DuckDB connection
+        rules: Dictionary of canonical team name to LIKE patterns (see src.teams.get_team_alias_rules)
+    """
+    canonical_names = []
+    patterns = []
+    for canonical_name, rule_patterns in rules.items():
+        for pattern in rule_patterns:
+            canonical_names.append(canonical_name)
+            patterns.append(pattern.lower())
+
+    conn.execute("""
+    CREATE OR REPLACE TABLE team_aliases AS
+    SELECT DISTINCT rules.canonical_name, team_dictionary.team_id
+    FROM team_dictionary
+    JOIN (
+        SELECT UNNEST($canonical_names::VARCHAR[]) AS canonical_name, UNNEST($patterns::VARCHAR[]) AS pattern
+    ) rules ON LOWER(team_dictionary.team_name) LIKE rules.pattern
+    ORDER BY rules.canonical_name, team_dictionary.team_id
+    """, {'canonical_names': canonical_names, 'patterns': patterns})
+
+
+def load_team_matches(conn):
+    """
+    Materialize team_matches, the team-perspective view of soccer_data.
+
+    Every match becomes two rows, one per side (see
+    src/queries.py:get_team_matches_query). Teams are stored as ids from
+    team_dictionary, and rows are sorted by (team_id, date) so filtering on a
+    team reads a contiguous range.
+    """
+    conn.execute(f"CREATE OR REPLACE TABLE team_matches AS {get_team_matches_query()}")
+
+
+def load_team_group_members(conn, team_groups, team_dictionary):
+    """
+    Mirror the team groups into the team_group_members temporary table.
+
+    Group queries select their members with a semi-join on this table instead
+    of listing the teams in the query. It is a temporary table, so it also
+    works on the read-only serving file, but it is private to the connection.
+
+    Args:
+        conn: DuckDB connection (or ServingConnection)
+        team_groups: Dictionary of group name to team names
+        team_dictionary: TeamDictionary of the connection's data
+    """
+    group_names = []
+    team_ids = []
+    for group_name, teams in team_groups.items():
+        group_team_ids = team_dictionary.get_ids(teams).tolist()
+        group_names.extend([group_name] * len(group_team_ids))
+        team_ids.extend(group_team_ids)
+
+    conn.execute("CREATE OR REPLACE TEMPORARY TABLE team_group_members (group_name VARCHAR, team_id INTEGER)")
+    conn.execute(
+        "INSERT INTO team_group_members SELECT UNNEST($group_names::VARCHAR[]), UNNEST($team_ids::INTEGER[])",
+        {'group_names': group_names, 'team_ids': team_ids}
+    )
+
+
+def read_serving_metadata(db_file):
+    """Read the metadata stored in a serving database, or {} if it is missing or unreadable."""
+    if not os.path.exists(db_file):
+        return {}
+    try:
+        conn = duckdb.connect(database=db_file, read_only=True, config=get_duckdb_config())
+        try:
+            rows = conn.execute("SELECT key, value FROM serving_metadata").fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+    except duckdb.Error as e:
+        print(f"Could not read serving metadata from {db_file}: {str(e)}")
+        return {}
+
+
+def write_serving_metadata(conn, entries):
+    """Store the metadata entries (key to string value) in the serving_metadata table."""
+    conn.execute("CREATE OR REPLACE TABLE serving_metadata (key VARCHAR, value VARCHAR)")
+    conn.executemany("INSERT INTO serving_metadata VALUES (?, ?)", list(entries.items()))
+
+
+def ingest_serving_database(parquet_file, db_file, base_db_file, base_metadata):
+    """
+    Build a serving database by applying the parquet delta to a copy of an older one (see src/ingest.py).
+
+    Args:
+        parquet_file: Path to the source parquet file
+        db_file: Path to write the database to
+        base_db_file: Serving database of the previous generation
+        base_metadata: Metadata of base_db_file
+
+    Returns:
+        Tuple (writable connection to db_file, MatchDelta), or None if the
+        delta cannot be applied incrementally (db_file is removed again and
+        must be built in full)
+    """
+    conn = None
+    try:
+        shutil.copyfile(base_db_file, db_file)
+        conn = duckdb.connect(database=db_file, config=get_duckdb_config())
+        delta = apply_match_delta(conn, parquet_file, int(base_metadata.get('ingested_rows', '0')))
+        if delta is not None:
+            return conn, delta
+    except (OSError, duckdb.Error) as e:
+        # e.g. the base file was removed as stale by another worker in the meantime
+        print(f"Could not ingest {parquet_file} incrementally: {str(e)}")
+
+    if conn is not None:
+        conn.close()
+    if os.path.exists(db_file):
+        os.remove(db_file)
+    return None
+
+
+def build_serving_database(parquet_file, db_file, checksum=None, base_db_file=None):
+    """
+    Build the on-disk DuckDB serving file for a parquet file, or reuse it.
+
+    The file is only rebuilt when the parquet checksum, the serving schema
+    version or the team alias rules differ from what is recorded in it. The
+    new file is written next to the old one and moved into place with
+    os.replace, so readers that still have the old file open keep seeing a
+    consistent database.
+
+    When base_db_file is the serving database of an older parquet file with
+    the same schema and alias rules, only the matches that differ are applied
+    to a copy of it (see src/ingest.py); otherwise every table is built from
+    the parquet file.
+
+    Args:
+        parquet_file: Path to the source parquet file
+        db_file: Path of the serving database to build
+        checksum: Precomputed parquet checksum (computed if omitted)
+        base_db_file: Optional serving database of the previous generation
+
+    Returns:
+        True if the file was rebuilt, False if the existing file was reused
+    """
+    if not os.path.exists(parquet_file):
+        raise FileNotFoundError(f"Parquet file not found at: {parquet_file}")
+
+    checksum = checksum or get_parquet_checksum(parquet_file)
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+
+    # Serialize builds across processes sharing the same data directory
+    with open(f"{db_file}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            metadata = read_serving_metadata(db_file)
+            alias_rules_checksum = get_team_alias_rules_checksum(get_team_alias_rules())
+            if (metadata.get('parquet_checksum') == checksum and
+                    metadata.get('schema_version') == str(SERVING_SCHEMA_VERSION) and
+                    metadata.get('alias_rules_checksum') == alias_rules_checksum):
+                print(f"Reusing serving database at {db_file} (checksum {checksum[:12]})")
+                return False
+
+            tmp_file = f"{db_file}.tmp-{os.getpid()}"
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+            entries = {
+                'parquet_checksum': checksum,
+                'parquet_file': os.path.abspath(parquet_file),
+                'schema_version': str(SERVING_SCHEMA_VERSION),
+                'alias_rules_checksum': alias_rules_checksum,
+            }
+            ingested = None
+            base_metadata = {}
+            if base_db_file and base_db_file != db_file and INCREMENTAL_INGEST_MAX_DELTA > 0:
+                base_metadata = read_serving_metadata(base_db_file)
+            if (base_metadata.get('schema_version') == str(SERVING_SCHEMA_VERSION) and
+                    base_metadata.get('alias_rules_checksum') == alias_rules_checksum):
+                print(f"Ingesting {parquet_file} into a copy of {base_db_file}")
+                ingested = ingest_serving_database(parquet_file, tmp_file, base_db_file, base_metadata)
+
+            if ingested is not None:
+                conn, delta = ingested
+                entries['base_checksum'] = base_metadata['parquet_checksum']
+                entries['ingested_rows'] = str(int(base_metadata.get('ingested_rows', '0')) + delta.rows)
+            else:
+                print(f"Building serving database at {db_file} from {parquet_file}")
+                conn = duckdb.connect(database=tmp_file, config=get_duckdb_config())
+            try:
+                if ingested is None:
+                    load_soccer_data(conn, parquet_file)
+                write_serving_metadata(conn, entries)
+                conn.execute("CHECKPOINT")
+            finally:
+                conn.close()
+
+            os.replace(tmp_file, db_file)
+            print(f"Serving database ready at {db_file}, size: {os.path.getsize(db_file)} bytes")
+            return True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ServingConnection:
+    """
+    Read-only connection to the on-disk DuckDB serving file.
+
+    DuckDB connections must not be carried across fork(), so the gunicorn
+    master releases its handle once the app is preloaded and every worker
+    reopens its own handle in post_fork. All workers read the same file, so
+    the OS page cache is shared instead of each process holding a full copy.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._conn = None
+        # Number of handles opened so far; temporary tables live in a handle
+        # and have to be recreated after every reopen
+        self.session = 0
+        self.reopen()
+        _serving_connections.add(self)
+
+    def reopen(self):
+        """Open a fresh read-only handle on the serving file."""
+        self._conn = duckdb.connect(database=self.db_file, read_only=True, config=get_duckdb_config())
+        self.session += 1
+
+    def release(self):
+        """Close the handle held by this process (e.g. the gunicorn master before forking)."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def execute(self, query, parameters=None):
+        """Execute a query, opening the handle lazily if it was released."""
+        if self._conn is None:
+            self.reopen()
+        if parameters is None:
+            return self._conn.execute(query)
+        return self._conn.execute(query, parameters)
+
+    def interrupt(self):
+        """Interrupt the query running on the handle (called from another thread)."""
+        if self._conn is not None:
+            self._conn.interrupt()
+
+    def cursor(self):
+        """Open a cursor on the current handle; it shares the database but can be used by another thread."""
+        if self._conn is None:
+            self.reopen()
+        return self._conn.cursor()
+
+    def close(self):
+        self.release()
+        _serving_connections.discard(self)
+
+
+class PooledCursor:
+    """
+    DuckDB cursor handed out by a CursorPool.
+
+    Temporary tables are private to a cursor, so the cursor carries the
+    session of the handle it was opened on (see ServingConnection.session)
+    and is compared by identity like a connection.
+    """
+
+    def __init__(self, cursor, session):
+        self._cursor = cursor
+        self.session = session
+
+    def execute(self, query, parameters=None):
+        if parameters is None:
+            return self._cursor.execute(query)
+        return self._cursor.execute(query, parameters)
+
+    def interrupt(self):
+        """Interrupt the query running on this cursor (called from another thread)."""
+        self._cursor.interrupt()
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except duckdb.Error:
+            pass
+
+
+class CursorPool:
+    """
+    Bounded pool of cursors on one DuckDB connection.
+
+    A DuckDB connection must not be used by several threads at once, but
+    cursors of the same connection can: each thread checks out its own
+    cursor and DuckDB runs their queries in parallel. Cursors are reused
+    between requests and replaced after the connection was reopened.
+
+    Args:
+        conn: ServingConnection or in-memory DuckDB connection
+        size: Maximum number of cursors checked out at once
+    """
+
+    def __init__(self, conn, size=DUCKDB_CURSOR_POOL_SIZE):
+        self.conn = conn
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        _cursor_pools.add(self)
+
+    def checkout(self, blocking=True):
+        """
+        Take a cursor out of the pool; return it with checkin.
+
+        Args:
+            blocking: Wait while all cursors are in use; otherwise return None right away
+
+        Returns:
+            PooledCursor, or None if blocking is False and no cursor is free
+        """
+        if not self._slots.acquire(blocking):
+            return None
+        try:
+            session = getattr(self.conn, 'session', 0)
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+            if pooled is None or pooled.session != session:
+                # Cursors of an older handle were opened before a reopen (or fork) and are dropped
+                pooled = PooledCursor(self.conn.cursor(), session)
+            return pooled
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, pooled):
+        """Return a cursor taken with checkout."""
+        self._idle.put(pooled)
+        self._slots.release()
+
+    @contextmanager
+    def cursor(self):
+        """Check out a cursor for the calling thread, waiting while all of them are in use."""
+        pooled = self.checkout()
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+
+    def release(self):
+        """Close the idle cursors (e.g. in the gunicorn master before forking)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def release_serving_connections():
+    """Release every serving connection held by this process."""
+    for cursor_pool in list(_cursor_pools):
+        cursor_pool.release()
+    for serving_conn in list(_serving_connections):
+        serving_conn.release()
+
+
+def reopen_serving_connections():
+    """Reopen every serving connection in this process (call after fork)."""
+    for serving_conn in list(_serving_connections):
+        serving_conn.reopen()
+
+
+def init_duckdb_connection(parquet_file, db_file=None, checksum=None, base_db_file=None):
+    """
+    Initialize DuckDB connection and load soccer data.
+
+    With db_file set, the data is served from a persistent read-only DuckDB
+    file that is rebuilt only when the parquet file changes, incrementally
+    from base_db_file when given (see build_serving_database). Without it, the
+    data is loaded into a private in-memory database.
+    """
     try:
         if not os.path.exists(parquet_file):
             raise FileNotFoundError(f"Parquet file not found at: {parquet_file}")
 
-        conn = duckdb.connect(database=':memory:')
-        conn.execute(f"CREATE OR REPLACE TABLE soccer_data AS SELECT * FROM '{parquet_file}'")
+        if db_file:
+            build_serving_database(parquet_file, db_file, checksum, base_db_file)
+            conn = ServingConnection(db_file)
+            print(f"Successfully opened read-only serving database {db_file} for {parquet_file}")
+            return conn
+
+        conn = duckdb.connect(database=':memory:', config=get_duckdb_config())
+        load_soccer_data(conn, parquet_file)
         print(f"Successfully initialized DuckDB connection and loaded data from {parquet_file}")
         return conn
     except Exception as e:
@@ -17,13 +629,11 @@ def init_duckdb_connection(parquet_file):
         raise
 
 def get_teams(conn):
-    """Get list of teams from the soccer data."""
+    """Get list of teams from the soccer data, ordered by team id (alphabetically)."""
     try:
         teams_query = """
-        SELECT DISTINCT home_team AS team FROM soccer_data
-        UNION
-        SELECT DISTINCT away_team AS team FROM soccer_data
-        ORDER BY team
+        SELECT team_name AS team FROM team_dictionary
+        ORDER BY team_id
         """
         teams_df = conn.execute(teams_query).fetchdf()
         teams = teams_df['team'].tolist()
@@ -52,8 +662,8 @@ def init_db():
     init_team_db()
 
 
-def init_team_db():
-    """Initialize the SQLite database for team groups."""
+def get_team_db_path():
+    """Get the path of the SQLite team groups database."""
     # Always use the absolute path that matches the LiteFS mount point in deployment
     # But fall back to the relative path for local development
     if os.path.exists('/app/data'):
@@ -64,6 +674,12 @@ def init_team_db():
         dir_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         os.makedirs(dir_path, exist_ok=True)
         db_path = os.path.join(dir_path, 'team_groups.db')
+    return db_path
+
+
+def init_team_db():
+    """Initialize the SQLite database for team groups."""
+    db_path = get_team_db_path()
 
     print(f"Initializing SQLite database at {db_path}")
 
@@ -123,16 +739,7 @@ def init_team_db():
 
 def get_db_connection():
     """Get a SQLite database connection."""
-    # Always use the absolute path that matches the LiteFS mount point in deployment
-    # But fall back to the relative path for local development
-    if os.path.exists('/app/data'):
-        # In production (Docker/Fly.io)
-        db_path = "/app/data/team_groups.db"
-    else:
-        # Local development
-        dir_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-        os.makedirs(dir_path, exist_ok=True)
-        db_path = os.path.join(dir_path, 'team_groups.db')
+    db_path = get_team_db_path()
 
     print(f"Connecting to database at {db_path}")
 
@@ -155,6 +762,28 @@ def get_db_connection():
     return conn
 
 
+def get_team_groups_version():
+    """
+    Get the version of the team groups (SQLite user_version).
+
+    Every committed create, update or delete bumps the version, so a process
+    can tell whether its copy of the team groups is stale. This is read on
+    every dashboard request, so it skips the connection logging of
+    get_db_connection.
+    """
+    conn = sqlite3.connect(get_team_db_path())
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def bump_team_groups_version(cursor):
+    """Increment the team groups version inside the current write transaction."""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    cursor.execute(f"PRAGMA user_version = {int(version) + 1}")
+
+
 def create_team_group(name, teams):
     """Create a new team group with the specified teams."""
     if not name or not teams:
@@ -200,6 +829,7 @@ def create_team_group(name, teams):
                 (group_id, team)
             )
 
+        bump_team_groups_version(cursor)
         conn.commit()
 
         # Verify the data was written by reading it back
@@ -297,6 +927,7 @@ def update_team_group(name, teams, new_name=None):
                 (group_id, team)
             )
 
+        bump_team_groups_version(cursor)
         conn.commit()
         print(f"Updated team group '{name}' with {len(teams)} teams")
         return True
@@ -361,6 +992,7 @@ def delete_team_group(name):
             return False
 
         # Commit and return success
+        bump_team_groups_version(cursor)
         conn.commit()
         print(f"Successfully deleted team group '{name}' with ID {group_id}")
         return True
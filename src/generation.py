@@ -0,0 +1,219 @@
+"""
+Data generation management for the soccer dashboard.
+
+A data generation is one immutable snapshot of the served match data: the
+DuckDB connection, the team list, the date range and the in-memory indexes
+(and optional match engine) derived from them. The DataManager watches
+the parquet file and, when its contents change, builds the next generation in
+the background and swaps it in atomically. Callbacks grab the current
+generation once at the start of a request and use it throughout, so in-flight
+requests finish on the generation they started with.
+"""
+import os
+import threading
+import time
+import weakref
+
+from src.db import (
+    init_duckdb_connection,
+    get_teams,
+    get_date_range,
+    get_parquet_checksum,
+    get_generation_db_path,
+    find_latest_serving_file,
+    remove_stale_serving_files,
+    CursorPool,
+)
+from src.teams import TeamDictionary, TeamAliases
+from src.metrics_index import TeamMetricsIndex
+from src.match_engine import MatchEngine, MATCH_ENGINE, get_match_engine_path
+from src.ingest import read_affected_team_ids
+from src.team_groups import TeamGroupMirror
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Seconds between checks of the parquet file; 0 disables hot reload
+DEFAULT_RELOAD_INTERVAL = int(os.environ.get('DATA_RELOAD_INTERVAL', '60'))
+
+# Every DataManager in this process, so gunicorn hooks can start their watchers after fork
+_data_managers = weakref.WeakSet()
+
+
+class DataGeneration:
+    """One loaded snapshot of the match data."""
+
+    def __init__(self, version, conn, team_dictionary, team_aliases, metrics_index, min_date, max_date, checksum, mtime,
+                 match_engine=None, affected_team_ids=None):
+        self.version = version
+        self.conn = conn
+        # Requests query through pooled cursors, so one worker can serve several threads
+        self.cursors = CursorPool(conn)
+        self.team_dictionary = team_dictionary
+        self.team_aliases = team_aliases
+        # Team names ordered by team id
+        self.teams = team_dictionary.names
+        self.metrics_index = metrics_index
+        # NumPy match engine serving the hot path instead of DuckDB, or None (see src/match_engine.py)
+        self.match_engine = match_engine
+        # Team groups are mirrored into the connection on demand (see src/team_groups.py)
+        self.team_group_mirror = TeamGroupMirror(team_dictionary)
+        self.min_date = min_date
+        self.max_date = max_date
+        self.checksum = checksum
+        self.mtime = mtime
+        # Ids of the teams whose matches differ from the previous generation, or None if
+        # any team may differ (see src/ingest.py)
+        self.affected_team_ids = affected_team_ids
+
+    def cursor(self):
+        """Check out a cursor for the calling thread (context manager, see CursorPool)."""
+        return self.cursors.cursor()
+
+    def __repr__(self):
+        return f"DataGeneration(version={self.version}, checksum={self.checksum[:12]}, teams={len(self.teams)})"
+
+
+class DataManager:
+    """
+    Owns the current data generation and reloads it when the parquet file changes.
+
+    Args:
+        parquet_file: Path to the source parquet file
+        db_file: Base path of the DuckDB serving file, or None to serve from memory
+        reload_interval: Seconds between parquet checks in the watcher thread
+    """
+
+    def __init__(self, parquet_file, db_file=None, reload_interval=DEFAULT_RELOAD_INTERVAL):
+        self.parquet_file = parquet_file
+        self.db_file = db_file
+        self.reload_interval = reload_interval
+        self._generation = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self._listeners = []
+        _data_managers.add(self)
+
+    def load(self):
+        """Load the initial generation synchronously."""
+        stat = os.stat(self.parquet_file)
+        self._swap(self._build_generation(get_parquet_checksum(self.parquet_file), stat.st_mtime))
+        return self._generation
+
+    def current(self):
+        """Return the generation that new requests should use."""
+        return self._generation
+
+    @property
+    def version(self):
+        return self._generation.version if self._generation else 0
+
+    def add_listener(self, listener):
+        """Register a callable invoked with (old_generation, new_generation) after every swap."""
+        self._listeners.append(listener)
+
+    def check_for_update(self):
+        """
+        Reload the data if the parquet file changed since the current generation was built.
+
+        The mtime is checked first so the common no-change case costs one stat();
+        the checksum guards against touches that do not change the contents.
+
+        Returns:
+            True if a new generation was swapped in
+        """
+        with self._lock:
+            current = self._generation
+            try:
+                mtime = os.stat(self.parquet_file).st_mtime
+            except FileNotFoundError:
+                logger.warning(f"Parquet file {self.parquet_file} is missing, keeping generation {current.version}")
+                return False
+
+            if current is not None and mtime == current.mtime:
+                return False
+
+            checksum = get_parquet_checksum(self.parquet_file)
+            if current is not None and checksum == current.checksum:
+                current.mtime = mtime
+                return False
+
+            logger.info(f"Parquet file changed (checksum {checksum[:12]}), building new data generation")
+            started = time.perf_counter()
+            self._swap(self._build_generation(checksum, mtime))
+            logger.info(f"Swapped in data generation {self._generation.version} "
+                        f"in {time.perf_counter() - started:.2f}s")
+            return True
+
+    def start_watching(self):
+        """Start the background thread that polls the parquet file for changes."""
+        if self.reload_interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name='data-generation-watcher', daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.parquet_file} for changes every {self.reload_interval}s")
+
+    def stop_watching(self):
+        self._stop_event.set()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.reload_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                # Keep serving the current generation if a reload fails
+                logger.error(f"Error reloading data from {self.parquet_file}: {str(e)}")
+
+    def _build_generation(self, checksum, mtime):
+        current = self._generation
+        db_file = None
+        base_db_file = None
+        if self.db_file:
+            db_file = get_generation_db_path(self.db_file, checksum)
+            # Serving files are built incrementally on top of the previous generation's file,
+            # or on boot on top of the latest one left in the data directory
+            if current is not None:
+                base_db_file = get_generation_db_path(self.db_file, current.checksum)
+            else:
+                base_db_file = find_latest_serving_file(self.db_file)
+        conn = init_duckdb_connection(self.parquet_file, db_file, checksum, base_db_file)
+        team_dictionary = TeamDictionary(get_teams(conn))
+        team_aliases = TeamAliases.from_connection(conn)
+        metrics_index = TeamMetricsIndex.from_connection(conn, len(team_dictionary))
+        match_engine = None
+        if MATCH_ENGINE == 'numpy':
+            match_engine = MatchEngine.from_connection(conn, len(team_dictionary),
+                                                       get_match_engine_path(db_file) if db_file else None)
+        elif MATCH_ENGINE != 'duckdb':
+            raise ValueError(f"Unknown MATCH_ENGINE: {MATCH_ENGINE}")
+        min_date, max_date = get_date_range(conn)
+        affected_team_ids = None
+        if db_file and current is not None:
+            affected_team_ids = read_affected_team_ids(conn, current.checksum)
+        return DataGeneration(self._version + 1, conn, team_dictionary, team_aliases, metrics_index,
+                              min_date, max_date, checksum, mtime, match_engine, affected_team_ids)
+
+    def _swap(self, generation):
+        old_generation = self._generation
+        self._version = generation.version
+        # A single reference assignment, so readers see either the old or the new generation.
+        # The old connection is closed when the last in-flight request drops its reference.
+        self._generation = generation
+
+        if self.db_file and old_generation is not None:
+            remove_stale_serving_files(self.db_file, keep={old_generation.checksum, generation.checksum})
+
+        for listener in self._listeners:
+            try:
+                listener(old_generation, generation)
+            except Exception as e:
+                logger.error(f"Error in data generation listener: {str(e)}")
+
+
+def start_data_watchers():
+    """Start the parquet watcher of every DataManager in this process (call after fork)."""
+    for data_manager in list(_data_managers):
+        data_manager.start_watching()
@@ -0,0 +1,257 @@
+"""
+Incremental ingestion of a new parquet file into a copy of the previous serving database.
+
+The daily refresh replaces the parquet file wholesale, but usually only a few
+dozen matches are new, corrected or withdrawn. Instead of rebuilding every
+serving table, the serving file of the previous generation is copied and only
+the delta is applied to the copy (see src/db.py:build_serving_database):
+
+- soccer_data keeps row_hash, a 64-bit hash of all parquet columns of a row
+  (src/queries.py:get_soccer_data_query). Rows whose hash is found in both
+  files are left alone; current rows missing from the new file are removed
+  and new rows are inserted.
+- A removed and an inserted row with the same (date, home_team, away_team)
+  key are reported as one changed match, e.g. a corrected score.
+- Removed rows are deleted from soccer_data and team_matches, inserted rows
+  get match ids after the current maximum, and the team_match_rollup cells of
+  every (team, month) touched by the delta are recomputed.
+
+The ids of the teams whose matches changed are stored in the ingest_delta
+table, so every worker opening the new generation can keep the cached results
+of all other teams (see read_affected_team_ids).
+
+A delta that adds a team or removes the last match of one cannot be applied
+in place, since team ids follow the alphabetical order of all team names;
+neither can a change of the parquet columns. Inserted rows are also out of the
+sort order that keeps date and team scans contiguous, so once more than
+INCREMENTAL_INGEST_MAX_DELTA of the rows were ingested since the last full
+build, the next refresh rebuilds in full. apply_match_delta returns None in
+all of these cases.
+
+Matches inserted by an ingestion get higher match ids than after a full
+build, so matches a team played on the same day may be listed in another
+order; every other result is identical.
+"""
+import os
+import time
+
+from src.queries import get_soccer_data_query, get_team_matches_query, get_match_rollup_query
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Largest share of the rows that may have been ingested incrementally since the
+# last full build; 0 always rebuilds the serving database in full
+INCREMENTAL_INGEST_MAX_DELTA = float(os.environ.get('INCREMENTAL_INGEST_MAX_DELTA', '0.2'))
+
+# Columns soccer_data adds to the parquet columns
+DERIVED_COLUMNS = ('match_id', 'row_hash', 'home_team_id', 'away_team_id')
+
+# Rows of two tables are the same match (aliases c and i)
+SAME_MATCH = """c.date IS NOT DISTINCT FROM i.date
+        AND c.home_team IS NOT DISTINCT FROM i.home_team
+        AND c.away_team IS NOT DISTINCT FROM i.away_team"""
+
+
+class MatchDelta:
+    """
+    Matches added, changed and removed by an incremental ingestion.
+
+    Args:
+        added: Number of matches only in the new parquet file
+        changed: Number of matches in both files whose columns differ
+        removed: Number of matches no longer in the parquet file
+        affected_team_ids: Ids of the teams playing in any of these matches
+    """
+
+    def __init__(self, added, changed, removed, affected_team_ids):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.affected_team_ids = affected_team_ids
+
+    @property
+    def rows(self):
+        """Number of soccer_data rows deleted or inserted."""
+        return self.added + 2 * self.changed + self.removed
+
+    def __repr__(self):
+        return (f"MatchDelta(added={self.added}, changed={self.changed}, removed={self.removed}, "
+                f"teams={len(self.affected_team_ids)})")
+
+
+def get_columns(conn, query):
+    """Get the (name, type) pairs of the columns of a query."""
+    return [(row[0], row[1]) for row in conn.execute(f"DESCRIBE {query}").fetchall()]
+
+
+def find_changed_rows(conn, source):
+    """
+    Find the rows that differ between soccer_data and the parquet rows of source.
+
+    The row hashes of both sides are counted in one aggregation; only hashes
+    whose counts differ are read again. Of identical rows (same hash), the
+    surplus on either side is removed or inserted.
+
+    Creates the temporary tables removed_rows (match_id and match key of the
+    soccer_data rows to delete) and inserted_rows (parquet rows to insert).
+    """
+    conn.execute(f"""
+    CREATE OR REPLACE TEMP TABLE changed_hashes AS
+    SELECT row_hash,
+        COUNT(*) FILTER (WHERE is_current) AS current_count,
+        COUNT(*) FILTER (WHERE NOT is_current) AS incoming_count
+    FROM (
+        SELECT row_hash, TRUE AS is_current FROM soccer_data
+        UNION ALL
+        SELECT hash(raw) AS row_hash, FALSE AS is_current FROM {source} raw
+    )
+    GROUP BY row_hash
+    HAVING current_count <> incoming_count
+    """)
+    conn.execute("""
+    CREATE OR REPLACE TEMP TABLE removed_rows AS
+    SELECT match_id, date, home_team, away_team
+    FROM (
+        SELECT s.match_id, s.date, s.home_team, s.away_team, h.current_count - h.incoming_count AS surplus,
+            ROW_NUMBER() OVER (PARTITION BY s.row_hash ORDER BY s.match_id DESC) AS position
+        FROM soccer_data s
+        JOIN changed_hashes h ON h.row_hash = s.row_hash AND h.current_count > h.incoming_count
+    )
+    WHERE position <= surplus
+    """)
+    conn.execute(f"""
+    CREATE OR REPLACE TEMP TABLE inserted_rows AS
+    SELECT * EXCLUDE (row_hash, surplus, position)
+    FROM (
+        SELECT raw.*, h.row_hash, h.incoming_count - h.current_count AS surplus,
+            ROW_NUMBER() OVER (PARTITION BY h.row_hash) AS position
+        FROM {source} raw
+        JOIN changed_hashes h ON h.row_hash = hash(raw) AND h.incoming_count > h.current_count
+    )
+    WHERE position <= surplus
+    """)
+
+
+def apply_match_delta(conn, parquet_file, ingested_rows=0):
+    """
+    Apply the difference between a serving database and a new parquet file to the database.
+
+    Args:
+        conn: Writable DuckDB connection to a copy of the previous serving database
+        parquet_file: Path to the new parquet file
+        ingested_rows: Rows already ingested incrementally since the database was last built in full
+
+    Returns:
+        MatchDelta, or None if the delta cannot be applied in place (the copy
+        must be discarded and the database rebuilt in full)
+    """
+    started = time.perf_counter()
+    source = f"'{parquet_file}'"
+    current_columns = get_columns(conn, f"SELECT * EXCLUDE ({', '.join(DERIVED_COLUMNS)}) FROM soccer_data")
+    if get_columns(conn, f"SELECT * FROM {source}") != current_columns:
+        logger.info(f"Columns of {parquet_file} changed, rebuilding in full")
+        return None
+
+    find_changed_rows(conn, source)
+    removed, inserted, changed, total_rows = conn.execute(f"""
+    SELECT
+        (SELECT COUNT(*) FROM removed_rows),
+        (SELECT COUNT(*) FROM inserted_rows),
+        (SELECT COALESCE(SUM(LEAST(c.count, i.count)), 0)
+         FROM (SELECT date, home_team, away_team, COUNT(*) AS count FROM removed_rows GROUP BY ALL) c
+         JOIN (SELECT date, home_team, away_team, COUNT(*) AS count FROM inserted_rows GROUP BY ALL) i
+         ON {SAME_MATCH}),
+        (SELECT COUNT(*) FROM soccer_data) + (SELECT COUNT(*) FROM inserted_rows) - (SELECT COUNT(*) FROM removed_rows)
+    """).fetchone()
+    delta_rows = ingested_rows + removed + inserted
+    if delta_rows > INCREMENTAL_INGEST_MAX_DELTA * total_rows:
+        logger.info(f"{delta_rows} of {total_rows} rows ingested since the last full build, rebuilding in full")
+        return None
+
+    # Team sides of the removed matches, read before their rows are deleted
+    conn.execute("""
+    CREATE OR REPLACE TEMP TABLE removed_sides AS
+    SELECT team_id, CAST(date_trunc('month', date) AS DATE) AS month
+    FROM team_matches
+    WHERE match_id IN (SELECT match_id FROM removed_rows)
+    """)
+    new_teams, missing_teams = conn.execute("""
+    WITH inserted_names AS (
+        SELECT home_team AS team_name FROM inserted_rows WHERE home_team IS NOT NULL
+        UNION
+        SELECT away_team AS team_name FROM inserted_rows WHERE away_team IS NOT NULL
+    ),
+    removed_counts AS (
+        SELECT team_id, COUNT(*) AS count FROM removed_sides GROUP BY team_id
+    ),
+    current_counts AS (
+        SELECT team_id, COUNT(*) AS count FROM team_matches
+        WHERE team_id IN (SELECT team_id FROM removed_counts)
+        GROUP BY team_id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM inserted_names WHERE team_name NOT IN (SELECT team_name FROM team_dictionary)),
+        (SELECT COUNT(*) FROM removed_counts r JOIN current_counts c USING (team_id)
+         WHERE r.count = c.count
+           AND team_id NOT IN (SELECT team_id FROM team_dictionary
+                               WHERE team_name IN (SELECT team_name FROM inserted_names)))
+    """).fetchone()
+    if new_teams or missing_teams:
+        logger.info(f"{new_teams} teams added and {missing_teams} teams removed, rebuilding in full")
+        return None
+
+    first_match_id = conn.execute("SELECT COALESCE(MAX(match_id), -1) + 1 FROM soccer_data").fetchone()[0]
+    conn.execute("DELETE FROM team_matches WHERE match_id IN (SELECT match_id FROM removed_rows)")
+    conn.execute("DELETE FROM soccer_data WHERE match_id IN (SELECT match_id FROM removed_rows)")
+    conn.execute(f"INSERT INTO soccer_data {get_soccer_data_query('inserted_rows', first_match_id)}")
+    conn.execute(f"INSERT INTO team_matches {get_team_matches_query(f'match_id >= {first_match_id}')}")
+
+    # Rollup cells of every (team, month) with a removed or inserted match; cells
+    # without any match left disappear, like in a full build
+    conn.execute(f"""
+    CREATE OR REPLACE TEMP TABLE affected_cells AS
+    SELECT team_id, month FROM removed_sides
+    UNION
+    SELECT team_id, CAST(date_trunc('month', date) AS DATE) AS month
+    FROM team_matches
+    WHERE match_id >= {first_match_id}
+    """)
+    cells = "(team_id, month) IN (SELECT team_id, month FROM affected_cells)"
+    conn.execute(f"DELETE FROM team_match_rollup WHERE {cells}")
+    conn.execute(f"""
+    INSERT INTO team_match_rollup
+    {get_match_rollup_query("team_id IN (SELECT team_id FROM affected_cells) AND "
+                            "(team_id, CAST(date_trunc('month', date) AS DATE)) IN "
+                            "(SELECT team_id, month FROM affected_cells)")}
+    """)
+
+    conn.execute("""
+    CREATE OR REPLACE TABLE ingest_delta AS
+    SELECT DISTINCT team_id FROM affected_cells ORDER BY team_id
+    """)
+    affected_team_ids = frozenset(row[0] for row in conn.execute("SELECT team_id FROM ingest_delta").fetchall())
+    for table in ('changed_hashes', 'removed_rows', 'inserted_rows', 'removed_sides', 'affected_cells'):
+        conn.execute(f"DROP TABLE {table}")
+
+    delta = MatchDelta(inserted - changed, changed, removed - changed, affected_team_ids)
+    logger.info(f"Applied {delta} from {parquet_file} in {time.perf_counter() - started:.2f}s")
+    return delta
+
+
+def read_affected_team_ids(conn, base_checksum):
+    """
+    Get the teams whose matches differ between a serving database and the generation it was ingested on.
+
+    Args:
+        conn: DuckDB connection to the serving database
+        base_checksum: Parquet checksum of the previous generation
+
+    Returns:
+        frozenset of team ids, or None if the database was not ingested
+        incrementally on top of base_checksum (any team may differ)
+    """
+    rows = conn.execute("SELECT value FROM serving_metadata WHERE key = 'base_checksum'").fetchall()
+    if not rows or rows[0][0] != base_checksum:
+        return None
+    return frozenset(row[0] for row in conn.execute("SELECT team_id FROM ingest_delta").fetchall())
@@ -2,6 +2,7 @@ from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
 from datetime import datetime, timedelta
 from src.util import get_date_range_options, get_latest_version
+from src.match_table import PAGE_SIZE
 
 def get_loading_spinner():
     return dbc.Spinner(
@@ -19,19 +20,37 @@ def get_loading_spinner():
     ]
 )
 
-def init_layout(app, teams, team_groups=None, conn=None, min_date=None, max_date=None):
+def init_layout(app, data_manager, team_groups=None):
+    """
+    Serve the layout from the current data generation.
+
+    The layout is a function so every page load picks up the team list and
+    date range of the latest generation after a hot reload of the data.
+    """
+    # Get the latest version from CHANGELOG.md
+    version = get_latest_version()
+
+    def serve_layout():
+        generation = data_manager.current()
+        with generation.cursor() as conn:
+            return create_layout(generation.teams, team_groups, conn,
+                                 generation.min_date, generation.max_date, version)
+
+    app.layout = serve_layout
+
+
+def create_layout(teams, team_groups=None, conn=None, min_date=None, max_date=None, version=None):
     if team_groups is None:
         team_groups = {}
     if min_date is None:
         min_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
     if max_date is None:
         max_date = datetime.now().strftime('%Y-%m-%d')
+    if version is None:
+        version = get_latest_version()
     loading_spinner = get_loading_spinner()
 
-    # Get the latest version from CHANGELOG.md
-    version = get_latest_version()
-
-    app.layout = dbc.Container([
+    return dbc.Container([
         # URL location component for tracking state
         dcc.Location(id='url', refresh=False),
 
@@ -384,6 +403,9 @@ def init_layout(app, teams, team_groups=None, conn=None, min_date=None, max_date
                 # Container for AI summary
                 html.Div(id='ai-summary-container', className='ai-summary-content mb-3', style={'display': 'none'}),
 
+                # Shown when a selection is too expensive to compute in time
+                dbc.Alert(id='query-status-alert', color='warning', is_open=False, dismissable=True, className='mb-3'),
+
                 dcc.Loading(
                     id="loading-performance-metrics",
                     type="default",
@@ -485,9 +507,16 @@ def init_layout(app, teams, team_groups=None, conn=None, min_date=None, max_date
                                 html.P("This chart shows the cumulative wins, draws, and losses over the selected time period."),
                                 dcc.Graph(id="performance-trend")
                             ])
-                        ], className="mb-4"),
+                        ], className="mb-4")
+                    ]
+                ),
 
-                        # Day of Week Performance Chart
+                # Day of Week Performance Chart, rendered with the breakdown charts
+                dcc.Loading(
+                    id="loading-day-of-week-chart",
+                    type="default",
+                    color="#20A7C9",
+                    children=[
                         dbc.Card([
                             dbc.CardHeader("Performance by Day of Week Over Time"),
                             dbc.CardBody([
@@ -599,10 +628,16 @@ def init_layout(app, teams, team_groups=None, conn=None, min_date=None, max_date
                                         {"name": "Score", "id": "score"},
                                         {"name": "Result", "id": "result"}
                                     ],
-                                    page_size=10,
-                                    sort_action='native',
+                                    # Pages are read, sorted and filtered server-side (see src/match_table.py)
+                                    page_action='custom',
+                                    page_current=0,
+                                    page_size=PAGE_SIZE,
+                                    page_count=1,
+                                    sort_action='custom',
                                     sort_mode='single',
                                     sort_by=[{'column_id': 'date', 'direction': 'desc'}],
+                                    filter_action='custom',
+                                    filter_query='',
                                     style_table={'overflowX': 'auto'},
                                     style_cell={
                                         'textAlign': 'left',
@@ -660,8 +695,10 @@ def init_layout(app, teams, team_groups=None, conn=None, min_date=None, max_date
                     ]
                 ),
 
-                # Hidden div to store the full match results data
+                # Key of the match results behind the dashboard (see src/result_store.py)
                 dcc.Store(id='full-match-results-data', data={}),
+                # Cursor of the match results page on screen (see src/match_table.py)
+                dcc.Store(id='match-results-page', data=None),
 
                 # Footer
                 dbc.Row([
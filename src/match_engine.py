@@ -0,0 +1,300 @@
+"""
+In-process columnar match engine for the dashboard hot path.
+
+The engine holds team_matches as one int32 column array sorted by (team_id,
+date), plus a CSR offset index: the rows of team t are
+offsets[t]:offsets[t + 1]. A date range inside a team's slice is two binary
+searches, and a team group or combined team is the concatenation of its
+members' slices, so a request touches only the rows it returns. Dates are
+stored as minutes since 1970-01-01, which keeps the time of day of TIMESTAMP
+date columns (and compares them to date bounds like DuckDB) within int32.
+
+It answers the same questions as the DuckDB statements of the hot path
+(src/statements.py) with the same result frames: the matches of a selection,
+its opponents and the dashboard aggregates. DuckDB stays the reference
+implementation and the default; MATCH_ENGINE=numpy serves these requests from
+the engine instead (see scripts/check_match_engine.py for the comparison).
+
+With an on-disk serving file the array is stored next to it as a .npy file
+and memory-mapped read-only, so every worker of a machine shares one copy of
+the pages.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.db import MATCH_ENGINE_SUFFIX
+from src.queries import ROLLUP_MEASURES
+from src.statements import AGGREGATE_GROUPING_SETS
+from src.schema import SCORE_DTYPE, RESULT_DTYPE, WEEKDAY_DTYPE, MEASURE_DTYPE, add_period_columns
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 'duckdb' (statements) or 'numpy' (this engine)
+MATCH_ENGINE = os.environ.get('MATCH_ENGINE', 'duckdb')
+
+# Columns of the engine array, in storage order
+ENGINE_COLUMNS = ('team_id', 'date', 'match_id', 'opponent_id', 'is_home', 'home_team_id', 'away_team_id',
+                  'home_score', 'away_score', 'team_score', 'opponent_score', 'result')
+
+# Stands for a missing score or opponent in the int32 columns
+NULL_SCORE = np.iinfo(np.int32).min
+NULL_TEAM = -1
+
+# Codes of the result column, in the order of the team_matches result ENUM (schema RESULT_DTYPE)
+WIN, DRAW, LOSS, NA = range(4)
+
+ENGINE_QUERY = f"""
+SELECT team_id,
+    CAST(date_diff('minute', TIMESTAMP '1970-01-01', CAST(date AS TIMESTAMP)) AS INTEGER) AS date,
+    CAST(match_id AS INTEGER) AS match_id,
+    COALESCE(opponent_id, {NULL_TEAM}) AS opponent_id,
+    CAST(is_home AS INTEGER) AS is_home,
+    COALESCE(home_team_id, {NULL_TEAM}) AS home_team_id,
+    COALESCE(away_team_id, {NULL_TEAM}) AS away_team_id,
+    COALESCE(home_score, {NULL_SCORE}) AS home_score,
+    COALESCE(away_score, {NULL_SCORE}) AS away_score,
+    COALESCE(team_score, {NULL_SCORE}) AS team_score,
+    COALESCE(opponent_score, {NULL_SCORE}) AS opponent_score,
+    CASE result WHEN 'Win' THEN {WIN} WHEN 'Draw' THEN {DRAW} WHEN 'Loss' THEN {LOSS} ELSE {NA} END AS result
+FROM team_matches
+WHERE date IS NOT NULL
+ORDER BY team_id, date, match_id
+"""
+
+# 1970-01-01 was a Thursday; weekdays count from Monday = 0 like the rollup
+EPOCH_WEEKDAY = 3
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_engine_date(value):
+    """Convert a date string (YYYY-MM-DD, optionally with a time) to minutes since 1970-01-01."""
+    return int(pd.Timestamp(value).to_datetime64().astype('datetime64[m]').astype(np.int64))
+
+
+def get_match_engine_path(db_file):
+    """Get the path of the engine array stored next to a generation serving file."""
+    return db_file + MATCH_ENGINE_SUFFIX
+
+
+def read_engine_array(conn):
+    """Read team_matches from a connection into a Fortran-ordered (rows, columns) int32 array."""
+    columns = conn.execute(ENGINE_QUERY).fetchnumpy()
+    array = np.empty((len(columns['team_id']), len(ENGINE_COLUMNS)), dtype=np.int32, order='F')
+    for position, name in enumerate(ENGINE_COLUMNS):
+        array[:, position] = np.asarray(columns[name], dtype=np.int32)
+    return array
+
+
+def load_engine_array(conn, path):
+    """
+    Memory-map the engine array stored at path, writing it from conn first if needed.
+
+    The file is written to a temporary name and renamed into place, so workers
+    building the same generation at once never map a partial file.
+    """
+    if os.path.exists(path):
+        try:
+            array = np.load(path, mmap_mode='r')
+            if array.ndim == 2 and array.shape[1] == len(ENGINE_COLUMNS) and array.dtype == np.int32:
+                return array
+            logger.warning(f"Match engine file {path} has an unexpected layout, rebuilding it")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read match engine file {path}, rebuilding it: {str(e)}")
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            np.save(f, read_engine_array(conn))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    logger.info(f"Wrote match engine file {path}")
+    return np.load(path, mmap_mode='r')
+
+
+def to_scores(values):
+    """Convert int32 scores holding the NULL_SCORE sentinel to the schema's nullable score array."""
+    return pd.arrays.IntegerArray(values.astype(SCORE_DTYPE.numpy_dtype), values == NULL_SCORE)
+
+
+class MatchEngine:
+    """
+    team_matches as NumPy columns with a per-team CSR offset index.
+
+    Args:
+        array: (rows, len(ENGINE_COLUMNS)) int32 array sorted by (team_id, date),
+            Fortran-ordered so every column is contiguous (may be a read-only memmap)
+        team_count: Number of teams in the team dictionary
+    """
+
+    def __init__(self, array, team_count):
+        self.array = array
+        self.team_count = team_count
+        self.columns = {name: array[:, position] for position, name in enumerate(ENGINE_COLUMNS)}
+        self.offsets = np.searchsorted(self.columns['team_id'], np.arange(team_count + 1))
+
+    @classmethod
+    def from_connection(cls, conn, team_count, path=None):
+        """
+        Build the engine of a data generation.
+
+        Args:
+            conn: Serving connection of the generation
+            team_count: Number of teams in the team dictionary
+            path: Optional file to memory-map the array from (see get_match_engine_path);
+                without it the array is held in process memory
+        """
+        array = read_engine_array(conn) if path is None else load_engine_array(conn, path)
+        return cls(array, team_count)
+
+    def select_rows(self, team_ids, is_group, start_date, end_date, opponent_ids=None):
+        """
+        Get the row positions of a selection.
+
+        Args:
+            team_ids: Team ids of the selected team, group or combined team
+            is_group: Count a match between two selected teams once (from the home side)
+            start_date: Start date (YYYY-MM-DD), inclusive
+            end_date: End date (YYYY-MM-DD), inclusive
+            opponent_ids: Optional opponent ids to restrict the rows to
+
+        Returns:
+            int64 array of row positions, grouped by team and in date order within a team
+        """
+        start = to_engine_date(start_date)
+        end = to_engine_date(end_date)
+        dates = self.columns['date']
+        members = sorted({int(team_id) for team_id in team_ids if 0 <= team_id < self.team_count})
+
+        ranges = []
+        for team_id in members:
+            lo, hi = self.offsets[team_id], self.offsets[team_id + 1]
+            window = dates[lo:hi]
+            ranges.append(np.arange(lo + np.searchsorted(window, start, side='left'),
+                                    lo + np.searchsorted(window, end, side='right')))
+        rows = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+        if is_group:
+            # The away side of a match between two members duplicates its home side
+            opponents = self.columns['opponent_id'][rows]
+            keep = (self.columns['is_home'][rows] == 1) | ~np.isin(opponents, members)
+            rows = rows[keep]
+        if opponent_ids is not None:
+            rows = rows[np.isin(self.columns['opponent_id'][rows], np.asarray(list(opponent_ids), dtype=np.int32))]
+        return rows
+
+    def _get_frame(self, rows, names):
+        """Build a result frame of the given columns in the compact dtypes of src/schema.py."""
+        data = {}
+        for name in names:
+            values = self.columns[name][rows]
+            if name == 'date':
+                data[name] = values.astype('datetime64[m]').astype('datetime64[us]')
+            elif name == 'result':
+                data[name] = pd.Categorical.from_codes(values, dtype=RESULT_DTYPE)
+            elif name.endswith('_score'):
+                data[name] = to_scores(values)
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+    def get_matches(self, team_ids, is_group, start_date, end_date):
+        """
+        Get the matches of a selection, like the team_matches, group_matches and
+        canonical_matches statements.
+
+        Returns:
+            DataFrame with src.queries.MATCH_COLUMNS, newest first
+        """
+        rows = self.select_rows(team_ids, is_group, start_date, end_date)
+        rows = rows[np.lexsort((self.columns['match_id'][rows], self.columns['date'][rows]))[::-1]]
+        return self._get_frame(rows, ('date', 'home_team_id', 'away_team_id', 'home_score', 'away_score',
+                                      'team_id', 'team_score', 'opponent_score', 'opponent_id', 'result'))
+
+    def get_opponents(self, team_ids, is_group, start_date, end_date):
+        """
+        Get the opponent rows of a selection, like the *_opponents statements.
+
+        Returns:
+            DataFrame with src.queries.OPPONENT_COLUMNS
+        """
+        rows = self.select_rows(team_ids, is_group, start_date, end_date)
+        return self._get_frame(rows, ('opponent_id', 'result', 'team_score', 'opponent_score', 'date'))
+
+    def get_aggregates(self, team_ids, is_group, start_date, end_date, opponent_ids=None):
+        """
+        Compute every aggregate the dashboard shows for a selection, like
+        src.statements.get_dashboard_aggregates.
+
+        Returns:
+            Dictionary with 'weekday', 'opponent' and 'totals', in the same
+            layout as get_dashboard_aggregates
+        """
+        rows = self.select_rows(team_ids, is_group, start_date, end_date, opponent_ids)
+        result = self.columns['result'][rows]
+        team_score = self.columns['team_score'][rows].astype(np.int64)
+        opponent_score = self.columns['opponent_score'][rows].astype(np.int64)
+        valid = result != NA
+        goals_for = np.where(team_score != NULL_SCORE, team_score, 0)
+        goals_against = np.where(opponent_score != NULL_SCORE, opponent_score, 0)
+        measures = np.stack((
+            np.ones(len(rows), dtype=np.int64),
+            valid,
+            result == WIN,
+            result == DRAW,
+            result == LOSS,
+            goals_for,
+            goals_against,
+            np.where(valid, goals_for, 0),
+            np.where(valid, goals_against, 0),
+        ), axis=1).astype(np.int64)
+
+        days = self.columns['date'][rows].astype(np.int64) // MINUTES_PER_DAY
+        months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        weekdays = (days + EPOCH_WEEKDAY) % 7
+        cell_keys, cell_index = np.unique(months * 7 + weekdays, return_inverse=True)
+        cell_count = len(cell_keys)
+
+        opponents = self.columns['opponent_id'][rows]
+        # Unknown opponents sort last, like NULLs in the statement
+        opponent_keys, opponent_index = np.unique(np.where(opponents == NULL_TEAM, np.iinfo(np.int32).max, opponents),
+                                                  return_inverse=True)
+        opponent_keys = np.where(opponent_keys == np.iinfo(np.int32).max, NULL_TEAM, opponent_keys).astype(np.int32)
+
+        def sum_by(index, size):
+            return {measure: np.bincount(index, weights=measures[:, position], minlength=size).astype(MEASURE_DTYPE)
+                    for position, measure in enumerate(ROLLUP_MEASURES)}
+
+        weekday_df = pd.DataFrame({
+            'grouping_set': AGGREGATE_GROUPING_SETS[1],
+            'month': (cell_keys // 7).astype('datetime64[M]').astype('datetime64[us]'),
+            'weekday': pd.array(cell_keys % 7, dtype=WEEKDAY_DTYPE),
+            'opponent_id': pd.array([None] * cell_count, dtype='Int32'),
+            **sum_by(cell_index, cell_count)
+        })
+        opponent_df = pd.DataFrame({
+            'grouping_set': AGGREGATE_GROUPING_SETS[6],
+            'month': np.full(len(opponent_keys), np.datetime64('NaT'), dtype='datetime64[us]'),
+            'weekday': pd.array([None] * len(opponent_keys), dtype=WEEKDAY_DTYPE),
+            'opponent_id': pd.arrays.IntegerArray(opponent_keys, opponent_keys == NULL_TEAM),
+            **sum_by(opponent_index, len(opponent_keys))
+        })
+
+        total = dict(zip(ROLLUP_MEASURES, measures.sum(axis=0)))
+        return {
+            'weekday': add_period_columns(weekday_df),
+            'opponent': opponent_df,
+            'totals': {
+                'games': int(total['valid_matches']),
+                'wins': int(total['wins']),
+                'draws': int(total['draws']),
+                'losses': int(total['losses']),
+                'goals_for': int(total['valid_goals_for']),
+                'goals_against': int(total['valid_goals_against'])
+            }
+        }
@@ -0,0 +1,145 @@
+"""
+Server-side pages of the match results table.
+
+The DataTable in src/layout.py pages, sorts and filters with
+page_action/sort_action/filter_action 'custom': the browser only ever holds
+the rows of the page on screen, and every page is read from team_matches by
+the match_page statements (src/statements.py:get_match_page_statement).
+
+Pages are found by keyset rather than by offset. The cursor of the page on
+screen, the (sort key, date and time, match id) of its first and last rows,
+is kept in the match-results-page dcc.Store; moving to the next or the previous page
+continues from one of them, so the statement never skips over the rows of the
+pages before. Jumps to the first, last or any other page without a known
+neighbour use an offset.
+
+Column filters use the DataTable filter syntax ({column} operator value,
+joined by &&); conditions on unknown columns or with unsupported operators
+are ignored.
+"""
+import math
+import re
+
+from src.statements import execute_statement, MATCH_TABLE_COLUMNS, MATCH_TABLE_FILTER_OPERATORS
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Rows per page of the match results table
+PAGE_SIZE = 10
+
+# Spellings of the DataTable filter operators (case-sensitive and -insensitive variants included)
+FILTER_OPERATOR_ALIASES = {
+    'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=',
+    'icontains': 'contains', 'scontains': 'contains',
+    'ieq': '=', 'seq': '=', 'ine': '!=', 'sne': '!=',
+    'ilt': '<', 'slt': '<', 'ile': '<=', 'sle': '<=', 'igt': '>', 'sgt': '>', 'ige': '>=', 'sge': '>='
+}
+
+FILTER_CONDITION = re.compile(r'^\s*\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s+(?P<value>.+?)\s*$')
+
+
+def parse_filter_query(filter_query):
+    """
+    Parse a DataTable filter_query into one condition per column.
+
+    Args:
+        filter_query: Filter query of the table, e.g. '{home_team} contains "Hawks" && {date} datestartswith 2024'
+
+    Returns:
+        Dictionary of column id to (operator, value)
+    """
+    conditions = {}
+    for part in (filter_query or '').split(' && '):
+        if not part.strip():
+            continue
+        match = FILTER_CONDITION.match(part)
+        operator = match and FILTER_OPERATOR_ALIASES.get(match['operator'].lower(), match['operator'].lower())
+        if not match or match['column'] not in MATCH_TABLE_COLUMNS or operator not in MATCH_TABLE_FILTER_OPERATORS:
+            logger.debug(f"Ignoring unsupported match table filter: {part}")
+            continue
+        value = match['value']
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
+        conditions[match['column']] = (operator, value)
+    return conditions
+
+
+def get_sort_order(sort_by):
+    """
+    Get the sort column and direction of a DataTable sort_by.
+
+    Returns:
+        (column id, descending); newest matches first when the table is not sorted
+    """
+    if sort_by and sort_by[0].get('column_id') in MATCH_TABLE_COLUMNS:
+        return sort_by[0]['column_id'], sort_by[0].get('direction') != 'asc'
+    return 'date', True
+
+
+def get_match_page(conn, selection, query_key, page_current, sort_by, filter_query, result_filter, page_cursor,
+                   cache_scope=None, page_size=PAGE_SIZE):
+    """
+    Read one page of the match results table.
+
+    Args:
+        conn: DuckDB connection (or ServingConnection)
+        selection: Dictionary of the selection's team_ids, is_group,
+            opponent_ids, start_date and end_date (like the aggregate statement)
+        query_key: Identifies the selection, sort and filters; a cursor of another query is not reused
+        page_current: Requested page (0-based)
+        sort_by: DataTable sort_by
+        filter_query: DataTable filter_query
+        result_filter: Results selected in the result filter dropdown
+        page_cursor: Cursor of the page on screen (see the module docstring), or None
+        cache_scope: Optional cache scope (see execute_statement)
+        page_size: Rows per page
+
+    Returns:
+        Tuple of the page rows, the page count, the page number served (the
+        first page when the query changed) and the cursor of the page
+    """
+    if not page_cursor or page_cursor.get('query') != query_key:
+        page_current = 0
+    page_current = page_current or 0
+    sort_column, descending = get_sort_order(sort_by)
+    conditions = parse_filter_query(filter_query)
+
+    params = dict(selection, results=result_filter or None, sort_column=sort_column, limit=page_size,
+                  offset=page_current * page_size, after_key=None, after_date=None, after_match_id=None)
+    for column in MATCH_TABLE_COLUMNS:
+        params[f'{column}_op'], params[f'{column}_value'] = conditions.get(column, (None, None))
+
+    # Continue from the neighbouring page on screen instead of skipping rows
+    reverse = False
+    if page_cursor and page_cursor.get('query') == query_key:
+        if page_current == page_cursor['page'] + 1:
+            after = page_cursor['last']
+        elif page_current == page_cursor['page'] - 1:
+            after = page_cursor['first']
+            reverse = True
+        else:
+            after = None
+        if after:
+            params.update(offset=0, after_key=after[0], after_date=after[1], after_match_id=after[2])
+
+    name = 'match_page_desc' if descending != reverse else 'match_page_asc'
+    page_df = execute_statement(conn, name, cache_scope, **params)
+    if reverse:
+        page_df = page_df.iloc[::-1]
+
+    total_rows = int(page_df['total_rows'].iloc[0]) if len(page_df) else 0
+    rows = page_df[list(MATCH_TABLE_COLUMNS)].astype(object).where(page_df[list(MATCH_TABLE_COLUMNS)].notna(), None)
+    cursor = None
+    if len(page_df):
+        first, last = page_df.iloc[0], page_df.iloc[-1]
+        # The match date is kept as an ISO timestamp: the date column shown in the
+        # table drops the time of day, which orders the matches of one day
+        cursor = {
+            'query': query_key,
+            'page': page_current,
+            'first': [first['sort_key'], first['match_date'].isoformat(), int(first['match_id'])],
+            'last': [last['sort_key'], last['match_date'].isoformat(), int(last['match_id'])]
+        }
+    page_count = max(1, math.ceil(total_rows / page_size))
+    return rows.to_dict('records'), page_count, page_current, cursor
@@ -0,0 +1,174 @@
+"""
+Per-team cumulative match totals for the dashboard KPI cards.
+
+The index holds the rows of team_matches (already sorted by team and date)
+as NumPy arrays together with running totals of games, wins, draws, losses,
+goals for and goals against. The totals of any team over any date range are
+the difference of two running totals, found with two binary searches inside
+the team's slice, so the cards cost the same whatever the length of history.
+
+Team groups are the sum over their members. A match between two members is
+counted once, from the home team's perspective, like the group queries in
+src/queries.py; the away side of those matches is subtracted using a second
+index keyed by (team, opponent) pair and date, which visits only the pairs the
+members actually played.
+
+The index is built from a data generation's connection and is rebuilt with
+every generation, so it always describes the data being served.
+"""
+import numpy as np
+
+# Order of the columns in the cumulative arrays
+METRICS = ('games', 'wins', 'draws', 'losses', 'goals_for', 'goals_against')
+
+METRICS_QUERY = """
+SELECT team_id, COALESCE(opponent_id, -1) AS opponent_id, is_home,
+    CAST(date AS TIMESTAMP) AS date,
+    CAST(result <> 'NA' AS INTEGER) AS games,
+    CAST(result = 'Win' AS INTEGER) AS wins,
+    CAST(result = 'Draw' AS INTEGER) AS draws,
+    CAST(result = 'Loss' AS INTEGER) AS losses,
+    CASE WHEN result <> 'NA' THEN team_score ELSE 0 END AS goals_for,
+    CASE WHEN result <> 'NA' THEN opponent_score ELSE 0 END AS goals_against
+FROM team_matches
+WHERE date IS NOT NULL
+ORDER BY team_id, date
+"""
+
+
+def to_index_date(value):
+    """Convert a date string (YYYY-MM-DD) to the integer timestamp used by the index."""
+    return np.datetime64(value, 'us').astype(np.int64)
+
+
+def get_cumulative_totals(values):
+    """Running totals of a (rows, metrics) array with a leading row of zeros."""
+    cumulative = np.zeros((len(values) + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    return cumulative
+
+
+class TeamMetricsIndex:
+    """
+    Prefix sums of the match metrics of every team, ordered by date.
+
+    Args:
+        team_ids: Team id of each team_matches row, sorted by (team_id, date)
+        opponent_ids: Opponent id of each row (-1 when unknown)
+        is_home: Whether the team played at home
+        dates: Match dates as integer timestamps (see to_index_date)
+        values: int64 array of shape (rows, len(METRICS))
+        team_count: Number of teams in the team dictionary
+    """
+
+    def __init__(self, team_ids, opponent_ids, is_home, dates, values, team_count):
+        self.team_count = team_count
+        self._dates = dates
+        self._cumulative = get_cumulative_totals(values)
+        self._team_offsets = np.searchsorted(team_ids, np.arange(team_count + 1))
+
+        # Away rows by (team, opponent, date), used to drop the duplicate side of intra-group matches
+        away_rows = np.flatnonzero(~is_home)
+        away_order = away_rows[np.lexsort((dates[away_rows], opponent_ids[away_rows], team_ids[away_rows]))]
+        self._away_cumulative = get_cumulative_totals(values[away_order])
+        away_teams = team_ids[away_order]
+        away_opponents = opponent_ids[away_order]
+        away_dates = dates[away_order]
+
+        # (team, opponent) pairs in the same order, grouped by team in _away_pair_offsets,
+        # so a group only visits the pairs its members played
+        new_pair = np.concatenate((
+            [len(away_order) > 0],
+            (away_teams[1:] != away_teams[:-1]) | (away_opponents[1:] != away_opponents[:-1])
+        ))
+        pair_starts = np.flatnonzero(new_pair)
+        self._away_pair_opponents = away_opponents[pair_starts]
+        self._away_pair_offsets = np.searchsorted(away_teams[pair_starts], np.arange(team_count + 1))
+
+        # Sorted key of each away row: pair number * _away_key_stride + rank of its date,
+        # so the rows of any pairs in a date range are found with one searchsorted
+        self._away_date_values = np.unique(away_dates)
+        self._away_key_stride = len(self._away_date_values) + 1
+        self._away_keys = ((np.cumsum(new_pair) - 1) * self._away_key_stride
+                           + np.searchsorted(self._away_date_values, away_dates))
+
+    @classmethod
+    def from_connection(cls, conn, team_count):
+        """Build the index from the team_matches table of a serving connection."""
+        columns = conn.execute(METRICS_QUERY).fetchnumpy()
+        values = np.stack([np.asarray(columns[metric], dtype=np.int64) for metric in METRICS], axis=1)
+        return cls(
+            np.asarray(columns['team_id'], dtype=np.int64),
+            np.asarray(columns['opponent_id'], dtype=np.int64),
+            np.asarray(columns['is_home'], dtype=bool),
+            np.asarray(columns['date'], dtype='datetime64[us]').astype(np.int64),
+            values,
+            team_count
+        )
+
+    def _get_range_totals(self, dates, cumulative, start, stop, start_date, end_date):
+        """Totals of the rows in [start, stop) dated between start_date and end_date (inclusive)."""
+        window = dates[start:stop]
+        lo = start + np.searchsorted(window, start_date, side='left')
+        hi = start + np.searchsorted(window, end_date, side='right')
+        return cumulative[hi] - cumulative[lo]
+
+    def get_team_totals(self, team_id, start_date, end_date):
+        """
+        Get the totals of one team over a date range.
+
+        Args:
+            team_id: Team id
+            start_date: Start date (YYYY-MM-DD), inclusive
+            end_date: End date (YYYY-MM-DD), inclusive
+
+        Returns:
+            Dictionary keyed by METRICS
+        """
+        totals = np.zeros(len(METRICS), dtype=np.int64)
+        if 0 <= team_id < self.team_count:
+            totals = self._get_range_totals(self._dates, self._cumulative,
+                                            self._team_offsets[team_id], self._team_offsets[team_id + 1],
+                                            to_index_date(start_date), to_index_date(end_date))
+        return {metric: int(total) for metric, total in zip(METRICS, totals)}
+
+    def get_group_totals(self, team_ids, start_date, end_date):
+        """
+        Get the totals of a set of teams over a date range, counting each match once.
+
+        Args:
+            team_ids: Team ids of the group members
+            start_date: Start date (YYYY-MM-DD), inclusive
+            end_date: End date (YYYY-MM-DD), inclusive
+
+        Returns:
+            Dictionary keyed by METRICS
+        """
+        start_date = to_index_date(start_date)
+        end_date = to_index_date(end_date)
+        members = sorted({int(team_id) for team_id in team_ids if 0 <= team_id < self.team_count})
+
+        totals = np.zeros(len(METRICS), dtype=np.int64)
+        for team_id in members:
+            totals += self._get_range_totals(self._dates, self._cumulative,
+                                             self._team_offsets[team_id], self._team_offsets[team_id + 1],
+                                             start_date, end_date)
+        # Away pairs of the members whose opponent is a member too; unknown opponents (-1)
+        # read the extra last slot, which is never a member
+        member_ids = np.array(members, dtype=np.int64)
+        is_member = np.zeros(self.team_count + 1, dtype=bool)
+        is_member[member_ids] = True
+        first_pairs = self._away_pair_offsets[member_ids]
+        pair_counts = self._away_pair_offsets[member_ids + 1] - first_pairs
+        pairs = np.arange(pair_counts.sum()) + np.repeat(first_pairs - np.cumsum(pair_counts) + pair_counts,
+                                                         pair_counts)
+        pairs = pairs[is_member[self._away_pair_opponents[pairs]]]
+
+        # Their rows dated between start_date and end_date
+        first_rank = np.searchsorted(self._away_date_values, start_date, side='left')
+        stop_rank = np.searchsorted(self._away_date_values, end_date, side='right')
+        lo = np.searchsorted(self._away_keys, pairs * self._away_key_stride + first_rank)
+        hi = np.searchsorted(self._away_keys, pairs * self._away_key_stride + stop_rank)
+        totals -= (self._away_cumulative[hi] - self._away_cumulative[lo]).sum(axis=0)
+
+        return {metric: int(total) for metric, total in zip(METRICS, totals)}
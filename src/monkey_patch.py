@@ -1,10 +1,20 @@
 """
 Monkey patching module.
 This module should be imported first to ensure proper patching before any other modules are loaded.
+
+Eventlet patching is only applied when gunicorn runs eventlet workers. The
+default gthread workers (and sync workers) use real threads, which DuckDB
+needs to run the queries of concurrent callbacks in parallel; green threads
+would serialize them on one OS thread.
 """
-import eventlet
+import os
+
+GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if GUNICORN_WORKER_CLASS == 'eventlet':
+    import eventlet
 
-# Apply monkey patch to make eventlet work properly
-eventlet.monkey_patch(all=True)
+    # Apply monkey patch to make eventlet work properly
+    eventlet.monkey_patch(all=True)
 
-print("Eventlet monkey patching completed successfully")
\ No newline at end of file
+    print("Eventlet monkey patching completed successfully")
@@ -2,372 +2,148 @@
 SQL query generation functions for the soccer dashboard.
 This module contains functions to generate SQL queries for retrieving
 match data and team information from the soccer database.
-"""
 
-def get_team_group_filter(teams):
-    """
-    Returns SQL filter condition for a team group.
+Team and group queries read from team_matches, the team-perspective table
+built at load time (see src/db.py:load_team_matches) with one row per team
+per match. Selecting a team is therefore a plain filter on the team_id column
+instead of CASE expressions over home_team and away_team.
 
-    Args:
-        teams: List of team names in the group
+Teams are passed and returned as integer ids from team_dictionary; callers
+decode names with src.teams.TeamDictionary when rendering. Combined teams
+(e.g. "Key West (Combined)") are resolved to team ids through the
+team_aliases table built at load, never by matching names in a query.
 
-    Returns:
-        SQL condition that matches if any home_team or away_team is in the group
-    """
-    if not teams:
-        return "(1=0)"  # Return a condition that always evaluates to false
+The queries run on every dashboard request are the parameterized statements
+in src/statements.py; this module holds the shared column lists and the
+builders used outside the hot path.
+"""
 
-    conditions = []
-    for team in teams:
-        # Escape single quotes in team names
-        escaped_team = team.replace("'", "''")
-        conditions.append(f"home_team = '{escaped_team}'")
-        conditions.append(f"away_team = '{escaped_team}'")
+from datetime import date, timedelta
 
-    return f"({' OR '.join(conditions)})"
+# Columns returned by every match query, in the order the callbacks expect
+MATCH_COLUMNS = """date, home_team_id, away_team_id, home_score, away_score,
+        team_id, team_score, opponent_score, opponent_id, result"""
 
-def get_key_west_team_filter():
-    """
-    Returns SQL filter condition for identifying Key West team variations.
-    Used to filter matches where Key West (or its variations) is either home or away team.
-    """
-    return """(
-        LOWER(home_team) LIKE '%key west%' OR
-        LOWER(home_team) LIKE '%keywest%' OR
-        LOWER(home_team) LIKE '%key-west%' OR
-        LOWER(home_team) LIKE '%kw%' OR
-        LOWER(home_team) = 'kwfc' OR
-        LOWER(home_team) LIKE '%keystone%' OR
-        LOWER(away_team) LIKE '%key west%' OR
-        LOWER(away_team) LIKE '%keywest%' OR
-        LOWER(away_team) LIKE '%key-west%' OR
-        LOWER(away_team) LIKE '%kw%' OR
-        LOWER(away_team) = 'kwfc' OR
-        LOWER(away_team) LIKE '%keystone%'
-    )"""
+# Columns returned by the opponent queries
+OPPONENT_COLUMNS = "opponent_id, result, team_score, opponent_score, date"
 
+# Per-row cube keys and measures of team_matches, shared by the team_match_rollup
+# loader (src/db.py) and the partial-month edges of the aggregate statement (src/statements.py).
+# valid_goals_* only count scored matches, like the KPI cards.
+ROLLUP_ROW_COLUMNS = """team_id, opponent_id, is_home,
+        CAST(date_trunc('month', date) AS DATE) AS month,
+        CAST(isodow(date) - 1 AS INTEGER) AS weekday,
+        1 AS matches,
+        CAST(result <> 'NA' AS INTEGER) AS valid_matches,
+        CAST(result = 'Win' AS INTEGER) AS wins,
+        CAST(result = 'Draw' AS INTEGER) AS draws,
+        CAST(result = 'Loss' AS INTEGER) AS losses,
+        team_score AS goals_for,
+        opponent_score AS goals_against,
+        CASE WHEN result <> 'NA' THEN team_score ELSE 0 END AS valid_goals_for,
+        CASE WHEN result <> 'NA' THEN opponent_score ELSE 0 END AS valid_goals_against"""
 
-def get_key_west_team_identification():
-    """
-    Returns SQL CASE expression pattern for identifying when a team is Key West.
-    Used in multiple query components to identify if home_team or away_team is Key West.
-    """
-    return """LOWER(home_team) LIKE '%key west%' OR
-        LOWER(home_team) LIKE '%keywest%' OR
-        LOWER(home_team) LIKE '%key-west%' OR
-        LOWER(home_team) LIKE '%kw%' OR
-        LOWER(home_team) = 'kwfc' OR
-        LOWER(home_team) LIKE '%keystone%'"""
+ROLLUP_MEASURES = ('matches', 'valid_matches', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+                   'valid_goals_for', 'valid_goals_against')
 
 
-def get_key_west_away_identification():
-    """
-    Returns SQL CASE expression pattern for identifying when an away team is Key West.
-    Used in multiple query components.
+def get_soccer_data_query(source, first_match_id=0):
     """
-    return """LOWER(away_team) LIKE '%key west%' OR
-        LOWER(away_team) LIKE '%keywest%' OR
-        LOWER(away_team) LIKE '%key-west%' OR
-        LOWER(away_team) LIKE '%kw%' OR
-        LOWER(away_team) = 'kwfc' OR
-        LOWER(away_team) LIKE '%keystone%'"""
+    Select soccer_data rows from raw parquet rows.
 
-
-def get_combined_matches_query(team, filter_conditions):
-    """
-    Generate a SQL query for retrieving matches for a combined team (Key West).
+    Each row gets a match_id, counted from first_match_id in (date, home_team,
+    away_team) order, and row_hash, a hash of all of its parquet columns that
+    changes whenever anything about the match changes (see src/ingest.py).
+    Rows are returned in date order, so the min/max zonemap of each row group
+    lets DuckDB skip every row group outside a dashboard date range.
 
     Args:
-        team: The team name ('Key West (Combined)')
-        filter_conditions: Additional SQL filter conditions (date range, etc.)
-
-    Returns:
-        SQL query string for retrieving Key West matches
+        source: Table or view with the parquet columns
+        first_match_id: match_id of the first row
     """
-    if team != 'Key West (Combined)':
-        return get_team_matches_query(team, filter_conditions)
-
-    home_team_pattern = get_key_west_team_identification()
-    away_team_pattern = get_key_west_away_identification()
-    team_filter = get_key_west_team_filter()
-
     return f"""
-    SELECT date, home_team, away_team, home_score, away_score,
-        CASE
-            WHEN {home_team_pattern} THEN home_score
-            WHEN {away_team_pattern} THEN away_score
-            ELSE 0
-        END AS team_score,
-        CASE
-            WHEN {home_team_pattern} THEN away_score
-            WHEN {away_team_pattern} THEN home_score
-            ELSE 0
-        END AS opponent_score,
-        CASE
-            WHEN {home_team_pattern} THEN away_team
-            WHEN {away_team_pattern} THEN home_team
-            ELSE ''
-        END AS opponent_team,
-        CASE
-            WHEN home_score IS NULL OR away_score IS NULL THEN 'NA'
-            WHEN ({home_team_pattern}) AND home_score > away_score THEN 'Win'
-            WHEN ({away_team_pattern}) AND away_score > home_score THEN 'Win'
-            WHEN home_score = away_score THEN 'Draw'
-            ELSE 'Loss'
-        END AS result
-    FROM soccer_data
-    WHERE ({filter_conditions}) AND {team_filter}
-    ORDER BY date DESC
+    SELECT CAST({int(first_match_id)} + ROW_NUMBER() OVER (ORDER BY raw.date, raw.home_team, raw.away_team, hash(raw)) - 1
+            AS BIGINT) AS match_id,
+        raw.*, hash(raw) AS row_hash, home.team_id AS home_team_id, away.team_id AS away_team_id
+    FROM {source} raw
+    LEFT JOIN team_dictionary home ON home.team_name = raw.home_team
+    LEFT JOIN team_dictionary away ON away.team_name = raw.away_team
+    ORDER BY match_id
     """
 
 
-def get_team_matches_query(team, filter_conditions):
-    """
-    Generate a SQL query for retrieving matches for a specific team.
-
-    Args:
-        team: The specific team name
-        filter_conditions: Additional SQL filter conditions (date range, etc.)
-
-    Returns:
-        SQL query string for retrieving team matches
-    """
-    return f"""
-    SELECT date, home_team, away_team, home_score, away_score,
-        CASE
-            WHEN home_team = '{team}' THEN home_score
-            WHEN away_team = '{team}' THEN away_score
-            ELSE 0
-        END AS team_score,
-        CASE
-            WHEN home_team = '{team}' THEN away_score
-            WHEN away_team = '{team}' THEN home_score
-            ELSE 0
-        END AS opponent_score,
-        CASE
-            WHEN home_team = '{team}' THEN away_team
-            WHEN away_team = '{team}' THEN home_team
-            ELSE ''
-        END AS opponent_team,
-        CASE
-            WHEN home_score IS NULL OR away_score IS NULL THEN 'NA'
-            WHEN home_team = '{team}' AND home_score > away_score THEN 'Win'
-            WHEN away_team = '{team}' AND away_score > home_score THEN 'Win'
-            WHEN home_score = away_score THEN 'Draw'
-            ELSE 'Loss'
-        END AS result
-    FROM soccer_data
-    WHERE ({filter_conditions}) AND (home_team = '{team}' OR away_team = '{team}')
-    ORDER BY date DESC
+def get_team_matches_query(condition="TRUE"):
     """
+    Select team_matches rows, the team-perspective view of soccer_data.
 
-
-def get_debug_key_west_query(filter_conditions):
-    """
-    Generate a SQL query for debugging Key West games.
+    Every match becomes two rows, one per side, with the score and result
+    already resolved from that team's point of view. The result is an ENUM,
+    which DuckDB stores in one byte and fetches as a pandas categorical. A
+    match without a score is 'NA' for both sides; the opponent queries before
+    team_matches counted it as a 'Loss', which changes the group KPI cards.
 
     Args:
-        filter_conditions: SQL filter conditions (date range, etc.)
-
-    Returns:
-        SQL query string for retrieving debug information about Key West games
+        condition: SQL condition on soccer_data selecting the matches
     """
-    team_filter = get_key_west_team_filter()
     return f"""
-    SELECT date, home_team, away_team, home_score, away_score
-    FROM soccer_data
-    WHERE {team_filter} AND {filter_conditions}
-    ORDER BY date
-    """
-
-
-def get_opponent_query_for_key_west(filter_conditions, team_filter=None):
-    """
-    Generate a SQL query for retrieving opponent information for Key West.
-
-    Args:
-        filter_conditions: SQL filter conditions (date range, etc.)
-        team_filter: Optional team filter condition
-
-    Returns:
-        SQL query string for retrieving opponent data for Key West
-    """
-    if team_filter is None:
-        team_filter = get_key_west_team_filter()
-
-    home_team_pattern = get_key_west_team_identification()
-    away_team_pattern = get_key_west_away_identification()
-
-    return f"""
-    SELECT
-        CASE
-            WHEN {home_team_pattern} THEN away_team
-            WHEN {away_team_pattern} THEN home_team
-        END AS opponent,
-        CASE
-            WHEN ({home_team_pattern}) AND home_score > away_score THEN 'Win'
-            WHEN ({away_team_pattern}) AND away_score > home_score THEN 'Win'
-            WHEN home_score = away_score THEN 'Draw'
+    WITH matches AS (
+        SELECT match_id, date, home_team_id, away_team_id, home_score, away_score
+        FROM soccer_data
+        WHERE {condition}
+    ),
+    sides AS (
+        SELECT match_id, date, home_team_id, away_team_id, home_score, away_score,
+            home_team_id AS team_id, away_team_id AS opponent_id,
+            home_score AS team_score, away_score AS opponent_score, TRUE AS is_home
+        FROM matches
+        UNION ALL
+        SELECT match_id, date, home_team_id, away_team_id, home_score, away_score,
+            away_team_id AS team_id, home_team_id AS opponent_id,
+            away_score AS team_score, home_score AS opponent_score, FALSE AS is_home
+        FROM matches
+    )
+    SELECT match_id, date, team_id, opponent_id, team_score, opponent_score,
+        CAST(CASE
+            WHEN team_score IS NULL OR opponent_score IS NULL THEN 'NA'
+            WHEN team_score > opponent_score THEN 'Win'
+            WHEN team_score = opponent_score THEN 'Draw'
             ELSE 'Loss'
-        END AS result,
-        CASE
-            WHEN {home_team_pattern} THEN home_score
-            WHEN {away_team_pattern} THEN away_score
-        END AS team_score,
-        CASE
-            WHEN {home_team_pattern} THEN away_score
-            WHEN {away_team_pattern} THEN home_score
-        END AS opponent_score
-    FROM soccer_data
-    WHERE ({filter_conditions}) AND {team_filter}
+        END AS ENUM('Win', 'Draw', 'Loss', 'NA')) AS result,
+        is_home, home_team_id, away_team_id, home_score, away_score
+    FROM sides
+    WHERE team_id IS NOT NULL
+    ORDER BY team_id, date
     """
 
 
-def get_opponent_query_for_team(team, filter_conditions):
+def get_match_rollup_query(condition="TRUE"):
     """
-    Generate a SQL query for retrieving opponent information for a specific team.
+    Select team_match_rollup cells, aggregated from the team_matches rows matching a condition.
 
     Args:
-        team: The specific team name
-        filter_conditions: SQL filter conditions (date range, etc.)
-
-    Returns:
-        SQL query string for retrieving opponent data for the team
+        condition: SQL condition on team_matches selecting the rows
     """
     return f"""
-    SELECT
-        CASE
-            WHEN home_team = '{team}' THEN away_team
-            WHEN away_team = '{team}' THEN home_team
-        END AS opponent_team,
-        CASE
-            WHEN home_team = '{team}' AND home_score > away_score THEN 'Win'
-            WHEN away_team = '{team}' AND away_score > home_score THEN 'Win'
-            WHEN home_score = away_score THEN 'Draw'
-            ELSE 'Loss'
-        END AS result,
-        CASE
-            WHEN home_team = '{team}' THEN home_score
-            WHEN away_team = '{team}' THEN away_score
-        END AS team_score,
-        CASE
-            WHEN home_team = '{team}' THEN away_score
-            WHEN away_team = '{team}' THEN home_score
-        END AS opponent_score,
-        date
-    FROM soccer_data
-    WHERE ({filter_conditions}) AND (home_team = '{team}' OR away_team = '{team}')
-    """
-
-def get_team_group_matches_query(teams, filter_conditions):
+    SELECT team_id, opponent_id, is_home, month, weekday,
+        {", ".join(f"CAST(COALESCE(SUM({measure}), 0) AS BIGINT) AS {measure}" for measure in ROLLUP_MEASURES)}
+    FROM (SELECT {ROLLUP_ROW_COLUMNS} FROM team_matches WHERE date IS NOT NULL AND {condition})
+    GROUP BY team_id, opponent_id, is_home, month, weekday
+    ORDER BY team_id, month
     """
-    Generate a SQL query for retrieving matches for a team group.
 
-    Args:
-        teams: List of team names in the group
-        filter_conditions: Additional SQL filter conditions (date range, etc.)
 
-    Returns:
-        SQL query string for retrieving team group matches
+def get_full_month_range(start_date, end_date):
     """
-    if not teams:
-        # Return a query that gives an empty result
-        return "SELECT * FROM soccer_data WHERE 1=0"
-
-    # Create a SQL filter for the team group
-    team_filter = get_team_group_filter(teams)
-
-    # Build condition strings without using backslashes in f-strings
-    home_conditions = []
-    away_conditions = []
-    for team in teams:
-        # Double the single quotes for SQL escaping
-        escaped_team = team.replace("'", "''")
-        home_conditions.append(f"home_team = '{escaped_team}'")
-        away_conditions.append(f"away_team = '{escaped_team}'")
-
-    home_condition_str = " OR ".join(home_conditions)
-    away_condition_str = " OR ".join(away_conditions)
-
-    return f"""
-    SELECT date, home_team, away_team, home_score, away_score,
-        CASE
-            WHEN ({home_condition_str}) THEN home_score
-            WHEN ({away_condition_str}) THEN away_score
-            ELSE 0
-        END AS team_score,
-        CASE
-            WHEN ({home_condition_str}) THEN away_score
-            WHEN ({away_condition_str}) THEN home_score
-            ELSE 0
-        END AS opponent_score,
-        CASE
-            WHEN ({home_condition_str}) THEN away_team
-            WHEN ({away_condition_str}) THEN home_team
-            ELSE ''
-        END AS opponent_team,
-        CASE
-            WHEN home_score IS NULL OR away_score IS NULL THEN 'NA'
-            WHEN ({home_condition_str}) AND home_score > away_score THEN 'Win'
-            WHEN ({away_condition_str}) AND away_score > home_score THEN 'Win'
-            WHEN home_score = away_score THEN 'Draw'
-            ELSE 'Loss'
-        END AS result
-    FROM soccer_data
-    WHERE ({filter_conditions}) AND {team_filter}
-    ORDER BY date DESC
-    """
-
-def get_opponent_query_for_team_group(teams, filter_conditions):
-    """
-    Generate a SQL query for retrieving opponent information for a team group.
-
-    Args:
-        teams: List of team names in the group
-        filter_conditions: SQL filter conditions (date range, etc.)
+    Get the calendar months lying entirely inside a date range.
 
     Returns:
-        SQL query string for retrieving opponent data for the team group
-    """
-    if not teams:
-        return "SELECT * FROM soccer_data WHERE 1=0"  # Empty query
-
-    # Create condition for identifying team matches
-    team_filter = get_team_group_filter(teams)
-
-    # Build condition strings without using backslashes in f-strings
-    home_conditions = []
-    away_conditions = []
-    for team in teams:
-        # Double the single quotes for SQL escaping
-        escaped_team = team.replace("'", "''")
-        home_conditions.append(f"home_team = '{escaped_team}'")
-        away_conditions.append(f"away_team = '{escaped_team}'")
-
-    home_condition_str = " OR ".join(home_conditions)
-    away_condition_str = " OR ".join(away_conditions)
-
-    return f"""
-    SELECT
-        CASE
-            WHEN ({home_condition_str}) THEN away_team
-            WHEN ({away_condition_str}) THEN home_team
-        END AS opponent_team,
-        CASE
-            WHEN ({home_condition_str}) AND home_score > away_score THEN 'Win'
-            WHEN ({away_condition_str}) AND away_score > home_score THEN 'Win'
-            WHEN home_score = away_score THEN 'Draw'
-            ELSE 'Loss'
-        END AS result,
-        CASE
-            WHEN ({home_condition_str}) THEN home_score
-            WHEN ({away_condition_str}) THEN away_score
-        END AS team_score,
-        CASE
-            WHEN ({home_condition_str}) THEN away_score
-            WHEN ({away_condition_str}) THEN home_score
-        END AS opponent_score,
-        date
-    FROM soccer_data
-    WHERE ({filter_conditions}) AND {team_filter}
-    """
\ No newline at end of file
+        Tuple (first_month, end_month) of YYYY-MM-DD strings; the full months
+        are those with first_month <= month < end_month (none if first_month >= end_month)
+    """
+    start = date.fromisoformat(str(start_date)[:10])
+    end = date.fromisoformat(str(end_date)[:10])
+    first_month = start if start.day == 1 else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    # The month holding end_date is always read from raw rows, which keeps
+    # end-of-day semantics identical for DATE and TIMESTAMP columns
+    end_month = end.replace(day=1)
+    return first_month.isoformat(), end_month.isoformat()
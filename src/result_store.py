@@ -0,0 +1,112 @@
+"""
+Server-side store of the match table rows behind the dashboard.
+
+The match table section used to send its rows to the browser twice, as the
+table data and again in the full-match-results-data dcc.Store, and the AI
+summary uploaded them back as State. Now the dcc.Store only carries the key
+of the rows (see make_table_reference). The table itself reads its pages in
+DuckDB (src/match_table.py); the AI summary, which needs every row, loads
+them here, computing them on first use.
+
+Rows are kept in a small per-process LRU and, when the shared cache is
+enabled (src/shared_cache.py), in its backend, so a request served by another
+worker finds them too. Both expire after RESULT_STORE_TTL seconds. A key that
+is no longer stored is not an error: the caller recomputes the rows from the
+filter state stored next to the key. The server never trusts the key sent
+back by the browser; it rebuilds it from that filter state.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Match tables kept per process (least recently used first out)
+RESULT_STORE_ENTRIES = int(os.environ.get('RESULT_STORE_ENTRIES', '32'))
+# Seconds stored rows stay available
+RESULT_STORE_TTL = int(os.environ.get('RESULT_STORE_TTL', '3600'))
+
+
+class ResultStore:
+    """
+    Bounded store of result rows with a TTL, shared across workers through the shared cache.
+
+    Args:
+        shared_cache: Optional src.shared_cache.SharedCache holding the rows for every worker
+        ttl: Seconds an entry stays available
+        max_entries: Number of entries kept in this process
+    """
+
+    def __init__(self, shared_cache=None, ttl=RESULT_STORE_TTL, max_entries=RESULT_STORE_ENTRIES):
+        self.shared_cache = shared_cache
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def put(self, key, rows):
+        """
+        Store rows under key.
+
+        Args:
+            key: Opaque key (see src/shared_cache.py:make_payload_key)
+            rows: JSON-serializable rows; shared with later readers, so treat them as read-only
+        """
+        self._put_local(key, rows)
+        if self.shared_cache is not None:
+            self.shared_cache.set(key, rows, self.ttl)
+
+    def _put_local(self, key, rows):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Get the rows stored under key.
+
+        Returns:
+            The rows, or None if they expired or were never stored where this process can see them
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        rows = self.shared_cache.get(key) if self.shared_cache is not None else None
+        if rows is None:
+            self.misses += 1
+            return None
+        self.shared_hits += 1
+        self._put_local(key, rows)
+        return rows
+
+    def stats(self):
+        """Get the hit and miss counters and the number of entries of this process."""
+        with self._lock:
+            return {'hits': self.hits, 'shared_hits': self.shared_hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+def make_table_reference(key, filters):
+    """
+    Build the dcc.Store value pointing at stored match table rows.
+
+    Args:
+        key: Key of the rows in the result store
+        filters: Dashboard filter values the rows were computed from, to recompute them once expired
+
+    Returns:
+        Small JSON-serializable dictionary
+    """
+    return {'key': key, 'filters': list(filters)}
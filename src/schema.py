@@ -0,0 +1,83 @@
+"""
+Compact column types of the frames served by the dashboard statements.
+
+DuckDB fetches scores as int32, or as nullable Int32 when a result happens to
+contain a missing score, weekdays as Int32 and the aggregate measures as
+int64. coerce_frame narrows every known column to one fixed dtype, whatever
+the data, so a frame costs less memory per request and per query cache entry
+and downstream code sees the same dtypes from the DuckDB statements and the
+NumPy match engine:
+
+- scores: nullable Int16 (always nullable, so missing scores are pd.NA)
+- result: the ordered Win/Draw/Loss/NA categorical of the team_matches ENUM
+- weekday: nullable Int8; aggregate measures: int32
+
+Team ids stay int32: they are the codes of the categorical name columns
+(src/teams.py:TeamDictionary.decode_match_columns). The opponent ids of the
+aggregate cells, NULL outside the opponent grouping set and so fetched as
+float64, become nullable Int32 like the match engine's. Dates stay
+datetime64, since pandas has no 32-bit date dtype without pyarrow.
+
+add_period_columns precomputes the day name and quarter labels of the
+day-of-week cells as categoricals, formatted once per distinct value instead
+of once per row.
+"""
+import numpy as np
+import pandas as pd
+
+from src.queries import ROLLUP_MEASURES
+
+SCORE_DTYPE = pd.Int16Dtype()
+# Same categories and order as the team_matches result ENUM (src/queries.py:get_team_matches_query)
+RESULT_DTYPE = pd.CategoricalDtype(['Win', 'Draw', 'Loss', 'NA'], ordered=True)
+WEEKDAY_DTYPE = pd.Int8Dtype()
+MEASURE_DTYPE = np.dtype(np.int32)
+AGGREGATE_TEAM_ID_DTYPE = pd.Int32Dtype()
+
+COLUMN_DTYPES = {
+    'home_score': SCORE_DTYPE,
+    'away_score': SCORE_DTYPE,
+    'team_score': SCORE_DTYPE,
+    'opponent_score': SCORE_DTYPE,
+    'result': RESULT_DTYPE,
+    'weekday': WEEKDAY_DTYPE,
+    **{measure: MEASURE_DTYPE for measure in ROLLUP_MEASURES}
+}
+
+# Weekday names by rollup weekday (0 = Monday)
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_NAME_DTYPE = pd.CategoricalDtype(DAY_NAMES, ordered=True)
+
+
+def coerce_frame(df):
+    """
+    Narrow the known columns of a statement result to their compact dtypes, in place.
+
+    Args:
+        df: Freshly fetched DataFrame (not yet shared, e.g. through the query cache)
+
+    Returns:
+        The same DataFrame
+    """
+    for column, dtype in COLUMN_DTYPES.items():
+        if column in df.columns and df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    if 'opponent_id' in df.columns and df['opponent_id'].dtype.kind == 'f':
+        df['opponent_id'] = df['opponent_id'].astype(AGGREGATE_TEAM_ID_DTYPE)
+    return df
+
+
+def add_period_columns(weekday_df):
+    """
+    Add the day_name and time_period (YYYY-Qn) categoricals of day-of-week cells.
+
+    Args:
+        weekday_df: Aggregate cells with month and weekday columns (see get_dashboard_aggregates)
+
+    Returns:
+        New DataFrame with the two columns added
+    """
+    quarters = pd.Categorical(pd.PeriodIndex(weekday_df['month'], freq='Q'), ordered=True)
+    time_period = quarters.rename_categories([f"{period.year}-Q{period.quarter}" for period in quarters.categories])
+    day_name = pd.Categorical.from_codes(weekday_df['weekday'].to_numpy(dtype=np.int8, na_value=-1), dtype=DAY_NAME_DTYPE)
+    return weekday_df.assign(day_name=day_name, time_period=time_period)
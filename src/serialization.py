@@ -0,0 +1,90 @@
+"""
+Fast JSON serialization of the Dash responses and shared cache payloads.
+
+Dash serializes callback responses and the layout with plotly's
+to_json_plotly. Its 'json' engine walks every figure with the stdlib
+PlotlyJSONEncoder; its 'orjson' engine first rebuilds the figures in Python
+to make them orjson-compatible, which on the dashboard figures costs more
+than orjson saves. to_json hands the figures to orjson directly instead,
+and only the objects orjson does not know (graph objects and Dash components
+through to_plotly_json, NumPy arrays and scalars, pandas objects) go through
+default, which encodes them like PlotlyJSONEncoder. NumPy arrays are not
+left to orjson's own NumPy support, which writes dates differently and
+rejects NaT; numeric figure arrays arrive base64-encoded by plotly anyway.
+
+install_dash_json_encoder makes Dash use to_json for its responses, the
+layout and the dependencies; without orjson installed it leaves Dash alone.
+"""
+import datetime
+import decimal
+import json
+
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+from src.logger import setup_logger
+
+try:
+    import orjson
+except ImportError:
+    # Optional: without it JSON is produced by plotly's encoder
+    orjson = None
+
+logger = setup_logger(__name__)
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+# Dash modules that imported dash._utils.to_json by name
+DASH_JSON_MODULES = ('dash.dash', 'dash._callback')
+
+
+def encode_default(obj):
+    """Encode an object orjson cannot serialize by itself, like PlotlyJSONEncoder does."""
+    if hasattr(obj, 'to_plotly_json'):
+        return obj.to_plotly_json()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'M':
+            # ISO strings at the array's precision, not integers
+            return np.datetime_as_string(obj).tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if hasattr(obj, 'tolist'):
+        # pandas Series and Index, masked arrays
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_json(value):
+    """
+    Serialize a Dash response, layout or payload (figures, components, tables, NumPy arrays) to a JSON string.
+
+    Falls back to plotly's encoder without orjson.
+    """
+    if orjson is None:
+        return json.dumps(value, cls=PlotlyJSONEncoder)
+    return orjson.dumps(value, default=encode_default, option=ORJSON_OPTIONS).decode('utf-8')
+
+
+def install_dash_json_encoder():
+    """Make Dash serialize its responses with to_json; does nothing without orjson."""
+    if orjson is None:
+        logger.info("orjson is not installed, Dash responses use plotly's JSON encoder")
+        return
+    import importlib
+
+    for name in DASH_JSON_MODULES:
+        module = importlib.import_module(name)
+        if hasattr(module, 'to_json'):
+            module.to_json = to_json
+        else:
+            logger.warning(f"{name} has no to_json, its responses keep Dash's JSON encoder")
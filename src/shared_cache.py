@@ -0,0 +1,370 @@
+"""
+Shared cache of computed dashboard payloads.
+
+The in-process result cache (src/cache.py) is private to one gunicorn
+worker. This cache stores finished dashboard payloads where every worker,
+and with Redis every machine, can read them, so a popular view is computed
+once and reused by cold workers. get and set also let other stores, such
+as the match table rows of src/result_store.py, keep entries there.
+
+Two backends implement the same small interface (get, set, add, delete):
+
+- LocalCacheBackend: a SQLite file shared by the workers of one machine
+- RedisCacheBackend: any server speaking the Redis protocol (RESP), using
+  a minimal client built on the standard library
+
+Entries expire after a TTL. Keys include the parquet checksum and the team
+groups version, so entries of old data or old groups are never read; the TTL
+only bounds how long they linger.
+
+Stampede protection: on a miss the first worker takes a short-lived lock key
+(set-if-absent) and computes the payload; the others wait for the payload to
+appear instead of computing it too, and fall back to computing it themselves
+if the lock holder does not deliver in time.
+
+Payloads are serialized to JSON like Dash responses (src/serialization.py:
+orjson, figures, NumPy arrays and dates included) and compressed with zlib.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+from src.logger import setup_logger
+from src.serialization import to_json
+
+logger = setup_logger(__name__)
+
+# 'local' (SQLite file), 'redis' or 'none'
+SHARED_CACHE_BACKEND = os.environ.get('SHARED_CACHE_BACKEND', 'local')
+SHARED_CACHE_URL = os.environ.get('SHARED_CACHE_URL', 'redis://localhost:6379/0')
+# Seconds a payload stays in the shared cache
+SHARED_CACHE_TTL = int(os.environ.get('SHARED_CACHE_TTL', '3600'))
+
+# Seconds a worker may hold the compute lock of a key, and waits for another worker's payload
+LOCK_TTL = 30
+LOCK_WAIT = 10
+LOCK_POLL_INTERVAL = 0.05
+# Seconds the backend is bypassed after a failure, so an unreachable server does not slow every request
+ERROR_BACKOFF = 30
+
+
+def serialize_payload(payload):
+    """Serialize a dashboard payload (figures, tables, plain values) to compressed JSON."""
+    return zlib.compress(to_json(payload).encode('utf-8'))
+
+
+def deserialize_payload(data):
+    """Inverse of serialize_payload; figures come back as plain dictionaries."""
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def make_payload_key(namespace, *parts):
+    """Build a cache key from a namespace and JSON-serializable parts."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class LocalCacheBackend:
+    """
+    Shared cache in a SQLite file, for the workers of one machine.
+
+    Each operation opens its own short-lived connection, so the backend is
+    safe across fork() and threads.
+
+    Args:
+        path: Path of the SQLite cache file (outside the LiteFS mount, it is not replicated)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)", (key, value, now + ttl))
+            # Keep the file from growing with entries nobody reads any more
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add(self, key, value, ttl):
+        """Set key only if it is absent (or expired); returns True if it was set."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO cache_entries VALUES (?, ?, ?)", (key, value, now + ttl))
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def delete(self, key):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RedisCacheBackend:
+    """
+    Shared cache on a Redis-protocol server (Redis, Valkey, ...), for every machine.
+
+    Speaks RESP over a plain socket with the handful of commands the cache
+    needs. The socket is reopened after fork() and guarded by a lock, so one
+    backend can be shared by the threads of a worker.
+
+    Args:
+        url: redis://[:password@]host[:port][/db]
+        timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, url, timeout=1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+        self._pid = None
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile('rb')
+        self._pid = os.getpid()
+        if self.password:
+            self._send('AUTH', self.password)
+        if self.db:
+            self._send('SELECT', self.db)
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply from the cache server: {line!r}")
+
+    def command(self, *args):
+        """Run one command, reconnecting once if the connection was lost or inherited across fork()."""
+        with self._lock:
+            if self._sock is None or self._pid != os.getpid():
+                self._connect()
+            try:
+                return self._send(*args)
+            except (ConnectionError, OSError):
+                self._close()
+                self._connect()
+                return self._send(*args)
+
+    def get(self, key):
+        return self.command('GET', key)
+
+    def set(self, key, value, ttl):
+        self.command('SET', key, value, 'PX', int(ttl * 1000))
+
+    def add(self, key, value, ttl):
+        return self.command('SET', key, value, 'NX', 'PX', int(ttl * 1000)) == 'OK'
+
+    def delete(self, key):
+        self.command('DEL', key)
+
+
+def create_shared_cache_backend(kind=SHARED_CACHE_BACKEND, path=None, url=SHARED_CACHE_URL):
+    """
+    Create the configured shared cache backend.
+
+    Args:
+        kind: 'local', 'redis' or 'none'
+        path: SQLite file of the local backend
+        url: Server URL of the redis backend
+
+    Returns:
+        Backend instance, or None if the shared cache is disabled
+    """
+    if kind == 'local':
+        return LocalCacheBackend(path)
+    if kind == 'redis':
+        return RedisCacheBackend(url)
+    if kind == 'none':
+        return None
+    raise ValueError(f"Unknown SHARED_CACHE_BACKEND: {kind}")
+
+
+class SharedCache:
+    """
+    Get-or-compute front end of a shared cache backend with stampede protection.
+
+    Backend failures never fail a request: they are logged, the payload is
+    computed directly and the backend is bypassed for ERROR_BACKOFF seconds.
+
+    Args:
+        backend: LocalCacheBackend, RedisCacheBackend or None (disabled)
+        ttl: Seconds a payload stays cached
+    """
+
+    def __init__(self, backend, ttl=SHARED_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        # Counters and the backoff deadline are shared by the threads of a worker
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.errors = 0
+        self._retry_at = 0.0
+
+    def _call(self, method, *args):
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                return None
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._retry_at = time.monotonic() + ERROR_BACKOFF
+            logger.warning(f"Shared cache {method} failed, bypassing it for {ERROR_BACKOFF}s: {str(e)}")
+            return None
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_or_compute(self, key, compute):
+        """
+        Get the payload stored under key, or compute and store it.
+
+        Args:
+            key: Cache key (see make_payload_key)
+            compute: Callable producing the payload on a miss
+
+        Returns:
+            The payload; when served from the cache, figures are plain dictionaries
+        """
+        if self.backend is None:
+            return compute()
+
+        data = self._call('get', key)
+        if data is not None:
+            self._count('hits')
+            return deserialize_payload(data)
+
+        self._count('misses')
+        lock_key = f"{key}:lock"
+        if self._call('add', lock_key, b'1', LOCK_TTL) is False:
+            # Another worker is computing this payload; wait for it
+            self._count('waits')
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                data = self._call('get', key)
+                if data is not None:
+                    return deserialize_payload(data)
+            logger.warning(f"Timed out waiting for shared cache key {key}, computing it here")
+            return compute()
+
+        try:
+            payload = compute()
+            self._call('set', key, serialize_payload(payload), self.ttl)
+            return payload
+        finally:
+            self._call('delete', lock_key)
+
+    def get(self, key):
+        """
+        Get the payload stored under key.
+
+        Returns:
+            The payload, or None on a miss (or when the backend is unavailable)
+        """
+        if self.backend is None:
+            return None
+        data = self._call('get', key)
+        return None if data is None else deserialize_payload(data)
+
+    def set(self, key, payload, ttl=None):
+        """Store a payload under key for ttl seconds (the cache TTL by default)."""
+        if self.backend is not None:
+            self._call('set', key, serialize_payload(payload), ttl or self.ttl)
+
+    def stats(self):
+        """Get the hit, miss, wait and error counters of this process."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'waits': self.waits, 'errors': self.errors}
@@ -0,0 +1,519 @@
+"""
+Parameterized statements for the dashboard hot path.
+
+Every query issued per request is one of the fixed statements below. The SQL
+text never changes; team ids, dates and opponent ids are passed as bound
+parameters ($name placeholders), so nothing user-controlled is ever spliced
+into SQL and no escaping is needed.
+
+execute_statement times every execution and keeps per-statement counters
+(see get_statement_stats), so query latency can be tracked per statement.
+Given a cache scope it serves repeated executions from the result cache in
+src/cache.py. execute_concurrently runs the independent statements of one
+request at the same time on separate cursors.
+
+Every execution has a deadline (STATEMENT_TIMEOUT_MS). A watchdog thread
+interrupts statements that run past it, well before gunicorn would kill the
+worker, and execute_statement raises StatementTimeout with the offending
+parameters instead.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import duckdb
+import numpy as np
+
+from src.queries import MATCH_COLUMNS, OPPONENT_COLUMNS, ROLLUP_ROW_COLUMNS, ROLLUP_MEASURES, get_full_month_range
+from src.cache import query_cache
+from src.schema import coerce_frame, add_period_columns
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Executions slower than this are logged as warnings
+SLOW_STATEMENT_MS = float(os.environ.get('SLOW_STATEMENT_MS', '500'))
+
+# Statements still running after this long are interrupted; keep it below the
+# gunicorn worker timeout. 0 disables the deadline.
+STATEMENT_TIMEOUT_MS = float(os.environ.get('STATEMENT_TIMEOUT_MS', '10000'))
+
+# Threads running the concurrent statements of requests; 0 runs them one after another
+STATEMENT_WORKERS = int(os.environ.get('STATEMENT_WORKERS', '4'))
+
+DATE_RANGE = "date >= $start_date AND date <= $end_date"
+
+# Members of a team group, from the DuckDB mirror of the team groups (src/team_groups.py)
+GROUP_MEMBER_IDS = "(SELECT team_id FROM team_group_members WHERE group_name = $group_name)"
+
+# Teams a combined team stands for, from the alias table built at load (src/db.py:load_team_aliases)
+CANONICAL_MEMBER_IDS = "(SELECT team_id FROM team_aliases WHERE canonical_name = $canonical_name)"
+
+
+def get_members_filter(member_ids):
+    """
+    Filter on the rows of a set of teams, one row per match.
+
+    A match between two of the teams appears once per side; only its home side
+    is kept, like the is_group rule of ROLLUP_FILTER. A filter on the row
+    itself avoids the window sort of a ROW_NUMBER() QUALIFY over match_id.
+    """
+    return f"team_id IN {member_ids} AND (is_home OR opponent_id IS NULL OR opponent_id NOT IN {member_ids})"
+
+
+# A decisive match between two members of a group counts with the home side's result. The group
+# queries before team_matches always counted it as a win, so group KPI cards differ for such matches.
+GROUP_MEMBERS = get_members_filter(GROUP_MEMBER_IDS)
+CANONICAL_MEMBERS = get_members_filter(CANONICAL_MEMBER_IDS)
+
+# Rollup filters: the selected teams, the optional opponent filter and, for
+# groups, counting a match between two members once from the home side.
+# The id lists are unnested into semi-joins, which are hashed instead of
+# scanning the list for every row.
+ROLLUP_FILTER = """team_id IN (SELECT UNNEST($team_ids::INTEGER[]))
+        AND ($opponent_ids IS NULL OR opponent_id IN (SELECT UNNEST($opponent_ids::INTEGER[])))
+        AND (NOT $is_group OR is_home OR opponent_id IS NULL
+            OR opponent_id NOT IN (SELECT UNNEST($team_ids::INTEGER[])))"""
+
+
+# Grouping sets of the aggregate statement, by the value of GROUPING(month, weekday, opponent_id)
+AGGREGATE_GROUPING_SETS = {1: 'weekday', 6: 'opponent', 7: 'total'}
+
+
+def get_aggregates_statement():
+    """
+    Build the dashboard aggregate statement.
+
+    One pass over the selection produces three grouping sets: (month,
+    weekday) cells for the day-of-week charts, per-opponent rows for the
+    opponent charts and a single grand-total row for the cards and the result
+    distribution. Whole months ($first_month <= month < $end_month, see
+    src.queries.get_full_month_range) are summed from team_match_rollup; only
+    the rows of the partial months at either end of the range are read from
+    team_matches.
+    """
+    measures = ", ".join(f"CAST(COALESCE(SUM({measure}), 0) AS BIGINT) AS {measure}" for measure in ROLLUP_MEASURES)
+    grouping_set = " ".join(f"WHEN {value} THEN '{name}'" for value, name in AGGREGATE_GROUPING_SETS.items())
+    return f"""
+    SELECT CASE GROUPING(month, weekday, opponent_id) {grouping_set} END AS grouping_set,
+        month, weekday, opponent_id, {measures}
+    FROM (
+        SELECT * FROM team_match_rollup
+        WHERE {ROLLUP_FILTER}
+            AND month >= $first_month AND month < $end_month
+        UNION ALL BY NAME
+        SELECT {ROLLUP_ROW_COLUMNS}
+        FROM team_matches
+        WHERE {DATE_RANGE} AND {ROLLUP_FILTER}
+            AND NOT (date >= $first_month AND date < $end_month)
+    )
+    GROUP BY GROUPING SETS ((month, weekday), (opponent_id), ())
+    ORDER BY grouping_set, month, weekday, opponent_id
+    """
+
+
+# Text of the match table columns, formatted like the rows the table used to receive (YYYY-MM-DD dates,
+# "home - away" scores); filters and sorting compare these strings
+MATCH_TABLE_COLUMNS = {
+    'date': "strftime(m.date, '%Y-%m-%d')",
+    'home_team': "home.team_name",
+    'away_team': "away.team_name",
+    'score': """CASE WHEN m.result = 'NA' THEN '<NA> - <NA>'
+            ELSE COALESCE(CAST(m.home_score AS VARCHAR), '<NA>') || ' - ' || COALESCE(CAST(m.away_score AS VARCHAR), '<NA>') END""",
+    'result': "CAST(m.result AS VARCHAR)",
+    'opponent': "opponent.team_name"
+}
+
+# Operators of the match table column filters; the operator and value of each column are bound parameters
+MATCH_TABLE_FILTER_OPERATORS = {
+    'contains': "contains(lower({column}), lower({value}))",
+    'datestartswith': "starts_with({column}, {value})",
+    '=': "{column} = {value}",
+    '!=': "{column} <> {value}",
+    '<': "{column} < {value}",
+    '<=': "{column} <= {value}",
+    '>': "{column} > {value}",
+    '>=': "{column} >= {value}"
+}
+
+
+def get_match_page_statement(descending):
+    """
+    Build a match table page statement.
+
+    The rows of the selection ($team_ids, $is_group, $opponent_ids and the
+    date range, counted like the aggregates) are filtered by the result
+    dropdown ($results) and by one optional condition per table column
+    ($<column>_op, $<column>_value), ordered by ($sort_column, date,
+    match_id) in one direction and cut to one page.
+
+    Pages are found by keyset: given the (sort key, date, match id) of the
+    row before the page ($after_key, $after_date, $after_match_id), the next
+    page starts right after it, whatever the page number. $after_date is an
+    ISO timestamp with the time of day, which orders the matches of one day. $offset skips rows
+    instead, for jumps to pages without a known neighbour.
+
+    Every row carries the number of rows of the whole filtered selection in
+    total_rows.
+
+    Args:
+        descending: Order of the rows (two statements, as the direction cannot be bound)
+    """
+    sort_key = " ".join(f"WHEN '{name}' THEN {column}" for name, column in MATCH_TABLE_COLUMNS.items())
+    column_filters = []
+    for name, column in MATCH_TABLE_COLUMNS.items():
+        conditions = " ".join(f"WHEN '{op}' THEN {template.format(column=column, value=f'${name}_value')}"
+                              for op, template in MATCH_TABLE_FILTER_OPERATORS.items())
+        column_filters.append(f"(${name}_op IS NULL OR COALESCE(CASE ${name}_op {conditions} END, FALSE))")
+    selected_columns = ", ".join(f"{column} AS {name}" for name, column in MATCH_TABLE_COLUMNS.items())
+    comparison = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+    return f"""
+    WITH selection AS (
+        SELECT {MATCH_COLUMNS}, match_id
+        FROM team_matches
+        WHERE {DATE_RANGE} AND {ROLLUP_FILTER}
+            AND ($results IS NULL OR CAST(result AS VARCHAR) IN (SELECT UNNEST($results::VARCHAR[])))
+    ),
+    selected AS (
+        SELECT {selected_columns}, m.date AS match_date, m.match_id,
+            COALESCE(CASE $sort_column {sort_key} END, '') AS sort_key
+        FROM selection m
+        LEFT JOIN team_dictionary home ON home.team_id = m.home_team_id
+        LEFT JOIN team_dictionary away ON away.team_id = m.away_team_id
+        LEFT JOIN team_dictionary opponent ON opponent.team_id = m.opponent_id
+        WHERE {' AND '.join(column_filters)}
+    )
+    SELECT *, (SELECT COUNT(*) FROM selected) AS total_rows
+    FROM selected
+    WHERE $after_key IS NULL
+        OR (sort_key, match_date, match_id) {comparison} ($after_key, CAST($after_date AS TIMESTAMP), $after_match_id)
+    ORDER BY sort_key {direction}, match_date {direction}, match_id {direction}
+    LIMIT $limit OFFSET $offset
+    """
+
+
+STATEMENTS = {
+    # Matches of one team: $team_id, $start_date, $end_date
+    'team_matches': f"""
+    SELECT {MATCH_COLUMNS}
+    FROM team_matches
+    WHERE {DATE_RANGE} AND team_id = $team_id
+    ORDER BY date DESC, match_id DESC
+    """,
+    # Matches of a team group, one row per match: $group_name, $start_date, $end_date
+    'group_matches': f"""
+    SELECT {MATCH_COLUMNS}
+    FROM team_matches
+    WHERE {DATE_RANGE} AND {GROUP_MEMBERS}
+    ORDER BY date DESC, match_id DESC
+    """,
+    # Matches of a combined team, one row per match: $canonical_name, $start_date, $end_date
+    'canonical_matches': f"""
+    SELECT {MATCH_COLUMNS}
+    FROM team_matches
+    WHERE {DATE_RANGE} AND {CANONICAL_MEMBERS}
+    ORDER BY date DESC, match_id DESC
+    """,
+    # Opponents of one team: $team_id, $start_date, $end_date
+    'team_opponents': f"""
+    SELECT {OPPONENT_COLUMNS}
+    FROM team_matches
+    WHERE {DATE_RANGE} AND team_id = $team_id
+    """,
+    # Opponents of a team group: $group_name, $start_date, $end_date
+    'group_opponents': f"""
+    SELECT {OPPONENT_COLUMNS}
+    FROM team_matches
+    WHERE {DATE_RANGE} AND {GROUP_MEMBERS}
+    """,
+    # Opponents of a combined team: $canonical_name, $start_date, $end_date
+    'canonical_opponents': f"""
+    SELECT {OPPONENT_COLUMNS}
+    FROM team_matches
+    WHERE {DATE_RANGE} AND {CANONICAL_MEMBERS}
+    """,
+    # Card and chart aggregates: $team_ids, $is_group, $opponent_ids, $start_date, $end_date, $first_month, $end_month
+    'dashboard_aggregates': get_aggregates_statement(),
+    # Match table pages: see get_match_page_statement
+    'match_page_desc': get_match_page_statement(descending=True),
+    'match_page_asc': get_match_page_statement(descending=False),
+}
+
+
+class StatementTimeout(Exception):
+    """A statement ran past its deadline and was interrupted."""
+
+    def __init__(self, name, params, elapsed_ms):
+        super().__init__(f"Statement {name} interrupted after {elapsed_ms:.0f}ms")
+        self.name = name
+        self.params = params
+        self.elapsed_ms = elapsed_ms
+
+
+class StatementStats:
+    """Execution counters of one statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def add(self, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'timeouts': self.timeouts
+        }
+
+
+class StatementWatchdog:
+    """
+    Interrupts statements that run past their deadline.
+
+    One daemon thread per process sleeps until the earliest registered
+    deadline and calls interrupt() on the connection of every statement that
+    is still running by then. It is started on first use, so each forked
+    worker gets its own.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # Token -> (deadline, connection)
+        self._deadlines = {}
+        self._thread = None
+        self._pid = None
+
+    @contextmanager
+    def watch(self, conn, timeout_ms):
+        """Interrupt conn if the body of the with block runs longer than timeout_ms."""
+        if timeout_ms <= 0:
+            yield
+            return
+
+        token = object()
+        with self._condition:
+            if self._thread is None or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='statement-watchdog', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            self._deadlines[token] = (time.monotonic() + timeout_ms / 1000, conn)
+            self._condition.notify()
+        try:
+            yield
+        finally:
+            # Under the same lock as the interrupts, so a finished statement is never interrupted
+            with self._condition:
+                self._deadlines.pop(token, None)
+
+    def _run(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                for token, (deadline, conn) in list(self._deadlines.items()):
+                    if deadline <= now:
+                        del self._deadlines[token]
+                        try:
+                            conn.interrupt()
+                        except Exception as e:
+                            logger.error(f"Could not interrupt statement: {str(e)}")
+                next_deadline = min((deadline for deadline, _ in self._deadlines.values()), default=None)
+                self._condition.wait(None if next_deadline is None else next_deadline - now)
+
+
+_statement_stats = defaultdict(StatementStats)
+_stats_lock = threading.Lock()
+_watchdog = StatementWatchdog()
+
+# Created on first use in each process; threads do not survive fork()
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_statement_sql(name):
+    """Get the SQL text of a statement."""
+    return STATEMENTS[name]
+
+
+def bind_parameters(params):
+    """Convert parameter values to types DuckDB binds directly (NumPy arrays and scalars to Python)."""
+    bound = {}
+    for key, value in params.items():
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif isinstance(value, (list, tuple)):
+            value = [item.item() if isinstance(item, np.generic) else item for item in value]
+        elif isinstance(value, np.generic):
+            value = value.item()
+        bound[key] = value
+    return bound
+
+
+def execute_statement(conn, name, cache_scope=None, **params):
+    """
+    Execute a statement and fetch its result.
+
+    Args:
+        conn: DuckDB connection (or ServingConnection)
+        name: Statement name (key of STATEMENTS)
+        cache_scope: Optional (data generation version, team groups version) the
+            result is valid for; when given the result cache is used
+        **params: Values for the statement's $parameters
+
+    Returns:
+        pandas DataFrame with the result in the compact dtypes of src/schema.py
+        (read-only when cached)
+
+    Raises:
+        StatementTimeout: The statement ran past STATEMENT_TIMEOUT_MS
+    """
+    cache_key = None
+    if cache_scope is not None and query_cache.enabled:
+        cache_key = query_cache.make_key(name, params, cache_scope)
+        cached_df = query_cache.get(cache_key)
+        if cached_df is not None:
+            logger.debug(f"Statement {name}: served from cache, {len(cached_df)} rows")
+            return cached_df
+
+    bound = bind_parameters(params)
+    started = time.perf_counter()
+    try:
+        with _watchdog.watch(conn, STATEMENT_TIMEOUT_MS):
+            result_df = conn.execute(STATEMENTS[name], bound).fetchdf()
+    except duckdb.InterruptException:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with _stats_lock:
+            _statement_stats[name].timeouts += 1
+        logger.warning(f"Statement {name} interrupted after {elapsed_ms:.1f}ms (limit {STATEMENT_TIMEOUT_MS:.0f}ms), "
+                       f"parameters: {bound}")
+        raise StatementTimeout(name, bound, elapsed_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    coerce_frame(result_df)
+
+    with _stats_lock:
+        _statement_stats[name].add(elapsed_ms)
+
+    if elapsed_ms >= SLOW_STATEMENT_MS:
+        logger.warning(f"Slow statement {name}: {elapsed_ms:.1f}ms, {len(result_df)} rows")
+    else:
+        logger.debug(f"Statement {name}: {elapsed_ms:.1f}ms, {len(result_df)} rows")
+
+    if cache_key is not None:
+        query_cache.put(cache_key, result_df)
+    return result_df
+
+
+def get_statement_executor():
+    """Get this process's statement thread pool, or None if STATEMENT_WORKERS is 0."""
+    global _executor, _executor_pid
+    if STATEMENT_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=STATEMENT_WORKERS, thread_name_prefix='statement')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run_on_pooled_cursor(cursors, pooled, task, prepare):
+    try:
+        if prepare is not None:
+            prepare(pooled)
+        return task(pooled)
+    finally:
+        cursors.checkin(pooled)
+
+
+def execute_concurrently(cursors, conn, tasks, prepare=None):
+    """
+    Run the independent queries of one request at the same time.
+
+    A callback declares its queries up front as callables taking a
+    connection. The first runs on the caller's cursor in the calling thread;
+    every other one runs on a statement thread with its own cursor from the
+    pool, so the request takes as long as its slowest query. Cursors are taken
+    without waiting: when the pool is exhausted the remaining queries run on
+    the caller's cursor after the first, so a busy worker falls back to
+    sequential execution instead of blocking on itself.
+
+    Args:
+        cursors: CursorPool of the request's data generation
+        conn: Cursor the calling thread already holds
+        tasks: Dictionary of result name to callable(conn)
+        prepare: Optional callable(conn) run on every extra cursor before its
+            query, e.g. to mirror the team groups into it
+
+    Returns:
+        Dictionary of result name to the value returned by its callable
+    """
+    names = list(tasks)
+    executor = get_statement_executor()
+    futures = {}
+    inline = names[:1]
+    for name in names[1:]:
+        pooled = cursors.checkout(blocking=False) if executor is not None else None
+        if pooled is None:
+            inline.append(name)
+            continue
+        futures[name] = executor.submit(_run_on_pooled_cursor, cursors, pooled, tasks[name], prepare)
+
+    results = {name: tasks[name](conn) for name in inline}
+    for name, future in futures.items():
+        results[name] = future.result()
+    return {name: results[name] for name in names}
+
+
+def get_dashboard_aggregates(conn, team_ids, is_group, start_date, end_date, opponent_ids=None, cache_scope=None):
+    """
+    Compute every aggregate the dashboard shows for a selection in one statement.
+
+    Args:
+        conn: DuckDB connection (or ServingConnection)
+        team_ids: Team ids of the selected team, group or combined team
+        is_group: Count a match between two selected teams once (from the home side)
+        start_date: Start date (YYYY-MM-DD), inclusive
+        end_date: End date (YYYY-MM-DD), inclusive
+        opponent_ids: Optional opponent ids to restrict the matches to
+        cache_scope: Optional cache scope (see execute_statement)
+
+    Returns:
+        Dictionary with 'weekday' (DataFrame of (month, weekday) cells, with
+        day_name and time_period labels), 'opponent' (DataFrame of per-opponent rows) and 'totals' (dictionary
+        keyed like src.metrics_index.METRICS)
+    """
+    first_month, end_month = get_full_month_range(start_date, end_date)
+    aggregates_df = execute_statement(conn, 'dashboard_aggregates', cache_scope, team_ids=team_ids, is_group=is_group,
+                                      opponent_ids=opponent_ids, start_date=start_date, end_date=end_date,
+                                      first_month=first_month, end_month=end_month)
+    grouping_sets = aggregates_df['grouping_set']
+    total = aggregates_df[grouping_sets == 'total'].iloc[0]
+    return {
+        'weekday': add_period_columns(aggregates_df[grouping_sets == 'weekday'].reset_index(drop=True)),
+        'opponent': aggregates_df[grouping_sets == 'opponent'].reset_index(drop=True),
+        'totals': {
+            'games': int(total['valid_matches']),
+            'wins': int(total['wins']),
+            'draws': int(total['draws']),
+            'losses': int(total['losses']),
+            'goals_for': int(total['valid_goals_for']),
+            'goals_against': int(total['valid_goals_against'])
+        }
+    }
+
+
+def get_statement_stats():
+    """Get the execution counters of every statement run in this process."""
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in _statement_stats.items()}
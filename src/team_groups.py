@@ -0,0 +1,52 @@
+"""
+DuckDB mirror of the team groups stored in SQLite.
+
+Team groups are edited in SQLite (src/db.py). Group queries instead filter
+team_matches with a semi-join on team_group_members, a temporary table of
+(group_name, team_id) rows in the DuckDB connection, so their cost does not
+grow with the size of the group.
+
+Every committed create, update or delete bumps the SQLite team groups
+version. Before running a group query a request syncs the mirror of its
+connection, which rebuilds the table only when the version changed since it
+was last mirrored into that connection.
+"""
+import threading
+import weakref
+
+from src.db import load_team_group_members
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TeamGroupMirror:
+    """
+    Tracks which team groups version is mirrored into each connection of a data generation.
+
+    Args:
+        team_dictionary: TeamDictionary of the generation, used to store members as team ids
+    """
+
+    def __init__(self, team_dictionary):
+        self.team_dictionary = team_dictionary
+        self._lock = threading.Lock()
+        # Connection -> (handle session, mirrored version)
+        self._mirrored = weakref.WeakKeyDictionary()
+
+    def sync(self, conn, team_groups, version):
+        """
+        Make sure conn's team_group_members table holds the given team groups version.
+
+        Args:
+            conn: DuckDB connection (or ServingConnection)
+            team_groups: Dictionary of group name to team names
+            version: Team groups version the dictionary was read at
+        """
+        key = (getattr(conn, 'session', 0), version)
+        with self._lock:
+            if self._mirrored.get(conn) == key:
+                return
+            load_team_group_members(conn, team_groups, self.team_dictionary)
+            self._mirrored[conn] = key
+        logger.debug(f"Mirrored {len(team_groups)} team groups (version {version}) into DuckDB")
@@ -0,0 +1,177 @@
+"""
+Team dictionary for the soccer dashboard.
+
+Team names are dictionary-encoded at load time: every distinct name gets an
+int32 id (ids follow alphabetical order, so id == position in the team list).
+The serving tables and the Python filtering paths work on ids only; names are
+decoded when a frame is about to be rendered.
+
+Ids are assigned per data generation, so anything persisted (such as the team
+group members in SQLite) keeps storing names and is resolved through the
+dictionary of the generation serving the request.
+
+Combined teams such as "Key West (Combined)" are defined by alias rules: a
+canonical name and the LIKE patterns (matched against the lowercased team
+name) of the teams it stands for. The rules are evaluated once per distinct
+team when the data is loaded (src/db.py:load_team_aliases), and combined-team
+queries filter on the resulting ids.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Columns of a match frame holding team ids, and the name column each decodes to
+TEAM_ID_COLUMNS = {
+    'home_team_id': 'home_team',
+    'away_team_id': 'away_team',
+    'team_id': 'team',
+    'opponent_id': 'opponent_team',
+}
+
+# Canonical combined team -> LIKE patterns over the lowercased team name
+DEFAULT_TEAM_ALIAS_RULES = {
+    'Key West (Combined)': ['%key west%', '%keywest%', '%key-west%', '%kw%', 'kwfc', '%keystone%'],
+}
+
+
+def get_team_alias_rules():
+    """
+    Get the combined team alias rules.
+
+    TEAM_ALIAS_RULES may point to a JSON file with the same shape as
+    DEFAULT_TEAM_ALIAS_RULES ({"canonical name": ["pattern", ...]}) to replace
+    the defaults.
+    """
+    rules_file = os.environ.get('TEAM_ALIAS_RULES')
+    if not rules_file:
+        return DEFAULT_TEAM_ALIAS_RULES
+    with open(rules_file) as f:
+        return json.load(f)
+
+
+def get_team_alias_rules_checksum(rules):
+    """Checksum of a set of alias rules, recorded in the serving database to detect rule changes."""
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+
+def get_team_name_key(team_name):
+    """Normalized form of a team name used to match spelling variants (lowercase, alphanumeric only)."""
+    if not isinstance(team_name, str):
+        return ""
+    return re.sub('[^a-z0-9]', '', team_name.lower())
+
+
+class TeamDictionary:
+    """Bidirectional mapping between team names and int32 team ids."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._names_array = np.array(self.names, dtype=object)
+        # Categories in id order, so a team id column is already the codes of a name column
+        self.category_dtype = pd.CategoricalDtype(self.names)
+        self._ids = {name: team_id for team_id, name in enumerate(self.names)}
+        self._variants = defaultdict(list)
+        for team_id, name in enumerate(self.names):
+            self._variants[get_team_name_key(name)].append(team_id)
+
+    @classmethod
+    def from_connection(cls, conn):
+        """Load the dictionary built into a serving database."""
+        rows = conn.execute("SELECT team_name FROM team_dictionary ORDER BY team_id").fetchall()
+        return cls([row[0] for row in rows])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def get_id(self, name):
+        """Get the id of a team name, or None if the team is not in the data."""
+        return self._ids.get(name)
+
+    def get_name(self, team_id):
+        return self.names[team_id]
+
+    def get_ids(self, names, include_variants=False):
+        """
+        Resolve team names to a sorted array of unique ids.
+
+        Args:
+            names: Iterable of team names; unknown names are ignored
+            include_variants: Also include teams whose normalized name matches,
+                e.g. "Key-West FC" for "Key West FC"
+
+        Returns:
+            numpy int32 array of team ids
+        """
+        ids = set()
+        for name in names or []:
+            team_id = self._ids.get(name)
+            if team_id is not None:
+                ids.add(team_id)
+            if include_variants:
+                ids.update(self._variants.get(get_team_name_key(name), ()))
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def find_ids(self, predicate):
+        """Get the ids of all teams whose name satisfies predicate."""
+        return np.array([team_id for team_id, name in enumerate(self.names) if predicate(name)], dtype=np.int32)
+
+    def decode(self, team_ids):
+        """Decode an array of team ids to an object array of names."""
+        return self._names_array[np.asarray(team_ids, dtype=np.int64)]
+
+    def decode_categorical(self, team_ids):
+        """
+        Decode an array of team ids to a categorical of names.
+
+        The ids are used as the category codes, so no per-row name objects are
+        allocated and the categories (the team names) are shared by every frame.
+        """
+        return pd.Categorical.from_codes(np.asarray(team_ids), dtype=self.category_dtype)
+
+    def decode_match_columns(self, df):
+        """
+        Add the team name columns for every team id column in a match frame.
+
+        Returns:
+            DataFrame with home_team/away_team/team/opponent_team categorical name columns added
+        """
+        decoded_columns = {
+            name_column: self.decode_categorical(df[id_column].to_numpy(dtype=np.int32))
+            for id_column, name_column in TEAM_ID_COLUMNS.items()
+            if id_column in df.columns
+        }
+        return df.assign(**decoded_columns)
+
+
+class TeamAliases:
+    """Team ids of every canonical combined team, as built into team_aliases."""
+
+    def __init__(self, rows):
+        members = defaultdict(list)
+        for canonical_name, team_id in rows:
+            members[canonical_name].append(team_id)
+        self._members = {name: np.array(sorted(team_ids), dtype=np.int32) for name, team_ids in members.items()}
+
+    @classmethod
+    def from_connection(cls, conn):
+        """Load the aliases built into a serving database."""
+        return cls(conn.execute("SELECT canonical_name, team_id FROM team_aliases").fetchall())
+
+    def __contains__(self, canonical_name):
+        return canonical_name in self._members
+
+    @property
+    def names(self):
+        return list(self._members)
+
+    def get_ids(self, canonical_name):
+        """Get the team ids a canonical team stands for (empty if it is unknown)."""
+        return self._members.get(canonical_name, np.array([], dtype=np.int32))
@@ -2,6 +2,10 @@ from datetime import date
 import pandas as pd
 import re
 
+from src.logger import setup_logger
+
+logger = setup_logger(__name__)
+
 
 def get_date_range_options(conn=None):
     today = date.today()
@@ -66,45 +70,27 @@ def normalize_team_names_in_dataframe(df, column_name='opponent_team', output_co
     return normalized_df
 
 
-def filter_matches_by_opponents(matches_df, opponents, normalized_column='normalized_opponent'):
+def filter_matches_by_opponents(matches_df, opponent_ids):
     """
     Filter matches dataframe to include only matches against specific opponents.
 
     Args:
-        matches_df: DataFrame containing match data
-        opponents: List of opponent team names
-        normalized_column: Name of the normalized column to use for matching
+        matches_df: DataFrame containing match data with an opponent_id column
+        opponent_ids: Team ids of the opponents (see TeamDictionary.get_ids), or
+            None for no opponent filter. An empty list selects no matches, like the
+            opponent filter of the statements (e.g. opponents not in the current data).
 
     Returns:
         Filtered DataFrame containing only matches against specified opponents
     """
-    if matches_df.empty or not opponents or len(opponents) == 0:
+    if matches_df.empty or opponent_ids is None:
         return matches_df
 
-    # Ensure we have a normalized column
-    if normalized_column not in matches_df.columns:
-        matches_df = normalize_team_names_in_dataframe(matches_df, output_column=normalized_column)
-
-    # Normalize the opponent names for matching
-    normalized_opponents = [normalize_team_name(op) for op in opponents]
-
-    print(f"Debug: Filtering matches against opponents: {opponents}")
-    print(f"Debug: Normalized opponent names for matching: {normalized_opponents}")
-    print(f"Debug: Unique normalized opponents in data: {matches_df[normalized_column].unique()}")
-
-    # Create a mask of matches against the specified opponents using exact matching
-    # This improves reliability compared to substring matching
-    mask = matches_df['opponent_team'].isin(opponents)
-
-    # If exact matching didn't find all matches, try normalized matching
-    if mask.sum() < len(normalized_opponents):
-        # Create a mask using normalized values for more flexible matching
-        norm_mask = matches_df[normalized_column].isin(normalized_opponents)
-        # Combine masks with logical OR
-        mask = mask | norm_mask
+    logger.debug(f"Debug: Filtering matches against {len(opponent_ids)} opponent ids")
 
-    filtered_df = matches_df[mask]
-    print(f"Debug: Found {len(filtered_df)} matches after opponent filtering")
+    # Integer membership test on the dictionary-encoded opponent column
+    filtered_df = matches_df[matches_df['opponent_id'].isin(opponent_ids)]
+    logger.debug(f"Debug: Found {len(filtered_df)} matches after opponent filtering")
 
     return filtered_df
 
@@ -141,16 +127,16 @@ def identify_worthy_opponents(matches_df, competitiveness_threshold):
     Identify worthy opponents based on competitiveness score.
 
     Args:
-        matches_df: DataFrame containing match data
+        matches_df: DataFrame containing match data with an opponent_id column
         competitiveness_threshold: Minimum competitiveness score to be considered worthy
 
     Returns:
-        List of worthy opponent team names
+        List of worthy opponent team ids
     """
     if matches_df.empty:
         return []
 
-    opponent_groups = matches_df.groupby('opponent_team')
+    opponent_groups = matches_df.groupby('opponent_id')
     worthy_opponents = []
     opponents_with_wins = set()
 